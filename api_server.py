@@ -0,0 +1,415 @@
+"""
+HTTP API for programmatic analysis requests
+Other services submit report images here instead of driving the Streamlit
+page. Analyses run on an asyncio worker pool behind a bounded queue.
+
+Run with:
+    python api_server.py --port 8080
+
+Endpoints:
+    POST   /v1/analyze              multipart form with one or more 'images' files
+                                    and optional 'provider', 'model', 'api_key',
+                                    'role', 'analysis_type' or 'prompt' fields;
+                                    202 with the job id (429 when the queue is full)
+    GET    /v1/jobs/{job_id}        job status, and the result once done ('truncated'
+                                    is true when the model's output was cut off)
+    GET    /v1/jobs/{job_id}/pdf    PDF report of a finished job
+    DELETE /v1/jobs/{job_id}        cancel a queued job
+    GET    /v1/health               worker and queue status
+
+Try it without API keys using the mock provider:
+    curl -F provider=mock -F images=@test_image/1.png http://127.0.0.1:8080/v1/analyze
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+from src.async_ai_handler import AsyncAIHandler
+from src.config import (
+    API_HOST, API_PORT, API_WORKERS, API_MAX_QUEUE_DEPTH, API_RETRY_AFTER_SECONDS, API_UPLOAD_DIR,
+    API_UPLOAD_CHUNK_BYTES, API_MAX_FIELD_BYTES, API_MAX_HANDLERS, API_KEY_ENV_VARS, DEFAULT_MODELS, MAX_FILE_SIZE_MB, JOB_RETENTION_SECONDS,
+    ARTIFACT_CACHE_MAX_MB
+)
+from src.jobs import Job, QUEUED, RUNNING, DONE, FAILED, CANCELLED, FINISHED_STATES
+from src.prompts import get_prompt, get_analysis_types
+from src.utils.artifact_cache import ArtifactCache
+from src.utils.ingestion import ingest_image
+from src.utils.pdf_generator import PDFGenerator
+
+
+class AnalysisService:
+    """Job registry, upload storage and the asyncio worker pool behind the API."""
+
+    def __init__(
+        self,
+        workers: int = API_WORKERS,
+        max_queue_depth: int = API_MAX_QUEUE_DEPTH,
+        upload_dir: str = API_UPLOAD_DIR,
+        retention_seconds: float = JOB_RETENTION_SECONDS
+    ):
+        """
+        Initialize Analysis Service.
+
+        Args:
+            workers: Analyses running at the same time
+            max_queue_depth: Analyses allowed to wait for a worker
+            upload_dir: Directory where request bodies are spooled
+            retention_seconds: How long finished jobs stay retrievable
+        """
+        self.workers = workers
+        self.max_queue_depth = max_queue_depth
+        self.upload_dir = upload_dir
+        self.retention_seconds = retention_seconds
+        self.jobs = {}
+        self.artifacts = ArtifactCache(max_bytes=ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+        self._queue = None
+        self._worker_tasks = []
+        self._handlers = OrderedDict()
+
+    async def start(self, app: Optional[web.Application] = None):
+        """Create the queue and worker tasks on the running event loop."""
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self._queue = asyncio.Queue(maxsize=self.max_queue_depth)
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"analysis-worker-{index}")
+            for index in range(self.workers)
+        ]
+
+    async def stop(self, app: Optional[web.Application] = None):
+        """Stop the workers and remove spooled uploads."""
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job in self.jobs.values():
+            self._discard_upload(job)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def queue_full(self) -> bool:
+        return self._queue is not None and self._queue.full()
+
+    def new_upload_dir(self) -> str:
+        """Create a directory to spool one request's files into."""
+        path = os.path.join(self.upload_dir, uuid.uuid4().hex)
+        os.makedirs(path)
+        return path
+
+    def submit(self, job: Job, spec: Dict[str, Any]):
+        """
+        Queue an analysis.
+
+        Args:
+            job: Job tracking the analysis
+            spec: 'upload_dir' (removed once the job finishes), 'paths',
+                'provider', 'model', 'api_key', 'prompt' and 'role'
+
+        Raises:
+            asyncio.QueueFull: When max_queue_depth analyses are already waiting
+        """
+        self._prune()
+        job.metadata['upload_dir'] = spec['upload_dir']
+        self._queue.put_nowait((job, spec))
+        self.jobs[job.id] = job
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job; running analyses are not interrupted."""
+        job = self.jobs.get(job_id)
+        if job is None or job.status != QUEUED:
+            return False
+        job.request_cancel()
+        job.finish(CANCELLED)
+        return True
+
+    def _handler(self, provider: str, model: str, api_key: str) -> AsyncAIHandler:
+        """
+        Handler per provider, model and key, so clients and rate limits are shared.
+
+        Only the API_MAX_HANDLERS most recently used are kept, since every
+        client-supplied key would otherwise add one for good.
+        """
+        key = (provider, model, hashlib.sha256(api_key.encode('utf-8')).hexdigest())
+        if key in self._handlers:
+            self._handlers.move_to_end(key)
+        else:
+            self._handlers[key] = AsyncAIHandler(provider=provider, model=model, api_key=api_key)
+            while len(self._handlers) > API_MAX_HANDLERS:
+                self._handlers.popitem(last=False)
+        return self._handlers[key]
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, spec = await self._queue.get()
+            try:
+                if job.cancel_requested.is_set():
+                    continue
+                job.start()
+                job.update(message="Preparing images...")
+                # Decoding and resizing is CPU work: keep it off the event loop
+                images = await loop.run_in_executor(None, self._load_images, spec)
+                job.update(message="Waiting for the model...")
+                result = await self._handler(spec['provider'], spec['model'], spec['api_key']).analyze_async(
+                    images, spec['prompt'], spec['role']
+                )
+                if result.get('finish_reason') == 'length':
+                    job.update(message="The model's output was cut off at its length limit")
+                job.finish(DONE, result)
+            except Exception as e:
+                job.finish(FAILED, error=str(e))
+            finally:
+                self._discard_upload(job)
+                self._queue.task_done()
+
+    def _load_images(self, spec: Dict[str, Any]) -> List[bytes]:
+        """Validate the spooled files and preprocess them for the provider."""
+        provider = spec['provider'] if spec['provider'] != 'mock' else None
+        images = []
+        for path in spec['paths']:
+            with open(path, 'rb') as f:
+                record = ingest_image(f.read(), MAX_FILE_SIZE_MB, provider=provider, thumbnail_size=None)
+            if not record['valid']:
+                raise ValueError(f"{os.path.basename(path)}: {record['message']}")
+            images.append(record['payload'])
+        return images
+
+    def _discard_upload(self, job: Job):
+        upload_dir = job.metadata.pop('upload_dir', None)
+        if upload_dir:
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [
+            job_id for job_id, job in self.jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self.jobs[job_id]
+
+    def build_pdf(self, result: Dict[str, Any]) -> bytes:
+        """Build (or reuse) the PDF report for a result."""
+        return self.artifacts.get_or_build(
+            'pdf', PDFGenerator.cache_key(result), lambda: PDFGenerator().generate_pdf(result)
+        )
+
+
+SERVICE_KEY = web.AppKey("service", AnalysisService)
+
+
+def _error(status: int, message: str, **headers: str) -> web.Response:
+    return web.json_response({"error": message}, status=status, headers=headers or None)
+
+
+def _job_view(request: web.Request, job: Job) -> Dict[str, Any]:
+    """Public representation of a job."""
+    snapshot = job.snapshot()
+    view = {
+        field: snapshot[field]
+        for field in ('id', 'label', 'status', 'message', 'created_at', 'started_at', 'finished_at',
+                      'provider', 'model', 'role', 'page_count', 'error', 'result')
+    }
+    view['status_url'] = str(request.app.router['job'].url_for(job_id=job.id))
+    if job.status == DONE:
+        view['truncated'] = (snapshot['result'] or {}).get('finish_reason') == 'length'
+        view['pdf_url'] = str(request.app.router['job_pdf'].url_for(job_id=job.id))
+    return view
+
+
+async def _spool_part(part, directory: str, index: int) -> str:
+    """Stream one uploaded file to disk, enforcing the per-file size limit."""
+    extension = os.path.splitext(part.filename or "")[1].lower()
+    path = os.path.join(directory, f"page_{index:04d}{extension}")
+    max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+    size = 0
+    with open(path, 'wb') as f:
+        while True:
+            chunk = await part.read_chunk(API_UPLOAD_CHUNK_BYTES)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise web.HTTPRequestEntityTooLarge(max_size=max_bytes, actual_size=size)
+            f.write(chunk)
+    return path
+
+
+async def _read_field(part) -> str:
+    """Read one text form field, enforcing API_MAX_FIELD_BYTES."""
+    data = bytearray()
+    while True:
+        chunk = await part.read_chunk(API_UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        data.extend(chunk)
+        if len(data) > API_MAX_FIELD_BYTES:
+            raise web.HTTPRequestEntityTooLarge(max_size=API_MAX_FIELD_BYTES, actual_size=len(data))
+    data = part.decode(bytes(data))
+    if len(data) > API_MAX_FIELD_BYTES:
+        raise web.HTTPRequestEntityTooLarge(max_size=API_MAX_FIELD_BYTES, actual_size=len(data))
+    return data.decode(part.get_charset(default='utf-8'))
+
+
+async def analyze(request: web.Request) -> web.Response:
+    """POST /v1/analyze: spool the images and queue an analysis."""
+    service = request.app[SERVICE_KEY]
+    retry_after = str(API_RETRY_AFTER_SECONDS)
+    # Reject before reading the body, so a full queue costs no upload
+    if service.queue_full():
+        return _error(429, "Analysis queue is full, retry later", **{"Retry-After": retry_after})
+    if not request.content_type.startswith("multipart/"):
+        return _error(415, "Send the images as multipart/form-data")
+
+    upload_dir = service.new_upload_dir()
+    fields, paths = {}, []
+    try:
+        reader = await request.multipart()
+        async for part in reader:
+            if part.filename is not None:
+                paths.append(await _spool_part(part, upload_dir, len(paths) + 1))
+            else:
+                fields[part.name] = await _read_field(part)
+
+        provider = fields.get('provider', 'openai').lower()
+        if provider not in DEFAULT_MODELS:
+            raise web.HTTPBadRequest(reason=f"Unknown provider: {provider}")
+        api_key = fields.get('api_key') or os.getenv(API_KEY_ENV_VARS.get(provider, ""), "")
+        if provider != 'mock' and not api_key:
+            raise web.HTTPBadRequest(reason=f"No API key: send 'api_key' or set {API_KEY_ENV_VARS[provider]}")
+        if not paths:
+            raise web.HTTPBadRequest(reason="Upload at least one file in the 'images' field")
+
+        role = fields.get('role', 'Investor')
+        analysis_type = fields.get('analysis_type', 'Overall Analysis')
+        if not fields.get('prompt') and analysis_type not in get_analysis_types():
+            raise web.HTTPBadRequest(reason=f"Unknown analysis_type: {analysis_type}")
+        spec = {
+            'upload_dir': upload_dir,
+            'paths': paths,
+            'provider': provider,
+            'model': fields.get('model') or DEFAULT_MODELS[provider],
+            'api_key': api_key,
+            'prompt': fields.get('prompt') or get_prompt(analysis_type, role),
+            'role': role,
+        }
+        job = Job(
+            f"{'Custom prompt' if fields.get('prompt') else analysis_type} · {role} · {provider} {spec['model']}",
+            provider=provider,
+            model=spec['model'],
+            role=role,
+            page_count=len(paths)
+        )
+        service.submit(job, spec)
+    except asyncio.QueueFull:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return _error(429, "Analysis queue is full, retry later", **{"Retry-After": retry_after})
+    except web.HTTPException as e:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return _error(e.status, e.reason)
+    except Exception:
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        raise
+
+    view = _job_view(request, job)
+    return web.json_response(view, status=202, headers={"Location": view['status_url']})
+
+
+def _get_job(request: web.Request) -> Job:
+    job = request.app[SERVICE_KEY].jobs.get(request.match_info['job_id'])
+    if job is None:
+        raise web.HTTPNotFound(text='{"error": "Unknown or expired job"}', content_type="application/json")
+    return job
+
+
+async def job_status(request: web.Request) -> web.Response:
+    """GET /v1/jobs/{job_id}"""
+    return web.json_response(_job_view(request, _get_job(request)))
+
+
+async def cancel_job(request: web.Request) -> web.Response:
+    """DELETE /v1/jobs/{job_id}"""
+    job = _get_job(request)
+    if not request.app[SERVICE_KEY].cancel(job.id):
+        return _error(409, f"Job is {job.status}; only queued jobs can be cancelled")
+    return web.json_response(_job_view(request, job))
+
+
+async def job_pdf(request: web.Request) -> web.Response:
+    """GET /v1/jobs/{job_id}/pdf"""
+    job = _get_job(request)
+    if job.status != DONE:
+        status = 409 if job.status not in FINISHED_STATES else 410
+        return _error(status, f"Job is {job.status}; the PDF is available once it is done")
+    pdf = await asyncio.get_running_loop().run_in_executor(
+        None, request.app[SERVICE_KEY].build_pdf, job.result
+    )
+    return web.Response(
+        body=pdf,
+        content_type="application/pdf",
+        headers={"Content-Disposition": f'attachment; filename="Financial_Analysis_{job.id}.pdf"'}
+    )
+
+
+async def health(request: web.Request) -> web.Response:
+    """GET /v1/health"""
+    service = request.app[SERVICE_KEY]
+    return web.json_response({
+        "status": "ok",
+        "workers": service.workers,
+        "running": sum(1 for job in service.jobs.values() if job.status == RUNNING),
+        "queued": service.queue_depth(),
+        "max_queue_depth": service.max_queue_depth,
+    })
+
+
+def create_app(service: Optional[AnalysisService] = None) -> web.Application:
+    """
+    Build the aiohttp application.
+
+    Args:
+        service: Service to expose (defaults to one built from the API_* config)
+
+    Returns:
+        aiohttp Application; the worker pool starts with the application
+    """
+    service = service or AnalysisService()
+    app = web.Application()
+    app[SERVICE_KEY] = service
+    app.on_startup.append(service.start)
+    app.on_cleanup.append(service.stop)
+    app.router.add_post("/v1/analyze", analyze, name="analyze")
+    app.router.add_get("/v1/jobs/{job_id}", job_status, name="job")
+    app.router.add_delete("/v1/jobs/{job_id}", cancel_job)
+    app.router.add_get("/v1/jobs/{job_id}/pdf", job_pdf, name="job_pdf")
+    app.router.add_get("/v1/health", health)
+    return app
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="HTTP API for financial report analysis")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS,
+                        help="Analyses running at the same time (default: %(default)s)")
+    parser.add_argument("--queue-depth", type=int, default=API_MAX_QUEUE_DEPTH,
+                        help="Analyses allowed to wait before requests get 429 (default: %(default)s)")
+    parser.add_argument("--upload-dir", default=API_UPLOAD_DIR, help="Where request bodies are spooled")
+    args = parser.parse_args(argv)
+
+    service = AnalysisService(
+        workers=args.workers, max_queue_depth=args.queue_depth, upload_dir=args.upload_dir
+    )
+    web.run_app(create_app(service), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,18 +9,26 @@ import os
 from pathlib import Path
 from datetime import datetime
 import io
+import uuid
 
 # Add src to path
 sys.path.append(str(Path(__file__).parent / "src"))
 
 from src.config import (
-    OPENAI_MODELS, GEMINI_MODELS, USER_ROLES, 
-    SUPPORTED_FORMATS, MAX_FILE_SIZE_MB, PAGE_CONFIG
+    OPENAI_MODELS, GEMINI_MODELS, MOCK_MODELS, MOCK_PROFILES, USER_ROLES, 
+    SUPPORTED_FORMATS, MAX_FILE_SIZE_MB, PAGE_CONFIG,
+    RESULT_CACHE_DIR, RESULT_CACHE_TTL_SECONDS, RESULT_CACHE_MAX_MB,
+    RESULT_CACHE_MEMORY_ENTRIES, MAP_REDUCE_PAGES_PER_CHUNK, MAP_REDUCE_AUTO_PAGES,
+    MAX_OUTPUT_TOKENS, ARTIFACT_CACHE_MAX_MB, JOB_POLL_INTERVAL_SECONDS,
+    BLOB_STORE_MAX_MB, BLOB_STORE_IDLE_SECONDS
+)
+from src.prompts import get_prompt, get_analysis_types, build_prompt_layout, PROMPTS
+from src.ai_handler import AIHandler, PreparedImages, RequestCancellation
+from src.client_pool import get_client_pool
+from src.jobs import get_job_manager, FINISHED_STATES, DONE, FAILED
+from src.utils import (
+    ResultCache, ArtifactCache, BlobStore, IngestionCache, estimate_analysis
 )
-from src.prompts import get_prompt, get_analysis_types, PROMPTS
-from src.ai_handler import AIHandler
-from src.utils import PDFGenerator, validate_image, get_image_info
-from src.mock_data import get_mock_analysis
 
 
 # Page configuration
@@ -29,14 +37,326 @@ st.set_page_config(**PAGE_CONFIG)
 # Initialize session state
 if 'analysis_result' not in st.session_state:
     st.session_state.analysis_result = None
-if 'uploaded_images' not in st.session_state:
-    st.session_state.uploaded_images = []
+if 'session_id' not in st.session_state:
+    # Mirrored in the URL with the job ids: jobs are only listed for the session that submitted them
+    st.session_state.session_id = st.query_params.get("session") or uuid.uuid4().hex
+if 'upload_records' not in st.session_state:
+    st.session_state.upload_records = []
 if 'current_prompt' not in st.session_state:
     st.session_state.current_prompt = ""
 if 'debug_mode' not in st.session_state:
     st.session_state.debug_mode = False
 if 'selected_analysis' not in st.session_state:
     st.session_state.selected_analysis = "Overall Analysis"
+if 'job_ids' not in st.session_state:
+    # Job ids are mirrored in the URL so a refreshed page can pick its jobs up again
+    st.session_state.job_ids = [job_id for job_id in st.query_params.get("jobs", "").split(",") if job_id]
+    st.session_state.active_job = st.session_state.job_ids[-1] if st.session_state.job_ids else None
+if 'analysis_notice' not in st.session_state:
+    st.session_state.analysis_notice = None
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Process-wide result cache shared by all sessions."""
+    return ResultCache(
+        db_path=os.path.join(RESULT_CACHE_DIR, "results.sqlite3"),
+        ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+        max_db_bytes=RESULT_CACHE_MAX_MB * 1024 * 1024,
+        memory_entries=RESULT_CACHE_MEMORY_ENTRIES
+    )
+
+
+@st.cache_resource
+def get_artifact_cache() -> ArtifactCache:
+    """Process-wide cache of generated artifacts (PDFs, thumbnails) shared by all sessions."""
+    return ArtifactCache(max_bytes=ARTIFACT_CACHE_MAX_MB * 1024 * 1024)
+
+
+@st.cache_resource
+def get_blob_store() -> BlobStore:
+    """Process-wide store of upload payloads; identical images are kept once for all sessions."""
+    return BlobStore(
+        max_bytes=BLOB_STORE_MAX_MB * 1024 * 1024,
+        idle_seconds=BLOB_STORE_IDLE_SECONDS
+    )
+
+
+def build_pdf(result: dict) -> bytes:
+    """Build (or reuse) the PDF report for an analysis result."""
+    # reportlab is only loaded once a PDF is requested
+    from src.utils import PDFGenerator
+    
+    return get_artifact_cache().get_or_build(
+        'pdf', PDFGenerator.cache_key(result), lambda: PDFGenerator().generate_pdf(result)
+    )
+
+
+def build_combined_pdf(bundle: dict) -> bytes:
+    """Build (or reuse) the combined PDF report for a "Run all analyses" result."""
+    from src.utils import PDFGenerator
+    
+    analyses = bundle['analyses']
+    return get_artifact_cache().get_or_build(
+        'pdf', PDFGenerator.combined_cache_key(analyses),
+        lambda: PDFGenerator().generate_combined_pdf(analyses)
+    )
+
+
+# Upload records live in the session and hold only hashes; payloads and
+# thumbnails are shared across sessions
+if 'ingestion_cache' not in st.session_state:
+    st.session_state.ingestion_cache = IngestionCache(
+        thumbnail_cache=get_artifact_cache(),
+        blob_store=get_blob_store(),
+        owner=st.session_state.session_id
+    )
+
+
+def run_analysis_job(job, ai_handler: AIHandler, images: list, prompt: str, role: str,
+                     mode: str, pages_per_chunk: int):
+    """
+    Body of a background analysis job (runs on a worker thread, so no Streamlit calls).
+    
+    Args:
+        job: Job receiving progress and partial output
+        ai_handler: Handler configured for this analysis
+        images: Image payloads to analyze
+        prompt: Analysis prompt
+        role: User role
+        mode: 'map_reduce', 'stream' or 'single'
+        pages_per_chunk: Page group size for map-reduce
+        
+    Returns:
+        Result dict as returned by AIHandler
+    """
+    # Cancelling the job stops retries, rate-limiter waits, open streams and pending page groups
+    cancellation = RequestCancellation()
+    job.on_cancel(cancellation.cancel)
+    
+    if mode == "map_reduce":
+        job.update(message=f"Analyzing {len(images)} pages in groups of {pages_per_chunk}...")
+        return ai_handler.analyze_map_reduce(
+            images=images,
+            prompt=prompt,
+            role=role,
+            pages_per_chunk=pages_per_chunk,
+            on_progress=lambda done, total: job.update(
+                progress=done / total, message=f"{done} of {total} requests complete"
+            ),
+            cancellation=cancellation
+        )
+    
+    job.update(message="Waiting for the model...")
+    if mode == "stream":
+        stream = ai_handler.analyze_stream(images=images, prompt=prompt, role=role, cancellation=cancellation)
+        for chunk in stream:
+            if job.cancel_requested.is_set():
+                stream.close()
+                return None
+            job.append_output(chunk)
+        return ai_handler.last_result
+    
+    return ai_handler.analyze(images=images, prompt=prompt, role=role, cancellation=cancellation)
+
+
+def run_all_analyses_job(job, ai_handler: AIHandler, images: list, prompts: dict, role: str,
+                         pages_per_chunk: int = None):
+    """
+    Body of a background "Run all analyses" job (runs on a worker thread, so no Streamlit calls).
+    
+    Args:
+        job: Job receiving progress
+        ai_handler: Handler configured for these analyses
+        images: Image payloads to analyze
+        prompts: Prompt per analysis type
+        role: User role
+        pages_per_chunk: Page group size when using map-reduce, otherwise None
+        
+    Returns:
+        Bundle dict with 'analyses' (result per analysis type) and the shared metadata
+    """
+    finished = []
+    
+    def on_result(name: str, result: dict):
+        finished.append(name)
+        job.update(
+            progress=len(finished) / len(prompts),
+            message=f"{name} finished ({len(finished)} of {len(prompts)})"
+        )
+    
+    cancellation = RequestCancellation()
+    job.on_cancel(cancellation.cancel)
+    
+    job.update(message=f"Running {len(prompts)} analyses concurrently...")
+    analyses = ai_handler.analyze_all(
+        images, prompts, role, pages_per_chunk=pages_per_chunk, on_result=on_result,
+        cancellation=cancellation
+    )
+    return {
+        'analyses': analyses,
+        'provider': ai_handler.provider,
+        'model': ai_handler.model,
+        'role': role,
+        'image_count': len(images)
+    }
+
+
+def completion_notice(result: dict) -> str:
+    """Success message for a finished analysis."""
+    if 'analyses' in result:
+        failed = sum(1 for analysis in result['analyses'].values() if 'error' in analysis)
+        notice = f"✅ {len(result['analyses']) - failed} of {len(result['analyses'])} analyses complete!"
+        return notice + (f" ({failed} failed)" if failed else "")
+    if result.get('finish_reason') == 'length':
+        return "⚠️ Analysis complete, but the model's output was cut off at its length limit"
+    if result.get('cached'):
+        return "✅ Analysis complete! (Loaded from cache)"
+    if result['provider'] == 'mock':
+        return "✅ Mock analysis complete! (No API credits used)"
+    if result.get('hedge', {}).get('winner') == 'secondary':
+        return f"✅ Analysis complete! (Answered by {result['provider'].upper()} after hedging)"
+    return "✅ Analysis complete!"
+
+
+def render_jobs(polling: bool = False):
+    """
+    Job list with progress and partial output; opens the active job's result when it finishes.
+    
+    Args:
+        polling: Running as a periodically refreshed fragment
+    """
+    jobs = get_job_manager().list(job_ids=st.session_state.job_ids, owner=st.session_state.session_id)
+    if not jobs:
+        return
+    
+    active = next((job for job in jobs if job['id'] == st.session_state.active_job), None)
+    if active is not None and active['status'] in FINISHED_STATES:
+        st.session_state.active_job = None
+        if active['status'] == DONE and active['result']:
+            st.session_state.analysis_result = active['result']
+            st.session_state.analysis_notice = completion_notice(active['result'])
+        elif active['status'] == FAILED:
+            st.session_state.analysis_notice = None
+            st.session_state.analysis_result = None
+        st.rerun()
+    
+    with st.expander(f"🗂️ Analysis jobs ({len(jobs)})", expanded=any(job['status'] not in FINISHED_STATES for job in jobs)):
+        for job in reversed(jobs):
+            status_icon = {"queued": "⏳", "running": "🔄", "done": "✅", "failed": "❌", "cancelled": "🚫"}[job['status']]
+            col_label, col_action = st.columns([4, 1])
+            with col_label:
+                st.markdown(f"{status_icon} **{job['label']}** · {job['status']}")
+            with col_action:
+                if job['status'] == DONE and job['result']:
+                    if st.button("Show", key=f"show_{job['id']}", use_container_width=True):
+                        st.session_state.analysis_result = job['result']
+                        st.session_state.analysis_notice = None
+                        st.rerun()
+                elif job['status'] not in FINISHED_STATES:
+                    if st.button("Cancel", key=f"cancel_{job['id']}", use_container_width=True):
+                        get_job_manager().cancel(job['id'])
+                        st.rerun()
+            
+            if job['status'] == "running":
+                st.progress(job['progress'], text=job['message'] or "Running...")
+                if job['output'] and job['id'] == st.session_state.active_job:
+                    st.markdown(job['output'])
+            elif job['status'] == FAILED:
+                st.error(f"❌ Error during analysis: {job['error']}")
+    
+    # Stop polling once everything has finished
+    if polling and all(job['status'] in FINISHED_STATES for job in jobs):
+        st.rerun()
+
+
+def render_analysis(result: dict):
+    """Usage captions and text of one analysis result."""
+    if result.get('error'):
+        st.error(f"❌ Error during analysis: {result['error']}")
+        return
+    
+    if result.get('retries'):
+        st.caption(f"🔁 Provider calls were retried {result['retries']} time(s) after rate limits or transient errors")
+    
+    usage = result.get('usage')
+    if usage:
+        st.caption(
+            f"🧮 Tokens: {usage['prompt_tokens']:,} input "
+            f"({usage['cached_tokens']:,} served from the provider's prompt cache), "
+            f"{usage['completion_tokens']:,} output"
+        )
+    
+    st.markdown("---")
+    
+    # Analysis text
+    st.markdown(result['analysis'])
+
+
+def render_result(result: dict):
+    """
+    Results panel: PDF download, metadata and the analysis text.
+    
+    Args:
+        result: A single analysis result, or a "Run all analyses" bundle
+            (shown as one tab per analysis with a combined PDF)
+    """
+    bundle = 'analyses' in result
+    
+    # Header with PDF download button
+    col_title, col_button = st.columns([3, 1])
+    with col_title:
+        st.header("📋 Analysis Results")
+    with col_button:
+        try:
+            # The PDF is only built when the button is clicked, and at most
+            # once per distinct result across all sessions
+            st.download_button(
+                label="📄 Download Combined PDF" if bundle else "📄 Download PDF",
+                data=(lambda: build_combined_pdf(result)) if bundle else (lambda: build_pdf(result)),
+                file_name=f"Financial_Analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                mime="application/pdf",
+                on_click="ignore",
+                use_container_width=True,
+                type="primary"
+            )
+        except Exception as e:
+            st.error(f"PDF Error: {str(e)}")
+    
+    # Metadata
+    meta_cols = st.columns(4)
+    with meta_cols[0]:
+        provider_display = result['provider'].upper()
+        if result['provider'] == 'mock':
+            provider_display = "🧪 MOCK"
+        st.metric("Provider", provider_display)
+    with meta_cols[1]:
+        model_display = result['model']
+        if result['provider'] == 'mock':
+            model_display = "Debug Mode"
+        st.metric("Model", model_display)
+    with meta_cols[2]:
+        st.metric("Role", result['role'])
+    with meta_cols[3]:
+        st.metric("Images", result['image_count'])
+    
+    if not bundle:
+        render_analysis(result)
+        return
+    
+    tabs = st.tabs(list(result['analyses']))
+    for tab, analysis in zip(tabs, result['analyses'].values()):
+        with tab:
+            render_analysis(analysis)
+
+
+def get_default_api_key(provider: str) -> str:
+    """Look up a provider API key in st.secrets first, then the environment."""
+    secret_name = "OPENAI_API_KEY" if provider == "OpenAI" else "GEMINI_API_KEY"
+    try:
+        return st.secrets.get(secret_name, "")
+    except:
+        return os.getenv(secret_name, "")
 
 
 def main():
@@ -65,8 +385,36 @@ def main():
         )
         st.session_state.debug_mode = debug_mode
         
+        mock_model_id = None
+        mock_options = {}
         if debug_mode:
             st.info("🧪 **Debug Mode Active**: Mock data will be used. No API calls will be made.")
+            
+            # The mock provider runs through AIHandler, so retries, streaming and
+            # caching behave as they would against a real provider
+            mock_profile_name = st.selectbox(
+                "Mock profile",
+                list(MOCK_MODELS.keys()),
+                help="Latency and fault-injection profile of the mock provider"
+            )
+            mock_model_id = MOCK_MODELS[mock_profile_name]
+            mock_profile = MOCK_PROFILES[mock_model_id]
+            with st.expander("Fault injection"):
+                mock_options = {
+                    "tokens_per_second": st.number_input(
+                        "Streaming rate (tokens/s)", min_value=1, max_value=10000,
+                        value=int(mock_profile["tokens_per_second"])
+                    ),
+                    "rate_limit_rate": st.slider(
+                        "429 rate", 0.0, 1.0, float(mock_profile["rate_limit_rate"]), 0.05
+                    ),
+                    "timeout_rate": st.slider(
+                        "Timeout rate", 0.0, 1.0, float(mock_profile["timeout_rate"]), 0.05
+                    ),
+                    "truncation_rate": st.slider(
+                        "Truncation rate", 0.0, 1.0, float(mock_profile["truncation_rate"]), 0.05
+                    ),
+                }
         
         st.divider()
         
@@ -97,17 +445,7 @@ def main():
         # Try to get API key from Streamlit secrets or environment variables
         default_api_key = ""
         if not debug_mode:
-            if provider == "OpenAI":
-                # Try st.secrets first, then environment variable
-                try:
-                    default_api_key = st.secrets.get("OPENAI_API_KEY", "")
-                except:
-                    default_api_key = os.getenv("OPENAI_API_KEY", "")
-            else:  # Gemini
-                try:
-                    default_api_key = st.secrets.get("GEMINI_API_KEY", "")
-                except:
-                    default_api_key = os.getenv("GEMINI_API_KEY", "")
+            default_api_key = get_default_api_key(provider)
         
         # Show API key input field
         api_key = st.text_input(
@@ -149,15 +487,80 @@ def main():
         # Advanced Options
         with st.expander("🔧 Advanced Options"):
             auto_resize = st.checkbox(
-                "Auto-resize large images",
+                "Optimize images before upload",
                 value=True,
-                help="Automatically resize images larger than 2048px"
+                help="Downscale to the provider's effective resolution, convert colourless scans "
+                     "to grayscale and re-encode compactly before sending"
             )
             show_image_info = st.checkbox(
                 "Show image information",
                 value=False,
                 help="Display technical details about uploaded images"
             )
+            use_cache = st.checkbox(
+                "Reuse cached results",
+                value=True,
+                help="Return a stored result when the same images and prompt were analyzed before"
+            )
+            stream_response = st.checkbox(
+                "Stream response",
+                value=True,
+                help="Show the analysis as it is generated instead of waiting for the full answer"
+            )
+            deterministic = st.checkbox(
+                "Deterministic mode",
+                value=False,
+                help="Use temperature 0 (and a fixed seed where supported) so cached answers are reproducible"
+            )
+            cost_budget = st.number_input(
+                "Cost budget per analysis (USD, 0 = no limit)",
+                min_value=0.0,
+                value=0.0,
+                step=0.01,
+                format="%.2f",
+                help="OpenAI only: images are sent at low detail, largest savings first, "
+                     "until the estimated cost fits the budget"
+            )
+            large_document_mode = st.selectbox(
+                "Large document mode",
+                ["Auto", "Map-reduce", "Single request"],
+                help="Map-reduce analyzes page groups concurrently and merges the findings. "
+                     f"Auto uses it above {MAP_REDUCE_AUTO_PAGES} pages or when the upload "
+                     "exceeds the provider's request-size limit."
+            )
+            pages_per_chunk = st.number_input(
+                "Pages per group (map-reduce)",
+                min_value=1,
+                max_value=20,
+                value=MAP_REDUCE_PAGES_PER_CHUNK
+            )
+            
+            # Hedged requests: fall back to the other provider when the primary is slow
+            hedge_provider = "Gemini" if provider == "OpenAI" else "OpenAI"
+            hedge_enabled = st.checkbox(
+                f"Hedge slow requests with {hedge_provider}",
+                value=False,
+                help="If no response starts within the usual latency, send the same request to a "
+                     "second provider and keep whichever finishes first",
+                disabled=debug_mode
+            )
+            hedge_model_id = None
+            hedge_api_key = ""
+            if hedge_enabled and not debug_mode:
+                hedge_models = GEMINI_MODELS if hedge_provider == "Gemini" else OPENAI_MODELS
+                hedge_model_name = st.selectbox(
+                    f"Secondary {hedge_provider} model",
+                    list(hedge_models.keys())
+                )
+                hedge_model_id = hedge_models[hedge_model_name]
+                hedge_api_key = st.text_input(
+                    f"{hedge_provider} API Key (secondary)",
+                    type="password",
+                    value=get_default_api_key(hedge_provider)
+                )
+            
+            if st.checkbox("Show connection pool statistics", value=False):
+                st.json(get_client_pool().stats())
     
     # Main content area
     col1, col2 = st.columns([1, 1])
@@ -177,29 +580,46 @@ def main():
         if uploaded_files:
             st.success(f"✅ {len(uploaded_files)} file(s) uploaded")
             
-            # Validate and store images
-            valid_images = []
+            # Validate and store images (each upload is decoded once, then reused on reruns)
+            ingestion_cache = st.session_state.ingestion_cache
+            ingestion_cache.retain(uploaded_file.file_id for uploaded_file in uploaded_files)
+            
+            valid_records = []
             for i, uploaded_file in enumerate(uploaded_files):
-                img_bytes = uploaded_file.read()
-                is_valid, msg = validate_image(img_bytes, MAX_FILE_SIZE_MB)
+                record = ingestion_cache.ingest(
+                    uploaded_file.file_id,
+                    uploaded_file.getvalue,
+                    max_size_mb=MAX_FILE_SIZE_MB,
+                    provider=provider.lower() if auto_resize else None
+                )
                 
-                if is_valid:
-                    valid_images.append(img_bytes)
+                if record['valid']:
+                    valid_records.append(record)
+                    processed = record['processed']
                     
-                    # Show thumbnail
+                    # Show the preview thumbnail (the original never goes to the browser)
                     with st.expander(f"📄 {uploaded_file.name}"):
-                        st.image(img_bytes, use_container_width=True)
+                        st.image(record['thumbnail'], use_container_width=True)
+                        
+                        if processed:
+                            saved_pct = 100 * processed['bytes_saved'] / max(1, processed['original_size'])
+                            st.caption(
+                                f"Optimized: {processed['original_size'] / 1024:,.0f} KB → "
+                                f"{processed['processed_size'] / 1024:,.0f} KB (-{saved_pct:.0f}%), "
+                                f"{processed['width']}×{processed['height']}"
+                                + (", grayscale" if processed['grayscale'] else "")
+                            )
                         
                         if show_image_info:
-                            info = get_image_info(img_bytes)
-                            st.json(info)
+                            st.json(record['info'])
                 else:
-                    st.error(f"❌ {uploaded_file.name}: {msg}")
+                    st.error(f"❌ {uploaded_file.name}: {record['message']}")
             
-            st.session_state.uploaded_images = valid_images
+            st.session_state.upload_records = valid_records
         else:
             st.info("👆 Upload one or more images to begin analysis")
-            st.session_state.uploaded_images = []
+            st.session_state.ingestion_cache.retain(())
+            st.session_state.upload_records = []
     
     with col2:
         st.subheader("✍️ Analysis Prompt")
@@ -242,18 +662,33 @@ def main():
         if st.button("🔄 Reset to Default Prompt"):
             st.session_state.current_prompt = get_prompt(st.session_state.selected_analysis, user_role)
             st.rerun()
+        
+        # Run several templates at once on the same images
+        run_all = st.toggle(
+            "Run all analyses",
+            help="Run the default prompt of each selected analysis type concurrently and "
+                 "export them as one combined PDF (the prompt above is not used)"
+        )
+        run_all_types = []
+        if run_all:
+            run_all_types = st.multiselect(
+                "Analyses to run",
+                analysis_types,
+                default=analysis_types
+            )
     
     st.divider()
     
     # Analyze button
-    col_analyze, col_space = st.columns([1, 2])
+    col_analyze, col_estimate = st.columns([1, 2])
     with col_analyze:
         # In debug mode, don't require API key
+        has_prompts = bool(run_all_types) if run_all else bool(prompt_text)
         if debug_mode:
-            analyze_disabled = not (st.session_state.uploaded_images and prompt_text)
+            analyze_disabled = not (st.session_state.upload_records and has_prompts)
             button_label = "🧪 Analyze (Debug Mode)"
         else:
-            analyze_disabled = not (api_key and st.session_state.uploaded_images and prompt_text)
+            analyze_disabled = not (api_key and st.session_state.upload_records and has_prompts)
             button_label = "🚀 Analyze Documents"
         
         analyze_button = st.button(
@@ -263,103 +698,149 @@ def main():
             disabled=analyze_disabled
         )
     
+    # Pre-flight estimate shown next to the button
+    with col_estimate:
+        if not debug_mode and st.session_state.upload_records and has_prompts:
+            image_sizes = [
+                (record['width'], record['height']) for record in st.session_state.upload_records
+            ]
+            estimate_prompts = (
+                [get_prompt(analysis_type, user_role) for analysis_type in run_all_types]
+                if run_all else [prompt_text]
+            )
+            estimates = []
+            for estimate_prompt in estimate_prompts:
+                prompt_prefix, prompt_variable = build_prompt_layout(estimate_prompt, user_role)
+                estimates.append(estimate_analysis(
+                    image_sizes,
+                    f"{prompt_prefix}\n\n{prompt_variable}",
+                    provider.lower(),
+                    model_id,
+                    max_output_tokens=MAX_OUTPUT_TOKENS[provider.lower()],
+                    budget_usd=cost_budget or None
+                ))
+            # Concurrent analyses add up in tokens and cost, not in time
+            estimate = estimates[0]
+            low_detail = estimate['details'].count('low')
+            st.caption(
+                f"💰 Estimate{f' ({len(estimates)} analyses)' if len(estimates) > 1 else ''}: "
+                f"~{sum(e['input_tokens'] for e in estimates):,} input tokens "
+                f"(images {sum(e['image_tokens'] for e in estimates):,}), "
+                f"up to {sum(e['output_budget'] for e in estimates):,} output tokens · "
+                f"~${sum(e['cost_usd'] for e in estimates):.3f} "
+                f"(max ${sum(e['max_cost_usd'] for e in estimates):.3f}) · "
+                f"~{max(e['latency_seconds'] for e in estimates):.0f}s"
+                + (f" · {low_detail} image(s) at low detail" if low_detail else "")
+                + ("" if all(e['within_budget'] for e in estimates) else " · ⚠️ over budget")
+            )
+    
     # Check prerequisites
     if analyze_button:
         # In debug mode, skip API key check
         if not debug_mode and not api_key:
             st.error("❌ Please enter your API key in the sidebar")
-        elif not st.session_state.uploaded_images:
+        elif not st.session_state.upload_records:
             st.error("❌ Please upload at least one image")
-        elif not prompt_text:
-            st.error("❌ Please enter a prompt")
+        elif not has_prompts:
+            st.error("❌ Please select at least one analysis" if run_all else "❌ Please enter a prompt")
         else:
             # Perform analysis
-            if debug_mode:
-                # Use mock data
-                with st.spinner(f"🧪 Generating mock analysis for {user_role}..."):
-                    try:
-                        import time
-                        time.sleep(2)  # Simulate processing time
-                        
-                        result = get_mock_analysis(user_role, st.session_state.selected_analysis)
-                        st.session_state.analysis_result = result
-                        st.success("✅ Mock analysis complete! (No API credits used)")
-                        st.info("💡 **Debug Mode**: This is sample data. Enable real analysis by unchecking Debug Mode and providing an API key.")
-                    except Exception as e:
-                        st.error(f"❌ Error generating mock analysis: {str(e)}")
-                        st.session_state.analysis_result = None
-            else:
-                # Use real API
-                with st.spinner(f"🔍 Analyzing with {provider} {model_name}..."):
-                    try:
-                        # Initialize AI handler
-                        ai_handler = AIHandler(
-                            provider=provider.lower(),
-                            model=model_id,
-                            api_key=api_key
-                        )
-                        
-                        # Perform analysis
-                        result = ai_handler.analyze(
-                            images=st.session_state.uploaded_images,
-                            prompt=prompt_text,
-                            role=user_role
-                        )
-                        
-                        st.session_state.analysis_result = result
-                        st.success("✅ Analysis complete!")
-                        
-                    except Exception as e:
-                        st.error(f"❌ Error during analysis: {str(e)}")
-                        st.session_state.analysis_result = None
+            try:
+                # Initialize AI handler (Debug Mode uses the mock provider)
+                cache = get_result_cache() if use_cache else None
+                hedge = None
+                if hedge_enabled and hedge_model_id and hedge_api_key and not debug_mode:
+                    hedge = AIHandler(
+                        provider=hedge_provider.lower(),
+                        model=hedge_model_id,
+                        api_key=hedge_api_key,
+                        cache=cache,
+                        deterministic=deterministic
+                    )
+                
+                ai_handler = AIHandler(
+                    provider="mock" if debug_mode else provider.lower(),
+                    model=mock_model_id if debug_mode else model_id,
+                    api_key=api_key,
+                    cache=cache,
+                    deterministic=deterministic,
+                    hedge=hedge,
+                    detail_budget_usd=cost_budget or None,
+                    mock_options=mock_options
+                )
+                
+                # Payloads are fetched from the shared blob store only for the job;
+                # their sizes come from ingestion, so cost budgets never re-decode them
+                uploads = {uploaded_file.file_id: uploaded_file.getvalue for uploaded_file in uploaded_files or []}
+                images = PreparedImages(
+                    [
+                        st.session_state.ingestion_cache.payload(record, uploads)
+                        for record in st.session_state.upload_records
+                    ],
+                    sizes=[(record['width'], record['height']) for record in st.session_state.upload_records]
+                )
+                use_map_reduce = large_document_mode == "Map-reduce" or (
+                    large_document_mode == "Auto" and (
+                        len(images) > MAP_REDUCE_AUTO_PAGES or ai_handler.exceeds_request_limit(images)
+                    )
+                )
+                # Hedged requests race two providers, so their output is not streamed
+                if use_map_reduce:
+                    mode = "map_reduce"
+                elif stream_response and hedge is None:
+                    mode = "stream"
+                else:
+                    mode = "single"
+                
+                # The analysis runs in the background; the jobs panel below polls it
+                target = f"🧪 {mock_profile_name} mock" if debug_mode else f"{provider} {model_name}"
+                if run_all:
+                    prompts = {
+                        analysis_type: get_prompt(analysis_type, user_role)
+                        for analysis_type in run_all_types
+                    }
+                    job_id = get_job_manager().submit(
+                        lambda job: run_all_analyses_job(
+                            job, ai_handler, images, prompts, user_role,
+                            int(pages_per_chunk) if use_map_reduce else None
+                        ),
+                        label=f"{len(prompts)} analyses · {user_role} · {target} · {len(images)} page(s)",
+                        owner=st.session_state.session_id
+                    )
+                else:
+                    job_id = get_job_manager().submit(
+                        lambda job: run_analysis_job(
+                            job, ai_handler, images, prompt_text, user_role, mode, int(pages_per_chunk)
+                        ),
+                        label=f"{st.session_state.selected_analysis} · {user_role} · {target} · {len(images)} page(s)",
+                        owner=st.session_state.session_id
+                    )
+                st.session_state.job_ids.append(job_id)
+                st.session_state.active_job = job_id
+                st.query_params["jobs"] = ",".join(st.session_state.job_ids)
+                st.query_params["session"] = st.session_state.session_id
+                
+            except Exception as e:
+                st.error(f"❌ Error during analysis: {str(e)}")
+                st.session_state.analysis_result = None
+    
+    # Background jobs: poll while any are unfinished
+    if st.session_state.job_ids:
+        job_states = [job['status'] for job in get_job_manager().list(job_ids=st.session_state.job_ids, owner=st.session_state.session_id)]
+        if any(state not in FINISHED_STATES for state in job_states):
+            st.fragment(render_jobs, run_every=JOB_POLL_INTERVAL_SECONDS)(polling=True)
+        else:
+            render_jobs()
+    
+    if st.session_state.analysis_notice:
+        st.success(st.session_state.analysis_notice)
+        st.session_state.analysis_notice = None
     
     # Display analysis results
     if st.session_state.analysis_result:
         st.divider()
         
-        # Header with PDF download button
-        col_title, col_button = st.columns([3, 1])
-        with col_title:
-            st.header("📋 Analysis Results")
-        with col_button:
-            result = st.session_state.analysis_result
-            try:
-                pdf_generator = PDFGenerator()
-                pdf_bytes = pdf_generator.generate_pdf(result)
-                
-                st.download_button(
-                    label="📄 Download PDF",
-                    data=pdf_bytes,
-                    file_name=f"Financial_Analysis_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True,
-                    type="primary"
-                )
-            except Exception as e:
-                st.error(f"PDF Error: {str(e)}")
-        
-        # Metadata
-        result = st.session_state.analysis_result
-        meta_cols = st.columns(4)
-        with meta_cols[0]:
-            provider_display = result['provider'].upper()
-            if result['provider'] == 'mock':
-                provider_display = "🧪 MOCK"
-            st.metric("Provider", provider_display)
-        with meta_cols[1]:
-            model_display = result['model']
-            if result['provider'] == 'mock':
-                model_display = "Debug Mode"
-            st.metric("Model", model_display)
-        with meta_cols[2]:
-            st.metric("Role", result['role'])
-        with meta_cols[3]:
-            st.metric("Images", result['image_count'])
-        
-        st.markdown("---")
-        
-        # Analysis text
-        st.markdown(result['analysis'])
+        render_result(st.session_state.analysis_result)
     
     # Footer
     st.divider()
@@ -0,0 +1,145 @@
+"""
+Cold-start import benchmark for app.py
+Imports the modules app.py loads at startup (its top-level imports, read
+from the source) in fresh interpreters with -X importtime, reports the
+cost per module and package, and exits with status 1 when the median
+time exceeds the budget or when a dependency that must load lazily
+(provider SDKs, reportlab, mock data) is imported at startup.
+
+Streamlit itself is imported first and not counted: it is the same for
+any app.
+
+Usage:
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 150 --runs 5 --top 20
+"""
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Median import time of app.py's own imports (excluding streamlit)
+DEFAULT_BUDGET_MS = 150
+
+# Must only be imported on first use, never at startup
+LAZY_MODULES = (
+    'openai',
+    'google.generativeai',
+    'reportlab',
+    'tiktoken',
+    'src.mock_data',
+    'src.mock_provider',
+    'src.utils.pdf_generator',
+    'src.utils.email_sender',
+)
+
+MARKER = "--- app imports ---"
+
+
+def app_imports(app_path: str = os.path.join(ROOT, "app.py")) -> str:
+    """Source of app.py's top-level import statements, except streamlit."""
+    with open(app_path, encoding='utf-8') as f:
+        source = f.read()
+    statements = []
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            names = [node.module or ""]
+        else:
+            continue
+        if any(name.split('.')[0] == 'streamlit' for name in names):
+            continue
+        statements.append(ast.get_source_segment(source, node))
+    return "\n".join(statements)
+
+
+def run_once(imports: str) -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    """
+    Import the app's modules in a fresh interpreter.
+
+    Returns:
+        (seconds, [(self microseconds, module)], modules loaded)
+    """
+    script = "\n".join([
+        "import json, sys, time",
+        "import streamlit",
+        f"sys.stderr.write({MARKER!r} + '\\n'); sys.stderr.flush()",
+        "start = time.perf_counter()",
+        imports,
+        "elapsed = time.perf_counter() - start",
+        "print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))",
+    ])
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    timings = []
+    stderr = completed.stderr
+    for line in stderr[stderr.index(MARKER) + len(MARKER):].splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        self_us, _, module = line[len("import time:"):].split("|")
+        timings.append((int(self_us), module.strip()))
+    return report['seconds'], timings, report['modules']
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="Fail when the median exceeds this (default: %(default)s)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to time (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=15, help="Modules to list (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    imports = app_imports()
+    runs = [run_once(imports) for _ in range(max(1, args.runs))]
+    median_ms = statistics.median(seconds for seconds, _, _ in runs) * 1000
+
+    # Per-module self time: the fastest run, to damp noise
+    per_module: Dict[str, int] = {}
+    for _, timings, _ in runs:
+        for self_us, module in timings:
+            per_module[module] = min(per_module.get(module, self_us), self_us)
+    per_package = defaultdict(int)
+    for module, self_us in per_module.items():
+        per_package[module.split('.')[0]] += self_us
+
+    print(f"app.py imports (excluding streamlit), {len(runs)} run(s): "
+          f"median {median_ms:.0f} ms, budget {args.budget_ms:.0f} ms\n")
+    print("By package:")
+    for package, self_us in sorted(per_package.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+    print("\nSlowest modules (self time):")
+    for module, self_us in sorted(per_module.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {module}")
+
+    loaded = set(runs[0][2])
+    eager = [
+        module for module in LAZY_MODULES
+        if any(name == module or name.startswith(module + ".") for name in loaded)
+    ]
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"\nFAIL: cold-start imports took {median_ms:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if not failed:
+        print("\nOK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
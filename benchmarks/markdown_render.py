@@ -0,0 +1,179 @@
+"""
+Markdown rendering benchmark
+Renders every mock analysis to reportlab flowables (PDF) and HTML (email),
+once with the previous line-by-line renderers (each re-parsing the text
+with its own rules) and once through the shared document tree, cold
+(every cache empty) and warm (tree, parsed paragraphs and HTML served from
+the caches, as when the same result is exported to PDF and emailed).
+
+Cold, the tree path costs about as much as the legacy one or a little
+more: its output is richer (inline <b>/<i> spans and nested lists, which
+reportlab's paragraph parser has to process), and that parsing dominates.
+
+Usage:
+    python benchmarks/markdown_render.py
+    python benchmarks/markdown_render.py --repeat 200
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from typing import Callable, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from reportlab.lib.units import inch  # noqa: E402
+from reportlab.platypus import Paragraph, Spacer  # noqa: E402
+
+from src.mock_data import MOCK_ANALYSES  # noqa: E402
+from src.utils.email_sender import EmailSender  # noqa: E402
+from src.utils.markdown_ast import markdown_html, parse_markdown  # noqa: E402
+from src.utils.pdf_generator import PDFGenerator  # noqa: E402
+
+BULLETS = ('•', '- ', '* ')
+
+
+def legacy_pdf_flowables(generator: PDFGenerator, text: str) -> list:
+    """The PDF renderer before the shared tree (headings, bullets, numbers, paragraphs)."""
+    flowables = []
+    styles = generator.styles
+    lines = text.split('\n')
+    i = 0
+    while i < len(lines):
+        line = lines[i].strip()
+        if not line:
+            i += 1
+            continue
+        if line.startswith('#'):
+            style = styles['SectionHeading'] if line.startswith('###') else styles['CustomSubtitle']
+            marker = '###' if line.startswith('###') else '##' if line.startswith('##') else '#'
+            flowables.append(Paragraph(generator._clean_text(line.replace(marker, '').strip()), style))
+            flowables.append(Spacer(1, 0.1*inch))
+            i += 1
+            continue
+        if line.startswith('**') and line.endswith('**') and len(line) > 4:
+            flowables.append(Paragraph(generator._clean_text(line.replace('**', '').strip()), styles['SectionHeading']))
+            flowables.append(Spacer(1, 0.05*inch))
+            i += 1
+            continue
+        is_bullet = line.startswith(BULLETS)
+        if is_bullet or re.match(r'^\d+\.', line):
+            items = []
+            while i < len(lines):
+                current = lines[i].strip()
+                if not current:
+                    i += 1
+                    break
+                if is_bullet and current.startswith(BULLETS):
+                    items.append(f"• {current.lstrip('•-* ').strip().replace('**', '')}")
+                elif not is_bullet and re.match(r'^\d+\.', current):
+                    number_text = re.sub(r'^\d+\.\s*', '', current).replace('**', '')
+                    items.append(f"{len(items) + 1}. {number_text}")
+                else:
+                    break
+                i += 1
+            for item in items:
+                flowables.append(Paragraph(generator._clean_text(item), styles['CustomBody']))
+                flowables.append(Spacer(1, 0.05*inch))
+            flowables.append(Spacer(1, 0.1*inch))
+            continue
+        flowables.append(Paragraph(generator._clean_text(line.replace('**', '')), styles['CustomBody']))
+        flowables.append(Spacer(1, 0.1*inch))
+        i += 1
+    return flowables
+
+
+def legacy_email_html(text: str) -> str:
+    """The email renderer before the shared tree."""
+    formatted_lines = []
+    in_list = False
+    for line in text.split('\n'):
+        stripped = line.strip()
+        if not stripped or not stripped.startswith(BULLETS):
+            if in_list:
+                formatted_lines.append('</ul>')
+                in_list = False
+        if not stripped:
+            formatted_lines.append('<br>')
+        elif stripped.startswith('### '):
+            formatted_lines.append(f'<h3>{stripped[4:]}</h3>')
+        elif stripped.startswith('## '):
+            formatted_lines.append(f'<h3>{stripped[3:]}</h3>')
+        elif stripped.startswith('# '):
+            formatted_lines.append(f'<h2>{stripped[2:]}</h2>')
+        elif stripped.startswith(BULLETS):
+            bullet_text = stripped.lstrip('•-* ').strip().replace('**', '<strong>')
+            if bullet_text.count('<strong>') != bullet_text.count('</strong>'):
+                bullet_text = bullet_text.replace('<strong>', '').replace('</strong>', '')
+            if not in_list:
+                formatted_lines.append('<ul style="margin-left: 20px; margin-bottom: 10px;">')
+                in_list = True
+            formatted_lines.append(f'<li style="margin-bottom: 5px;">{bullet_text}</li>')
+        elif re.match(r'^\d+\.', stripped):
+            formatted_lines.append(f'<p>{stripped}</p>')
+        elif stripped.startswith('**') and stripped.endswith('**') and len(stripped) > 4:
+            formatted_lines.append(f'<h4 style="color: #2c5f99; margin-top: 15px;">{stripped[2:-2]}</h4>')
+        else:
+            para = stripped.replace('**', '<strong>')
+            if para.count('<strong>') != para.count('</strong>'):
+                para = para.replace('<strong>', '').replace('</strong>', '')
+            formatted_lines.append(f'<p style="margin-bottom: 8px;">{para}</p>')
+    if in_list:
+        formatted_lines.append('</ul>')
+    return '\n'.join(formatted_lines)
+
+
+def time_per_render(render: Callable[[str], object], texts: List[str], repeat: int) -> float:
+    """Milliseconds per text for one render pass (best of repeat)."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            render(text)
+        best = min(best, time.perf_counter() - start)
+    return best / len(texts) * 1000
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the texts (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    texts = list(MOCK_ANALYSES.values())
+    generator = PDFGenerator()
+    sender = EmailSender.__new__(EmailSender)  # rendering needs no SMTP settings
+
+    def legacy(text):
+        legacy_pdf_flowables(generator, text)
+        legacy_email_html(text)
+
+    def tree_cold(text):
+        parse_markdown.cache_clear()
+        markdown_html.cache_clear()
+        generator._paragraph_frags.clear()
+        list(generator._analysis_flowables(text))  # parses and caches the tree
+        sender._markdown_to_html(text)
+
+    def tree_warm(text):
+        list(generator._analysis_flowables(text))
+        sender._markdown_to_html(text)
+
+    for text in texts:
+        tree_warm(text)
+
+    timings = [
+        ("legacy renderers (PDF + email, each parses)", time_per_render(legacy, texts, args.repeat)),
+        ("document tree, cold cache", time_per_render(tree_cold, texts, args.repeat)),
+        ("document tree, warm cache", time_per_render(tree_warm, texts, args.repeat)),
+        ("document tree, parse only", time_per_render(parse_markdown.__wrapped__, texts, args.repeat)),
+    ]
+    print(f"{len(texts)} mock analyses, best of {args.repeat} passes (ms per analysis, PDF flowables + email HTML):")
+    for label, ms in timings:
+        print(f"  {ms:7.3f} ms  {label}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,12 +6,30 @@ __version__ = "1.0.0"
 __author__ = "Financial Report Analysis AI Team"
 __description__ = "AI-powered financial document analysis tool"
 
+import importlib
+
 from .config import *
-from .prompts import get_prompt, get_analysis_types
-from .ai_handler import AIHandler
-
-__all__ = [
-    'AIHandler',
-    'get_prompt',
-    'get_analysis_types',
-]
+
+# Imported on first access (see src/utils/__init__.py)
+_EXPORTS = {
+    'AIHandler': 'ai_handler',
+    'AsyncAIHandler': 'async_ai_handler',
+    'JobManager': 'jobs',
+    'get_job_manager': 'jobs',
+    'get_prompt': 'prompts',
+    'get_analysis_types': 'prompts',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
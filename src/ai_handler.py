@@ -3,130 +3,682 @@ AI Handler for OpenAI and Gemini integration
 """
 import base64
 import os
-from typing import List, Dict, Any
-import openai
-import google.generativeai as genai
-from PIL import Image
-import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Iterator, Tuple, Callable
+
+from .config import (
+    DETERMINISTIC_SEED, MAX_OUTPUT_TOKENS, HEDGE_PERCENTILE, HEDGE_DEFAULT_DELAY_SECONDS,
+    HEDGE_MIN_DELAY_SECONDS, HEDGE_MIN_SAMPLES, PROVIDER_REQUEST_LIMITS,
+    MAP_REDUCE_PAGES_PER_CHUNK, MAP_REDUCE_MAX_CONCURRENCY, ANALYZE_ALL_MAX_CONCURRENCY, RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS, RETRY_DEADLINE_SECONDS,
+    PROVIDER_RATE_LIMITS
+)
+from .prompts import (
+    build_prompt_layout, build_extraction_prompt, build_page_context, build_reduce_prompt
+)
+from .client_pool import ClientPool, get_client_pool, hash_api_key
+from .utils.retry import RetryPolicy, call_with_retry, get_rate_limiter
+from .utils.result_cache import ResultCache, make_cache_key
+from .utils.latency_tracker import LatencyTracker
+from .utils.cost_estimator import estimate_analysis
+from .utils.image_utils import get_image_info, detect_mime_type
+
+
+# Time-to-first-token samples shared by every handler in the process
+latency_tracker = LatencyTracker()
+
+
+def _openai_usage(usage: Any) -> Optional[Dict[str, int]]:
+    """Token usage (including prompt-cache hits) from an OpenAI response."""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "completion_tokens": usage.completion_tokens or 0,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+    }
+
+
+def _gemini_usage(usage_metadata: Any) -> Optional[Dict[str, int]]:
+    """Token usage (including context-cache hits) from a Gemini response."""
+    if usage_metadata is None:
+        return None
+    return {
+        "prompt_tokens": getattr(usage_metadata, "prompt_token_count", 0) or 0,
+        "completion_tokens": getattr(usage_metadata, "candidates_token_count", 0) or 0,
+        "cached_tokens": getattr(usage_metadata, "cached_content_token_count", 0) or 0,
+    }
+
+
+# Gemini finish reasons in OpenAI's vocabulary ('length' means the output was cut off)
+GEMINI_FINISH_REASONS = {"STOP": "stop", "MAX_TOKENS": "length"}
+
+
+def _gemini_finish_reason(response: Any) -> Optional[str]:
+    """Finish reason of a Gemini response (or stream chunk), None while it is unfinished."""
+    candidates = getattr(response, "candidates", None)
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    name = getattr(reason, "name", None)
+    if not name or name == "FINISH_REASON_UNSPECIFIED":
+        return None
+    return GEMINI_FINISH_REASONS.get(name, name.lower())
+
+
+class PreparedImages(list):
+    """
+    Image bytes plus their provider-ready encodings.
+    
+    Behaves like the list of bytes it wraps. Encodings (base64 data URLs,
+    Gemini blobs, image sizes) are computed on first use and shared by every
+    request made with the same instance, e.g. all analyses of one document set.
+    """
+    
+    def __init__(self, images: List[bytes], sizes: Optional[List[Tuple[int, int]]] = None):
+        """
+        Initialize Prepared Images.
+        
+        Args:
+            images: Image bytes
+            sizes: (width, height) per image, if already known (e.g. from
+                ingestion), so they are never read from the bytes
+        """
+        super().__init__(images)
+        self._encodings = {}
+        if sizes is not None:
+            self._encodings["sizes"] = list(sizes)
+        self._lock = threading.Lock()
+    
+    def pages(self, start: int, stop: int) -> "PreparedImages":
+        """Images start:stop as a new instance, keeping their known sizes."""
+        with self._lock:
+            sizes = self._encodings.get("sizes")
+        return PreparedImages(self[start:stop], sizes[start:stop] if sizes is not None else None)
+    
+    def encoded(self, kind: str, build: Callable[[List[bytes]], list]) -> list:
+        """Return the encoding named kind, building it once."""
+        with self._lock:
+            if kind not in self._encodings:
+                self._encodings[kind] = build(list(self))
+            return self._encodings[kind]
+
+
+class RequestCancellation(threading.Event):
+    """
+    Cancels one in-flight request from another thread.
+    
+    Once cancelled, retries stop and the provider stream registered with
+    on_cancel is closed, so a request still waiting for its first token
+    gives up its connection and its worker thread right away.
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self._closers = []
+        self._closers_lock = threading.Lock()
+    
+    def on_cancel(self, closer: Callable[[], None]):
+        """Register a callable that releases the request (called at once if already cancelled)."""
+        with self._closers_lock:
+            if not self.is_set():
+                self._closers.append(closer)
+                return
+        closer()
+    
+    def cancel(self):
+        """Cancel the request and close everything registered with on_cancel."""
+        with self._closers_lock:
+            self.set()
+            closers, self._closers = self._closers, []
+        for closer in closers:
+            try:
+                closer()
+            except Exception:
+                # Closing a stream that is being read may raise; the reader stops either way
+                pass
 
 
 class AIHandler:
-    """Handles interactions with OpenAI and Gemini APIs."""
+    """Handles interactions with OpenAI and Gemini APIs (and the mock provider)."""
     
-    def __init__(self, provider: str, model: str, api_key: str):
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        api_key: str,
+        cache: Optional[ResultCache] = None,
+        deterministic: bool = False,
+        hedge: Optional["AIHandler"] = None,
+        hedge_percentile: float = HEDGE_PERCENTILE,
+        client_pool: Optional[ClientPool] = None,
+        retry_policy: Optional[RetryPolicy] = None,
+        detail_budget_usd: Optional[float] = None,
+        mock_options: Optional[Dict[str, Any]] = None
+    ):
         """
         Initialize AI Handler.
         
         Args:
-            provider: 'openai' or 'gemini'
-            model: Model identifier
-            api_key: API key for the service
+            provider: 'openai', 'gemini' or 'mock'
+            model: Model identifier (a MOCK_PROFILES name for the mock provider)
+            api_key: API key for the service (ignored by the mock provider)
+            cache: Optional result cache consulted before calling the provider
+            deterministic: Use temperature 0 (and a fixed seed where supported)
+            hedge: Optional secondary handler. If the primary has not produced
+                a first token within the hedge deadline, the same request is
+                sent to the secondary and the first to finish wins.
+            hedge_percentile: Percentile of observed time-to-first-token used
+                as the hedge deadline
+            client_pool: Client registry to draw from (defaults to the
+                process-wide pool, so connections survive across handlers)
+            retry_policy: Backoff settings for retryable provider errors
+                (defaults to the RETRY_* values in config)
+            detail_budget_usd: Optional cost budget per request; OpenAI images
+                are switched from high to low detail until the estimate fits
+            mock_options: Overrides for the mock provider's latency and
+                fault-injection profile (see MockClient)
         """
         self.provider = provider.lower()
         self.model = model
         self.api_key = api_key
+        self.cache = cache
+        self.deterministic = deterministic
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.client_pool = client_pool
+        self.detail_budget_usd = detail_budget_usd
+        self.mock_options = mock_options or {}
+        self.last_result = None
+        self.retry_policy = retry_policy or RetryPolicy(
+            max_attempts=RETRY_MAX_ATTEMPTS,
+            base_delay=RETRY_BASE_DELAY_SECONDS,
+            max_delay=RETRY_MAX_DELAY_SECONDS,
+            deadline=RETRY_DEADLINE_SECONDS
+        )
+        self._stats_lock = threading.Lock()
         
-        if self.provider == 'openai':
-            openai.api_key = api_key
-            self.client = openai.OpenAI(api_key=api_key)
-        elif self.provider == 'gemini':
-            genai.configure(api_key=api_key)
-            # Pass the model name directly from config. The SDK handles the rest.
-            self.client = genai.GenerativeModel(model)
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
+        self.client = self._create_client()
+        
+        # Requests and tokens per minute are paced per provider and API key
+        self.rate_limiter = get_rate_limiter(
+            f"{self.provider}:{hash_api_key(api_key)}",
+            **PROVIDER_RATE_LIMITS[self.provider]
+        )
+    
+    def _create_client(self):
+        """Fetch the provider client from the process-wide pool."""
+        if self.provider == 'mock':
+            return self._create_mock_client()
+        
+        if self.provider not in ('openai', 'gemini'):
+            raise ValueError(f"Unsupported provider: {self.provider}")
+        
+        pool = self.client_pool or get_client_pool()
+        return pool.get(self.provider, self.model, self.api_key)
+    
+    def _create_mock_client(self):
+        """Create a mock client (cheap and stateful, so never pooled)."""
+        # Imported here so the canned analyses are only loaded in Debug Mode
+        from .mock_provider import MockClient
+        
+        seed = DETERMINISTIC_SEED if self.deterministic else None
+        return MockClient(self.model, seed=seed, **self.mock_options)
     
     def encode_image(self, image_bytes: bytes) -> str:
         """Encode image to base64 string."""
         return base64.b64encode(image_bytes).decode('utf-8')
     
-    def analyze_with_openai(self, images: List[bytes], prompt: str) -> str:
+    def _generation_settings(self) -> Dict[str, Any]:
+        """Provider-specific generation settings (also part of the cache key)."""
+        temperature = 0.0 if self.deterministic else 0.2
+        
+        if self.provider == 'openai':
+            settings = {"max_tokens": MAX_OUTPUT_TOKENS["openai"], "temperature": temperature}
+            if self.deterministic:
+                settings["seed"] = DETERMINISTIC_SEED
+            return settings
+        
+        if self.provider == 'mock':
+            return {"max_tokens": MAX_OUTPUT_TOKENS["mock"], "temperature": temperature}
+        
+        # Gemini has no seed parameter; greedy decoding is the closest equivalent
+        settings = {"temperature": temperature, "max_output_tokens": MAX_OUTPUT_TOKENS["gemini"]}
+        if self.deterministic:
+            settings["top_k"] = 1
+        return settings
+    
+    def _estimate_tokens(self, images: List[bytes], prompt: str) -> int:
+        """Rough token cost of one request, used for client-side pacing."""
+        settings = self._generation_settings()
+        output_budget = settings.get("max_tokens") or settings.get("max_output_tokens", 0)
+        return len(prompt) // 4 + 765 * len(images) + output_budget
+    
+    def _call_provider(self, fn, images: List[bytes], prompt: str,
+                       request_stats: Optional[Dict[str, Any]] = None,
+                       cancellation: Optional[RequestCancellation] = None):
+        """
+        Run a provider call through the rate limiter and retry policy.
+        
+        Args:
+            fn: Zero-argument callable performing the request
+            images: Images in the request (for token estimation)
+            prompt: Prompt text in the request (for token estimation)
+            request_stats: Optional dict whose 'retries' counter is incremented per retry
+            cancellation: Optional cancellation that stops further retries
+        """
+        return call_with_retry(
+            fn,
+            self.retry_policy,
+            limiter=self.rate_limiter,
+            tokens=self._estimate_tokens(images, prompt),
+            on_retry=self._retry_counter(request_stats),
+            cancel=cancellation
+        )
+    
+    def _retry_counter(self, request_stats: Optional[Dict[str, Any]]):
+        """Build an on_retry callback that counts retries into request_stats."""
+        def on_retry(attempt: int, error: BaseException, delay: float):
+            if request_stats is not None:
+                with self._stats_lock:
+                    request_stats["retries"] = request_stats.get("retries", 0) + 1
+        return on_retry
+    
+    def _record_usage(self, request_stats: Optional[Dict[str, Any]], usage: Optional[Dict[str, int]]):
+        """Add one response's token usage to request_stats['usage']."""
+        if request_stats is None or usage is None:
+            return
+        with self._stats_lock:
+            totals = request_stats.setdefault(
+                "usage", {"prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0}
+            )
+            for name, count in usage.items():
+                totals[name] = totals.get(name, 0) + count
+    
+    def _record_finish_reason(self, request_stats: Optional[Dict[str, Any]], reason: Optional[str]):
+        """
+        Store why a response ended in request_stats['finish_reason'].
+        
+        A truncated response ('length') marks the whole result as truncated,
+        even if later requests of a map-reduce finished normally.
+        """
+        if request_stats is None or not reason:
+            return
+        with self._stats_lock:
+            if request_stats.get("finish_reason") != "length":
+                request_stats["finish_reason"] = reason
+    
+    def estimate(self, images: List[bytes], prompt: str) -> Dict[str, Any]:
+        """
+        Pre-flight estimate of tokens, cost and latency for a request.
+        
+        Args:
+            images: List of image bytes
+            prompt: Full prompt text that will be sent
+            
+        Returns:
+            Estimate dict from estimate_analysis (includes per-image detail)
+        """
+        return estimate_analysis(
+            self._image_sizes(images),
+            prompt,
+            self.provider,
+            self.model,
+            max_output_tokens=MAX_OUTPUT_TOKENS[self.provider],
+            budget_usd=self.detail_budget_usd
+        )
+    
+    def _image_sizes(self, images: List[bytes]) -> List[Tuple[int, int]]:
+        """(width, height) per image, read from the bytes once per PreparedImages."""
+        def read_sizes(raw_images: List[bytes]) -> List[Tuple[int, int]]:
+            sizes = []
+            for img_bytes in raw_images:
+                info = get_image_info(img_bytes)
+                sizes.append((info.get('width', 2048), info.get('height', 2048)))
+            return sizes
+        
+        return self._encode_images(images, "sizes", read_sizes)
+    
+    def _image_details(self, images: List[bytes], prompt: str) -> List[str]:
+        """OpenAI detail level per image ('high' unless a budget forces 'low')."""
+        if self.detail_budget_usd is None or not images:
+            return ["high"] * len(images)
+        return self.estimate(images, prompt)["details"]
+    
+    def _encode_images(self, images: List[bytes], kind: str, build: Callable[[List[bytes]], list]) -> list:
+        """Provider-ready image encodings, reused when images is a PreparedImages."""
+        if isinstance(images, PreparedImages):
+            return images.encoded(kind, build)
+        return build(images)
+    
+    def _openai_messages(self, images: List[bytes], prompt: str, prefix: str = "") -> List[Dict[str, Any]]:
+        """
+        Build the chat messages for OpenAI.
+        
+        The stable prefix goes into the system message so that requests
+        sharing a template share a cacheable prefix; the variable prompt
+        and the images follow in the user message.
+        """
+        content = [{"type": "text", "text": prompt}]
+        
+        image_urls = self._encode_images(images, "openai", lambda raw_images: [
+            f"data:{detect_mime_type(img_bytes)};base64,{self.encode_image(img_bytes)}"
+            for img_bytes in raw_images
+        ])
+        details = self._image_details(images, f"{prefix}\n\n{prompt}")
+        for image_url, detail in zip(image_urls, details):
+            content.append({
+                "type": "image_url",
+                "image_url": {
+                    "url": image_url,
+                    "detail": detail
+                }
+            })
+        
+        messages = []
+        if prefix:
+            messages.append({"role": "system", "content": prefix})
+        messages.append({
+            "role": "user",
+            "content": content
+        })
+        return messages
+    
+    def analyze_with_openai(self, images: List[bytes], prompt: str,
+                               request_stats: Optional[Dict[str, Any]] = None,
+                               prefix: str = "",
+                               cancellation: Optional[RequestCancellation] = None) -> str:
         """
         Analyze images using OpenAI's vision models.
         
         Args:
             images: List of image bytes
             prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt (system message)
+            cancellation: Optional cancellation; no further attempt is made once set
             
         Returns:
             Analysis result as string
         """
         try:
-            # Prepare messages with images
-            content = [{"type": "text", "text": prompt}]
-            
-            for img_bytes in images:
-                base64_image = self.encode_image(img_bytes)
-                content.append({
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{base64_image}",
-                        "detail": "high"
-                    }
-                })
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ],
-                max_tokens=4096,
-                temperature=0.2
+            response = self._call_provider(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._openai_messages(images, prompt, prefix),
+                    **self._generation_settings()
+                ),
+                images, prefix + prompt, request_stats, cancellation
             )
             
+            self._record_usage(request_stats, _openai_usage(response.usage))
+            self._record_finish_reason(request_stats, response.choices[0].finish_reason)
             return response.choices[0].message.content
             
         except Exception as e:
             raise Exception(f"OpenAI API Error: {str(e)}")
     
-    def analyze_with_gemini(self, images: List[bytes], prompt: str) -> str:
+    def stream_with_openai(self, images: List[bytes], prompt: str,
+                              request_stats: Optional[Dict[str, Any]] = None,
+                              prefix: str = "",
+                              cancellation: Optional[RequestCancellation] = None) -> Iterator[str]:
+        """
+        Stream an analysis from OpenAI's vision models.
+        
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt (system message)
+            cancellation: Optional cancellation that closes the stream from another thread
+            
+        Yields:
+            Text chunks as they arrive
+        """
+        try:
+            # Only opening the stream is retried; a failure mid-stream is surfaced
+            stream = self._call_provider(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._openai_messages(images, prompt, prefix),
+                    stream=True,
+                    stream_options={"include_usage": True},
+                    **self._generation_settings()
+                ),
+                images, prefix + prompt, request_stats, cancellation
+            )
+            if cancellation is not None:
+                cancellation.on_cancel(stream.close)
+            
+            try:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+                    if chunk.choices:
+                        self._record_finish_reason(request_stats, chunk.choices[0].finish_reason)
+                    # Usage arrives on a final chunk without choices
+                    if getattr(chunk, "usage", None) is not None:
+                        self._record_usage(request_stats, _openai_usage(chunk.usage))
+            finally:
+                # Release the HTTP connection even when the consumer stops early
+                stream.close()
+                    
+        except Exception as e:
+            raise Exception(f"OpenAI API Error: {str(e)}")
+    
+    def _gemini_content(self, images: List[bytes], prompt: str, prefix: str = "") -> list:
+        """Build the content list (prefix, prompt, then images) for Gemini."""
+        content = [prefix, prompt] if prefix else [prompt]
+        
+        # Inline blobs are sent as they are; PIL images would be re-encoded on every request
+        content.extend(self._encode_images(images, "gemini", lambda raw_images: [
+            {"mime_type": detect_mime_type(img_bytes), "data": img_bytes}
+            for img_bytes in raw_images
+        ]))
+        
+        return content
+    
+    def analyze_with_gemini(self, images: List[bytes], prompt: str,
+                               request_stats: Optional[Dict[str, Any]] = None,
+                               prefix: str = "",
+                               cancellation: Optional[RequestCancellation] = None) -> str:
         """
         Analyze images using Google's Gemini models.
         
         Args:
             images: List of image bytes
             prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+            cancellation: Optional cancellation; no further attempt is made once set
             
         Returns:
             Analysis result as string
         """
         try:
-            # Prepare content with images
-            content = [prompt]
-            
-            for img_bytes in images:
-                # Convert bytes to PIL Image
-                image = Image.open(io.BytesIO(img_bytes))
-                content.append(image)
-            
             # Generate response
-            response = self.client.generate_content(
-                content,
-                generation_config={
-                    "temperature": 0.2,
-                    "max_output_tokens": 8192,
-                }
+            response = self._call_provider(
+                lambda: self.client.generate_content(
+                    self._gemini_content(images, prompt, prefix),
+                    generation_config=self._generation_settings()
+                ),
+                images, prefix + prompt, request_stats, cancellation
             )
             
+            self._record_usage(request_stats, _gemini_usage(getattr(response, "usage_metadata", None)))
+            self._record_finish_reason(request_stats, _gemini_finish_reason(response))
             return response.text
             
         except Exception as e:
             raise Exception(f"Gemini API Error: {str(e)}")
     
-    def analyze(self, images: List[bytes], prompt: str, role: str = "Analyst") -> Dict[str, Any]:
+    def _open_gemini_stream(self, images: List[bytes], prompt: str, prefix: str,
+                            cancellation: Optional[RequestCancellation]):
         """
-        Main analysis method that routes to appropriate provider.
+        generate_content(stream=True), opened in two steps.
+        
+        The SDK call blocks until the first chunk arrives, so the stream is
+        opened on the underlying client instead (which returns at once, see
+        create_client) and handed to cancellation before that wait.
+        """
+        from google.generativeai.types import generation_types
+        
+        request = self.client._prepare_request(
+            contents=self._gemini_content(images, prompt, prefix),
+            generation_config=self._generation_settings(),
+            tools=None,
+            tool_config=None
+        )
+        if request.contents and not request.contents[-1].role:
+            request.contents[-1].role = "user"
+        
+        with generation_types.rewrite_stream_error():
+            iterator = self.client._client.stream_generate_content(request)
+        if cancellation is not None and hasattr(iterator, "cancel"):
+            cancellation.on_cancel(iterator.cancel)
+        return generation_types.GenerateContentResponse.from_iterator(iterator)
+    
+    def stream_with_gemini(self, images: List[bytes], prompt: str,
+                              request_stats: Optional[Dict[str, Any]] = None,
+                              prefix: str = "",
+                              cancellation: Optional[RequestCancellation] = None) -> Iterator[str]:
+        """
+        Stream an analysis from Google's Gemini models.
         
         Args:
             images: List of image bytes
             prompt: Analysis prompt
-            role: User role (for context)
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+            cancellation: Optional cancellation that closes the stream from another thread
+            
+        Yields:
+            Text chunks as they arrive
+        """
+        try:
+            response = self._call_provider(
+                lambda: self._open_gemini_stream(images, prompt, prefix, cancellation),
+                images, prefix + prompt, request_stats, cancellation
+            )
+            
+            usage = None
+            for chunk in response:
+                # Every chunk carries running totals; the last one is final
+                usage = _gemini_usage(getattr(chunk, "usage_metadata", None)) or usage
+                self._record_finish_reason(request_stats, _gemini_finish_reason(chunk))
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. a final safety/finish chunk)
+                    continue
+                if text:
+                    yield text
+            self._record_usage(request_stats, usage)
+                    
+        except Exception as e:
+            raise Exception(f"Gemini API Error: {str(e)}")
+    
+    def analyze_with_mock(self, images: List[bytes], prompt: str,
+                          request_stats: Optional[Dict[str, Any]] = None,
+                          prefix: str = "",
+                          cancellation: Optional[RequestCancellation] = None) -> str:
+        """
+        Analyze images with the mock provider (canned analysis, simulated latency and faults).
+        
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+            cancellation: Optional cancellation; no further attempt is made once set
             
         Returns:
-            Dictionary containing analysis results and metadata
+            Analysis result as string
+        """
+        try:
+            response = self._call_provider(
+                lambda: self.client.complete(
+                    prompt, prefix, len(images), self._generation_settings()["max_tokens"]
+                ),
+                images, prefix + prompt, request_stats, cancellation
+            )
+            
+            self._record_usage(request_stats, response.usage)
+            self._record_finish_reason(request_stats, response.finish_reason)
+            return response.text
+            
+        except Exception as e:
+            raise Exception(f"Mock API Error: {str(e)}")
+    
+    def stream_with_mock(self, images: List[bytes], prompt: str,
+                         request_stats: Optional[Dict[str, Any]] = None,
+                         prefix: str = "",
+                         cancellation: Optional[RequestCancellation] = None) -> Iterator[str]:
+        """
+        Stream an analysis from the mock provider at its configured token rate.
+        
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+            cancellation: Optional cancellation that closes the stream from another thread
+            
+        Yields:
+            Text chunks as they are "generated"
+        """
+        try:
+            stream = self._call_provider(
+                lambda: self.client.stream(
+                    prompt, prefix, len(images), self._generation_settings()["max_tokens"]
+                ),
+                images, prefix + prompt, request_stats, cancellation
+            )
+            if cancellation is not None:
+                cancellation.on_cancel(stream.close)
+            
+            try:
+                yield from stream
+            finally:
+                stream.close()
+            self._record_usage(request_stats, stream.response.usage)
+            self._record_finish_reason(request_stats, stream.response.finish_reason)
+            
+        except Exception as e:
+            raise Exception(f"Mock API Error: {str(e)}")
+    
+    def _cache_key(self, images: List[bytes], prefix: str, prompt: str, role: str,
+                   **extra: Any) -> Optional[str]:
+        """Content-addressed cache key for a request, or None when caching is off."""
+        if self.cache is None:
+            return None
+        
+        return make_cache_key(
+            images,
+            prefix=prefix,
+            prompt=prompt,
+            role=role,
+            provider=self.provider,
+            model=self.model,
+            settings=self._generation_settings(),
+            detail_budget_usd=self.detail_budget_usd,
+            **extra
+        )
+    
+    def _prepare_request(self, images: List[bytes], prompt: str, role: str,
+                         **key_extra: Any) -> Tuple[str, str, Optional[str]]:
+        """
+        Validate inputs and build the prompt layout and cache key.
+        
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            role: User role
+            **key_extra: Additional settings that distinguish the request in the cache
+        
+        Returns:
+            Tuple of (prefix, variable_prompt, cache_key or None when caching is off)
         """
         if not images:
             raise ValueError("No images provided for analysis")
@@ -134,21 +686,428 @@ class AIHandler:
         if not prompt:
             raise ValueError("No prompt provided for analysis")
         
-        # Add role context to prompt
-        enhanced_prompt = f"[User Role: {role}]\n\n{prompt}"
+        # Stable instructions first, role and custom edits after them, so the
+        # prefix stays identical across roles and can hit the provider cache
+        prefix, variable_prompt = build_prompt_layout(prompt, role)
         
-        # Route to appropriate provider
-        if self.provider == 'openai':
-            analysis_text = self.analyze_with_openai(images, enhanced_prompt)
-        elif self.provider == 'gemini':
-            analysis_text = self.analyze_with_gemini(images, enhanced_prompt)
-        else:
-            raise ValueError(f"Unknown provider: {self.provider}")
+        return prefix, variable_prompt, self._cache_key(images, prefix, variable_prompt, role, **key_extra)
+    
+    def _lookup_cache(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return a cached result marked as such, or None."""
+        if cache_key is None:
+            return None
         
-        return {
+        cached_result = self.cache.get(cache_key)
+        if cached_result is not None:
+            cached_result["cached"] = True
+            cached_result["retries"] = 0
+            cached_result.pop("usage", None)
+        return cached_result
+    
+    def _build_result(self, analysis_text: str, role: str, image_count: int,
+                      cache_key: Optional[str], **metadata: Any) -> Dict[str, Any]:
+        """Assemble the result dict and store it in the cache."""
+        result = {
             "analysis": analysis_text,
             "provider": self.provider,
             "model": self.model,
             "role": role,
-            "image_count": len(images)
+            "image_count": image_count,
+            **metadata
         }
+        
+        # A cut-off analysis is not cached, so asking again gets a fresh attempt
+        if cache_key is not None and result.get("finish_reason") != "length":
+            self.cache.set(cache_key, result)
+        
+        return result
+    
+    def analyze(self, images: List[bytes], prompt: str, role: str = "Analyst",
+                cancellation: Optional[RequestCancellation] = None) -> Dict[str, Any]:
+        """
+        Main analysis method that routes to appropriate provider.
+        
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            role: User role (for context)
+            cancellation: Optional cancellation (e.g. of the job running the
+                analysis); once set, retries and rate-limiter waits stop
+            
+        Returns:
+            Dictionary containing analysis results and metadata
+        """
+        prefix, variable_prompt, cache_key = self._prepare_request(images, prompt, role)
+        
+        cached_result = self._lookup_cache(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
+        if self.hedge is not None:
+            return self._analyze_hedged(images, prefix, variable_prompt, role, cache_key, cancellation)
+        
+        request_stats = {"retries": 0}
+        analysis_text = self._complete(images, variable_prompt, request_stats, prefix, cancellation)
+        
+        return self._build_result(analysis_text, role, len(images), cache_key, **request_stats)
+    
+    def _complete(self, images: List[bytes], prompt: str,
+                  request_stats: Optional[Dict[str, Any]] = None, prefix: str = "",
+                  cancellation: Optional[RequestCancellation] = None) -> str:
+        """Route a single blocking request to the configured provider."""
+        if self.provider == 'openai':
+            return self.analyze_with_openai(images, prompt, request_stats, prefix, cancellation)
+        elif self.provider == 'gemini':
+            return self.analyze_with_gemini(images, prompt, request_stats, prefix, cancellation)
+        elif self.provider == 'mock':
+            return self.analyze_with_mock(images, prompt, request_stats, prefix, cancellation)
+        else:
+            raise ValueError(f"Unknown provider: {self.provider}")
+    
+    def analyze_all(
+        self,
+        images: List[bytes],
+        prompts: Dict[str, str],
+        role: str = "Analyst",
+        max_concurrency: int = ANALYZE_ALL_MAX_CONCURRENCY,
+        pages_per_chunk: Optional[int] = None,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        cancellation: Optional[RequestCancellation] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run several analyses of the same images concurrently.
+        
+        The images are encoded once and shared by all requests, so the batch
+        takes about as long as its slowest analysis.
+        
+        Args:
+            images: List of image bytes
+            prompts: Mapping of analysis name to prompt
+            role: User role (for context)
+            max_concurrency: Maximum analyses in flight
+            pages_per_chunk: Use map-reduce with this page group size
+            on_result: Optional callback(name, result) as each analysis finishes
+            cancellation: Optional cancellation shared by all the analyses
+            
+        Returns:
+            Results keyed by analysis name, in the order of prompts. An
+            analysis that fails yields a dict with an 'error' key instead of
+            aborting the others.
+        """
+        prepared = images if isinstance(images, PreparedImages) else PreparedImages(images)
+        
+        def run(name: str, prompt: str) -> Dict[str, Any]:
+            try:
+                if pages_per_chunk:
+                    result = self.analyze_map_reduce(
+                        prepared, prompt, role, pages_per_chunk=pages_per_chunk, cancellation=cancellation
+                    )
+                else:
+                    result = self.analyze(prepared, prompt, role, cancellation)
+            except Exception as e:
+                result = {
+                    "error": str(e),
+                    "provider": self.provider,
+                    "model": self.model,
+                    "role": role,
+                    "image_count": len(prepared)
+                }
+            if on_result is not None:
+                on_result(name, result)
+            return result
+        
+        workers = max(1, min(max_concurrency, len(prompts)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(run, name, prompt) for name, prompt in prompts.items()}
+        
+        return {name: future.result() for name, future in futures.items()}
+    
+    def split_images(self, images: List[bytes], pages_per_chunk: Optional[int] = None) -> List[Tuple[int, int, List[bytes]]]:
+        """
+        Split pages into groups that each fit in one provider request.
+        
+        Args:
+            images: List of image bytes in page order
+            pages_per_chunk: Optional cap on pages per group
+            
+        Returns:
+            List of (first_page, last_page, images) tuples with 1-based page numbers
+        """
+        limits = PROVIDER_REQUEST_LIMITS.get(self.provider, {})
+        max_bytes = limits.get("max_request_bytes", float("inf"))
+        max_images = min(pages_per_chunk or float("inf"), limits.get("max_images", float("inf")))
+        
+        chunks = []
+        current, current_bytes, first_page = [], 0, 1
+        for page, img_bytes in enumerate(images, start=1):
+            # Images travel base64-encoded, which inflates them by 4/3
+            encoded_size = 4 * ((len(img_bytes) + 2) // 3)
+            if current and (len(current) >= max_images or current_bytes + encoded_size > max_bytes):
+                chunks.append((first_page, page - 1, current))
+                current, current_bytes, first_page = [], 0, page
+            current.append(img_bytes)
+            current_bytes += encoded_size
+        if current:
+            chunks.append((first_page, len(images), current))
+        
+        if isinstance(images, PreparedImages):
+            chunks = [(first, last, images.pages(first - 1, last)) for first, last, _ in chunks]
+        return chunks
+    
+    def exceeds_request_limit(self, images: List[bytes]) -> bool:
+        """Whether the images are too large to send in a single request."""
+        return len(self.split_images(images)) > 1
+    
+    def analyze_map_reduce(
+        self,
+        images: List[bytes],
+        prompt: str,
+        role: str = "Analyst",
+        pages_per_chunk: int = MAP_REDUCE_PAGES_PER_CHUNK,
+        max_concurrency: int = MAP_REDUCE_MAX_CONCURRENCY,
+        on_progress: Optional[Callable[[int, int], None]] = None,
+        cancellation: Optional[RequestCancellation] = None
+    ) -> Dict[str, Any]:
+        """
+        Analyze a large document page group by page group, then merge the findings.
+        
+        Each page group is sent concurrently with a short extraction prompt
+        derived from the template; a final text-only call merges the
+        per-group findings into the structure the prompt asks for.
+        
+        Args:
+            images: List of image bytes in page order
+            prompt: Analysis prompt
+            role: User role (for context)
+            pages_per_chunk: Maximum pages per extraction request
+            max_concurrency: Maximum extraction requests in flight
+            on_progress: Optional callback(completed_calls, total_calls),
+                invoked after each extraction and after the final merge
+            cancellation: Optional cancellation; once set, page groups not
+                yet sent and the final merge are skipped
+            
+        Returns:
+            Dictionary containing analysis results and metadata
+        """
+        prefix, variable_prompt, cache_key = self._prepare_request(
+            images, prompt, role, mode="map_reduce", pages_per_chunk=pages_per_chunk
+        )
+        
+        cached_result = self._lookup_cache(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
+        chunks = self.split_images(images, pages_per_chunk)
+        if len(chunks) == 1:
+            return self.analyze(images, prompt, role, cancellation)
+        
+        request_stats = {"retries": 0}
+        
+        # Every page group shares the extraction instructions as its prefix
+        extraction_prefix = build_extraction_prompt(prompt)
+        
+        total_calls = len(chunks) + 1
+        completed = [0]
+        
+        def report_progress():
+            if on_progress is not None:
+                with self._stats_lock:
+                    completed[0] += 1
+                    done = completed[0]
+                on_progress(done, total_calls)
+        
+        def extract(chunk: Tuple[int, int, List[bytes]]) -> str:
+            first_page, last_page, chunk_images = chunk
+            page_context = build_page_context(first_page, last_page, len(images))
+            text = self._complete(
+                chunk_images, f"[User Role: {role}]\n\n{page_context}", request_stats, extraction_prefix,
+                cancellation
+            )
+            report_progress()
+            return text
+        
+        # Wall-clock time is bounded by the slowest group, not the page count
+        workers = max(1, min(max_concurrency, len(chunks)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            extracted = list(executor.map(extract, chunks))
+        
+        findings = [
+            (f"page {first}" if first == last else f"pages {first}-{last}", text)
+            for (first, last, _), text in zip(chunks, extracted)
+        ]
+        analysis_text = self._complete(
+            [], build_reduce_prompt(variable_prompt, findings), request_stats, prefix, cancellation
+        )
+        report_progress()
+        
+        return self._build_result(
+            analysis_text, role, len(images), cache_key,
+            map_reduce={"chunks": len(chunks), "pages_per_chunk": pages_per_chunk},
+            **request_stats
+        )
+    
+    def _stream_provider(self, images: List[bytes], prompt: str,
+                         request_stats: Optional[Dict[str, Any]] = None, prefix: str = "",
+                         cancellation: Optional[RequestCancellation] = None) -> Iterator[str]:
+        """Route a streaming request to the configured provider."""
+        if self.provider == 'openai':
+            return self.stream_with_openai(images, prompt, request_stats, prefix, cancellation)
+        elif self.provider == 'gemini':
+            return self.stream_with_gemini(images, prompt, request_stats, prefix, cancellation)
+        elif self.provider == 'mock':
+            return self.stream_with_mock(images, prompt, request_stats, prefix, cancellation)
+        else:
+            raise ValueError(f"Unknown provider: {self.provider}")
+    
+    def hedge_deadline(self) -> float:
+        """Seconds to wait for the primary's first token before hedging."""
+        if latency_tracker.sample_count(self.provider, self.model) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY_SECONDS
+        observed = latency_tracker.percentile(self.provider, self.model, self.hedge_percentile)
+        return max(HEDGE_MIN_DELAY_SECONDS, observed)
+    
+    def _run_contender(self, images: List[bytes], prefix: str, prompt: str,
+                       first_token: threading.Event, cancellation: RequestCancellation,
+                       request_stats: Dict[str, Any]) -> Optional[str]:
+        """
+        Stream one hedged attempt to completion.
+        
+        Returns:
+            The full analysis text, or None if the attempt was cancelled
+        """
+        start = time.monotonic()
+        chunks = []
+        stream = self._stream_provider(images, prompt, request_stats, prefix, cancellation)
+        try:
+            for chunk in stream:
+                if not chunks:
+                    latency_tracker.record(self.provider, self.model, time.monotonic() - start)
+                    first_token.set()
+                if cancellation.is_set():
+                    return None
+                chunks.append(chunk)
+        except Exception:
+            # A stream closed by the other contender's win surfaces as an error
+            if cancellation.is_set():
+                return None
+            raise
+        finally:
+            # Closing the generator closes the provider stream
+            stream.close()
+        return None if cancellation.is_set() else "".join(chunks)
+    
+    def _analyze_hedged(self, images: List[bytes], prefix: str, prompt: str, role: str,
+                        cache_key: Optional[str],
+                        cancellation: Optional[RequestCancellation] = None) -> Dict[str, Any]:
+        """
+        Send the request to the primary and, past the hedge deadline, also to the secondary.
+        
+        The first contender to finish wins. The other one is cancelled: its
+        stream is closed from here, so it stops even before its first token.
+        Each contender counts retries and usage separately; the result
+        reports the winner's. Cancelling cancellation cancels both.
+        """
+        deadline = self.hedge_deadline()
+        contenders = {}
+        executor = ThreadPoolExecutor(max_workers=2)
+        
+        def launch(handler: "AIHandler", label: str):
+            first_token, contender_cancellation = threading.Event(), RequestCancellation()
+            if cancellation is not None:
+                cancellation.on_cancel(contender_cancellation.cancel)
+            request_stats = {"retries": 0}
+            future = executor.submit(
+                handler._run_contender, images, prefix, prompt, first_token, contender_cancellation, request_stats
+            )
+            contenders[future] = (handler, label, contender_cancellation, request_stats)
+            return future, first_token
+        
+        try:
+            primary, primary_first_token = launch(self, "primary")
+            
+            # Hedge if no first token arrives in time (or the primary fails outright)
+            waited = 0.0
+            while not primary_first_token.is_set() and not primary.done() and waited < deadline:
+                primary_first_token.wait(0.05)
+                waited += 0.05
+            
+            hedged = not primary_first_token.is_set() and (
+                not primary.done() or primary.exception() is not None
+            )
+            if hedged:
+                launch(self.hedge, "secondary")
+            
+            pending = set(contenders)
+            errors = []
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        errors.append(future.exception())
+                        continue
+                    
+                    winner, label, _, request_stats = contenders[future]
+                    for other, (_, _, loser_cancellation, _) in contenders.items():
+                        if other is not future:
+                            loser_cancellation.cancel()
+                    
+                    if winner is not self:
+                        cache_key = winner._cache_key(images, prefix, prompt, role)
+                    result = winner._build_result(
+                        future.result(), role, len(images), cache_key, **request_stats
+                    )
+                    result["hedge"] = {
+                        "fired": hedged,
+                        "deadline_seconds": round(deadline, 2),
+                        "winner": label
+                    }
+                    return result
+            
+            raise errors[-1]
+        finally:
+            for _, _, contender_cancellation, _ in contenders.values():
+                contender_cancellation.cancel()
+            # Cancelled contenders return promptly; only a request still
+            # waiting for its response headers can hold its thread a little longer
+            executor.shutdown(wait=False)
+    
+    def analyze_stream(self, images: List[bytes], prompt: str, role: str = "Analyst",
+                       cancellation: Optional[RequestCancellation] = None) -> Iterator[str]:
+        """
+        Streaming variant of analyze().
+        
+        Yields text chunks as the provider produces them. When the generator
+        is exhausted, the full result dict (same shape as analyze()) is
+        available as the generator's return value and as self.last_result.
+        
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            role: User role (for context)
+            cancellation: Optional cancellation that closes the stream from
+                another thread, even before its first chunk
+            
+        Yields:
+            Text chunks of the analysis
+        """
+        self.last_result = None
+        prefix, variable_prompt, cache_key = self._prepare_request(images, prompt, role)
+        
+        cached_result = self._lookup_cache(cache_key)
+        if cached_result is not None:
+            self.last_result = cached_result
+            yield cached_result["analysis"]
+            return cached_result
+        
+        request_stats = {"retries": 0}
+        stream = self._stream_provider(images, variable_prompt, request_stats, prefix, cancellation)
+        
+        chunks = []
+        for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        
+        self.last_result = self._build_result(
+            "".join(chunks), role, len(images), cache_key, **request_stats
+        )
+        return self.last_result
@@ -0,0 +1,201 @@
+"""
+Asyncio AI Handler for concurrent OpenAI and Gemini analyses
+"""
+import asyncio
+from typing import List, Dict, Any, Optional, Sequence, Union
+
+from .ai_handler import AIHandler, _openai_usage, _gemini_usage, _gemini_finish_reason
+from .client_pool import create_client
+from .utils.retry import async_call_with_retry
+
+
+class AsyncAIHandler(AIHandler):
+    """Async variant of AIHandler built on openai.AsyncOpenAI and generate_content_async."""
+
+    def _create_client(self):
+        """
+        Create a dedicated async provider client for this handler.
+
+        Async clients are bound to the event loop they first run on, so they
+        are not shared through the process-wide pool.
+        """
+        if self.provider == 'mock':
+            return self._create_mock_client()
+
+        if self.provider not in ('openai', 'gemini'):
+            raise ValueError(f"Unsupported provider: {self.provider}")
+
+        return create_client(self.provider, self.model, self.api_key, asynchronous=True)
+
+    async def _call_provider_async(self, fn, images: List[bytes], prompt: str,
+                                   request_stats: Optional[Dict[str, Any]] = None):
+        """Async counterpart of _call_provider (rate limiter plus retry policy)."""
+        return await async_call_with_retry(
+            fn,
+            self.retry_policy,
+            limiter=self.rate_limiter,
+            tokens=self._estimate_tokens(images, prompt),
+            on_retry=self._retry_counter(request_stats)
+        )
+
+    async def analyze_with_openai_async(self, images: List[bytes], prompt: str,
+                                        request_stats: Optional[Dict[str, Any]] = None,
+                                        prefix: str = "") -> str:
+        """
+        Analyze images using OpenAI's vision models without blocking the event loop.
+
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+
+        Returns:
+            Analysis result as string
+        """
+        try:
+            response = await self._call_provider_async(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._openai_messages(images, prompt, prefix),
+                    **self._generation_settings()
+                ),
+                images, prefix + prompt, request_stats
+            )
+
+            self._record_usage(request_stats, _openai_usage(response.usage))
+            self._record_finish_reason(request_stats, response.choices[0].finish_reason)
+            return response.choices[0].message.content
+
+        except Exception as e:
+            raise Exception(f"OpenAI API Error: {str(e)}")
+
+    async def analyze_with_gemini_async(self, images: List[bytes], prompt: str,
+                                        request_stats: Optional[Dict[str, Any]] = None,
+                                        prefix: str = "") -> str:
+        """
+        Analyze images using Google's Gemini models without blocking the event loop.
+
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+
+        Returns:
+            Analysis result as string
+        """
+        try:
+            response = await self._call_provider_async(
+                lambda: self.client.generate_content_async(
+                    self._gemini_content(images, prompt, prefix),
+                    generation_config=self._generation_settings()
+                ),
+                images, prefix + prompt, request_stats
+            )
+
+            self._record_usage(request_stats, _gemini_usage(getattr(response, "usage_metadata", None)))
+            self._record_finish_reason(request_stats, _gemini_finish_reason(response))
+            return response.text
+
+        except Exception as e:
+            raise Exception(f"Gemini API Error: {str(e)}")
+
+    async def analyze_with_mock_async(self, images: List[bytes], prompt: str,
+                                      request_stats: Optional[Dict[str, Any]] = None,
+                                      prefix: str = "") -> str:
+        """
+        Analyze images with the mock provider without blocking the event loop.
+
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            request_stats: Optional dict collecting retries and token usage for this request
+            prefix: Stable instructions sent ahead of the prompt
+
+        Returns:
+            Analysis result as string
+        """
+        try:
+            response = await self._call_provider_async(
+                lambda: self.client.acomplete(
+                    prompt, prefix, len(images), self._generation_settings()["max_tokens"]
+                ),
+                images, prefix + prompt, request_stats
+            )
+
+            self._record_usage(request_stats, response.usage)
+            self._record_finish_reason(request_stats, response.finish_reason)
+            return response.text
+
+        except Exception as e:
+            raise Exception(f"Mock API Error: {str(e)}")
+
+    async def analyze_async(self, images: List[bytes], prompt: str, role: str = "Analyst") -> Dict[str, Any]:
+        """
+        Async counterpart of analyze().
+
+        Args:
+            images: List of image bytes
+            prompt: Analysis prompt
+            role: User role (for context)
+
+        Returns:
+            Dictionary containing analysis results and metadata
+        """
+        prefix, variable_prompt, cache_key = self._prepare_request(images, prompt, role)
+
+        cached_result = self._lookup_cache(cache_key)
+        if cached_result is not None:
+            return cached_result
+
+        request_stats = {"retries": 0}
+        if self.provider == 'openai':
+            analysis_text = await self.analyze_with_openai_async(images, variable_prompt, request_stats, prefix)
+        elif self.provider == 'gemini':
+            analysis_text = await self.analyze_with_gemini_async(images, variable_prompt, request_stats, prefix)
+        elif self.provider == 'mock':
+            analysis_text = await self.analyze_with_mock_async(images, variable_prompt, request_stats, prefix)
+        else:
+            raise ValueError(f"Unknown provider: {self.provider}")
+
+        return self._build_result(analysis_text, role, len(images), cache_key, **request_stats)
+
+    async def analyze_many(
+        self,
+        jobs: Sequence[Union[tuple, Dict[str, Any]]],
+        max_concurrency: int = 4
+    ) -> List[Dict[str, Any]]:
+        """
+        Run many analyses concurrently.
+
+        Args:
+            jobs: Sequence of (images, prompt, role) tuples or dicts with
+                'images', 'prompt' and optional 'role' keys
+            max_concurrency: Maximum number of requests in flight
+
+        Returns:
+            Results in input order. A job that fails yields a dict with an
+            'error' key instead of aborting the batch.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run_job(job) -> Dict[str, Any]:
+            if isinstance(job, dict):
+                images, prompt, role = job.get('images'), job.get('prompt'), job.get('role', "Analyst")
+            else:
+                images, prompt, role = (tuple(job) + ("Analyst",))[:3]
+
+            async with semaphore:
+                try:
+                    return await self.analyze_async(images, prompt, role)
+                except Exception as e:
+                    return {
+                        "error": str(e),
+                        "provider": self.provider,
+                        "model": self.model,
+                        "role": role,
+                        "image_count": len(images or [])
+                    }
+
+        return list(await asyncio.gather(*(run_job(job) for job in jobs)))
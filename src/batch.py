@@ -0,0 +1,383 @@
+"""
+Headless batch analysis
+Walks a directory of report images, groups them into documents and
+analyzes each document with AIHandler on a worker pool, writing one JSON
+result and one PDF report per document.
+
+Usage:
+    python -m src.batch test_image/ --provider mock
+    python -m src.batch reports/ --provider openai --model gpt-4o --workers 8
+
+Pages are grouped by file name ("annual-report_p1.png", "annual-report_p2.png"
+become the document "annual-report") unless the directory holds a
+manifest.json mapping document names to page paths:
+
+    {"annual-report": ["scans/cover.jpg", "scans/balance-sheet.jpg"]}
+
+Files that match neither are analyzed as single-page documents. A document
+is finished once its JSON file exists, so an interrupted run picks up where
+it stopped when started again with the same arguments. Results the model
+cut off at its output limit are written with "truncated": true, reported as
+truncated and analyzed again by the next run.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from .ai_handler import AIHandler
+from .config import (
+    DEFAULT_MODELS, API_KEY_ENV_VARS, SUPPORTED_FORMATS, MAX_FILE_SIZE_MB, USER_ROLES,
+    MAP_REDUCE_AUTO_PAGES, MAP_REDUCE_PAGES_PER_CHUNK, BATCH_MAX_WORKERS, BATCH_MANIFEST_NAME
+)
+from .prompts import get_prompt, get_analysis_types
+from .utils.ingestion import ingest_image
+from .utils.pdf_generator import PDFGenerator
+
+
+# "<document>_p3", "<document>-page-12", "<document> page 2" (case-insensitive)
+PAGE_PATTERN = re.compile(r'^(?P<document>.+?)[\s_\-]+(?:p|pg|page)[\s_\-]?(?P<page>\d+)$', re.IGNORECASE)
+
+
+def discover_documents(root: str, manifest: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Group the images under a directory into documents.
+
+    Args:
+        root: Directory to walk
+        manifest: Optional manifest path; defaults to root/manifest.json
+            when that file exists
+
+    Returns:
+        Absolute page paths per document name, pages in reading order (the
+        paths are stored with the results, so they must not depend on the
+        working directory)
+    """
+    root = os.path.abspath(root)
+    manifest = manifest or os.path.join(root, BATCH_MANIFEST_NAME)
+    if os.path.isfile(manifest):
+        with open(manifest, encoding='utf-8') as f:
+            entries = json.load(f)
+        base = os.path.dirname(os.path.abspath(manifest))
+        return {
+            name: [os.path.join(base, page) for page in pages]
+            for name, pages in entries.items()
+        }
+
+    extensions = tuple(f".{extension}" for extension in SUPPORTED_FORMATS)
+    grouped = {}
+    for directory, subdirectories, filenames in os.walk(root):
+        subdirectories.sort()
+        relative_dir = os.path.relpath(directory, root)
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(extensions):
+                continue
+            stem = os.path.splitext(filename)[0]
+            match = PAGE_PATTERN.match(stem)
+            if match:
+                name, page = match.group('document'), int(match.group('page'))
+            else:
+                # Not part of a multi-page document: keep the extension so that
+                # "1.jpg" and "1.png" stay separate documents
+                name, page = filename, 0
+            if relative_dir != os.curdir:
+                name = f"{relative_dir.replace(os.sep, '/')}/{name}"
+            grouped.setdefault(name, []).append((page, os.path.join(directory, filename)))
+
+    return {name: [path for _, path in sorted(pages)] for name, pages in sorted(grouped.items())}
+
+
+def output_stem(name: str) -> str:
+    """File name (without extension) for a document's outputs."""
+    return re.sub(r'[^\w.\-]+', '_', name.replace('/', '__'))
+
+
+def document_fingerprint(pages: List[bytes], **settings: Any) -> str:
+    """Hash of a document's pages and the settings it is analyzed with."""
+    digest = hashlib.sha256()
+    for page in pages:
+        digest.update(hashlib.sha256(page).digest())
+    digest.update(json.dumps(settings, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write a file so that it either appears complete or not at all."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class BatchRunner:
+    """Analyzes documents on a worker pool and writes their JSON and PDF outputs."""
+
+    def __init__(
+        self,
+        ai_handler: AIHandler,
+        output_dir: str,
+        prompt: str,
+        role: str,
+        workers: int = BATCH_MAX_WORKERS,
+        resize: bool = True,
+        pdf: bool = True,
+        appendix: bool = False,
+        pages_per_chunk: Optional[int] = None,
+        force: bool = False
+    ):
+        """
+        Initialize Batch Runner.
+
+        Args:
+            ai_handler: Handler used for every document
+            output_dir: Directory receiving <document>.json and <document>.pdf
+            prompt: Analysis prompt
+            role: User role
+            workers: Documents analyzed at the same time
+            resize: Preprocess pages to the provider's effective resolution
+            pdf: Also write a PDF report per document
+            appendix: Append the document's pages, downsampled, to its PDF
+            pages_per_chunk: Page group size for map-reduce (used for
+                documents that do not fit a single request)
+            force: Re-analyze documents that already have results
+        """
+        self.ai_handler = ai_handler
+        self.output_dir = output_dir
+        self.prompt = prompt
+        self.role = role
+        self.workers = workers
+        self.resize = resize
+        self.pdf = pdf
+        self.appendix = appendix
+        self.pages_per_chunk = pages_per_chunk or MAP_REDUCE_PAGES_PER_CHUNK
+        self.force = force
+        self._print_lock = threading.Lock()
+
+    def _log(self, message: str):
+        with self._print_lock:
+            print(message, flush=True)
+
+    def _settings(self) -> Dict[str, Any]:
+        """Everything that shapes a document's outputs; a change re-processes the document."""
+        return {
+            'provider': self.ai_handler.provider,
+            'model': self.ai_handler.model,
+            'deterministic': self.ai_handler.deterministic,
+            'role': self.role,
+            'prompt': self.prompt,
+            'resize': self.resize,
+            'pages_per_chunk': self.pages_per_chunk,
+            'pdf': self.pdf,
+            'appendix': self.appendix,
+        }
+
+    def _prepare_pages(self, paths: List[str], files: List[bytes]) -> List[bytes]:
+        """Validate and (optionally) preprocess a document's pages."""
+        provider = self.ai_handler.provider if self.resize and self.ai_handler.provider != 'mock' else None
+        pages = []
+        for path, image_bytes in zip(paths, files):
+            record = ingest_image(image_bytes, MAX_FILE_SIZE_MB, provider=provider, thumbnail_size=None)
+            if not record['valid']:
+                raise ValueError(f"{path}: {record['message']}")
+            pages.append(record['payload'])
+        return pages
+
+    def process(self, name: str, paths: List[str]) -> Dict[str, Any]:
+        """
+        Analyze one document unless an up-to-date result already exists.
+
+        Returns:
+            Dictionary with 'status' ('done', 'truncated', 'skipped' or
+            'failed'), 'seconds', 'tokens' and 'error'
+        """
+        started = time.time()
+        json_path = os.path.join(self.output_dir, f"{output_stem(name)}.json")
+        outcome = {'status': 'done', 'seconds': 0.0, 'tokens': 0, 'error': None}
+        try:
+            files = []
+            for path in paths:
+                with open(path, 'rb') as f:
+                    files.append(f.read())
+            fingerprint = document_fingerprint(files, **self._settings())
+            if not self.force and os.path.isfile(json_path):
+                with open(json_path, encoding='utf-8') as f:
+                    previous = json.load(f)
+                if previous.get('fingerprint') == fingerprint and not previous.get('truncated'):
+                    outcome['status'] = 'skipped'
+                    return outcome
+
+            pages = self._prepare_pages(paths, files)
+            if len(pages) > MAP_REDUCE_AUTO_PAGES or self.ai_handler.exceeds_request_limit(pages):
+                result = self.ai_handler.analyze_map_reduce(
+                    pages, self.prompt, self.role, pages_per_chunk=self.pages_per_chunk
+                )
+            else:
+                result = self.ai_handler.analyze(pages, self.prompt, self.role)
+
+            usage = result.get('usage') or {}
+            outcome['tokens'] = usage.get('prompt_tokens', 0) + usage.get('completion_tokens', 0)
+            truncated = result.get('finish_reason') == 'length'
+            if truncated:
+                outcome['status'] = 'truncated'
+
+            # The JSON file marks the document as finished, so it is written last
+            if self.pdf:
+                pdf_path = os.path.join(self.output_dir, f"{output_stem(name)}.pdf")
+                appendix_images = None
+                if self.appendix:
+                    appendix_images = [
+                        (f"Page {number} ({os.path.basename(path)})", data)
+                        for number, (path, data) in enumerate(zip(paths, files), start=1)
+                    ]
+                PDFGenerator().generate_pdf(result, output=f"{pdf_path}.tmp", appendix_images=appendix_images)
+                os.replace(f"{pdf_path}.tmp", pdf_path)
+            record = {
+                'document': name,
+                'pages': paths,
+                'fingerprint': fingerprint,
+                'analyzed_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'truncated': truncated,
+                **result,
+            }
+            _write_atomic(json_path, json.dumps(record, indent=2, ensure_ascii=False).encode('utf-8'))
+        except Exception as e:
+            outcome['status'] = 'failed'
+            outcome['error'] = str(e)
+        finally:
+            outcome['seconds'] = time.time() - started
+        return outcome
+
+    def run(self, documents: Dict[str, List[str]]) -> Dict[str, Any]:
+        """
+        Analyze all documents and report throughput.
+
+        Returns:
+            Summary with counts per status ('done', 'truncated', 'skipped',
+            'failed'), elapsed seconds, documents per minute and tokens per
+            second (over the analyzed documents, truncated ones included)
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        counts = {'done': 0, 'truncated': 0, 'skipped': 0, 'failed': 0}
+        tokens = 0
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="batch") as executor:
+            futures = {
+                executor.submit(self.process, name, paths): name
+                for name, paths in documents.items()
+            }
+            for finished, future in enumerate(as_completed(futures), start=1):
+                name, outcome = futures[future], future.result()
+                counts[outcome['status']] += 1
+                tokens += outcome['tokens']
+                detail = {
+                    'done': f"{outcome['seconds']:.1f}s, {outcome['tokens']:,} tokens",
+                    'truncated': f"{outcome['seconds']:.1f}s, {outcome['tokens']:,} tokens, "
+                                 "output cut off at the model's limit",
+                    'skipped': "already analyzed",
+                    'failed': outcome['error'],
+                }[outcome['status']]
+                self._log(f"[{finished}/{len(futures)}] {outcome['status']:<7} {name} ({detail})")
+
+        elapsed = time.time() - started
+        return {
+            **counts,
+            'elapsed_seconds': elapsed,
+            'documents_per_minute': (counts['done'] + counts['truncated']) / elapsed * 60 if elapsed else 0.0,
+            'tokens_per_second': tokens / elapsed if elapsed else 0.0,
+            'tokens': tokens,
+        }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch",
+        description="Analyze directories of financial report images without the web app."
+    )
+    parser.add_argument("input_dir", help="Directory of report images (walked recursively)")
+    parser.add_argument("-o", "--output-dir", default="batch_output",
+                        help="Where JSON and PDF results are written (default: %(default)s)")
+    parser.add_argument("--provider", choices=["openai", "gemini", "mock"], default="openai")
+    parser.add_argument("--model", help="Model identifier (default: the provider's first model)")
+    parser.add_argument("--api-key", help="API key (default: OPENAI_API_KEY / GEMINI_API_KEY)")
+    parser.add_argument("--role", default="Investor", help=f"User role, e.g. {', '.join(USER_ROLES)}")
+    parser.add_argument("--analysis", default="Overall Analysis", choices=get_analysis_types(),
+                        help="Prompt template (default: %(default)s)")
+    parser.add_argument("--prompt-file", help="Use the prompt in this file instead of a template")
+    parser.add_argument("--manifest", help=f"Document manifest (default: <input_dir>/{BATCH_MANIFEST_NAME} if present)")
+    parser.add_argument("-w", "--workers", type=int, default=BATCH_MAX_WORKERS,
+                        help="Documents analyzed at the same time (default: %(default)s)")
+    parser.add_argument("--pages-per-chunk", type=int, default=MAP_REDUCE_PAGES_PER_CHUNK,
+                        help="Page group size for documents too large for one request")
+    parser.add_argument("--no-resize", action="store_true", help="Send the original image bytes")
+    parser.add_argument("--no-pdf", action="store_true", help="Only write JSON results")
+    parser.add_argument("--appendix", action="store_true",
+                        help="Append the source pages, downsampled, to each PDF")
+    parser.add_argument("--force", action="store_true", help="Re-analyze documents that already have results")
+    parser.add_argument("--deterministic", action="store_true", help="Use temperature 0 (and a fixed seed)")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if not os.path.isdir(args.input_dir):
+        print(f"Input directory not found: {args.input_dir}", file=sys.stderr)
+        return 2
+
+    api_key = args.api_key or os.getenv(API_KEY_ENV_VARS.get(args.provider, ""), "")
+    if args.provider != 'mock' and not api_key:
+        print(f"No API key: pass --api-key or set {API_KEY_ENV_VARS[args.provider]}", file=sys.stderr)
+        return 2
+
+    if args.prompt_file:
+        with open(args.prompt_file, encoding='utf-8') as f:
+            prompt = f.read()
+    else:
+        prompt = get_prompt(args.analysis, args.role)
+
+    documents = discover_documents(args.input_dir, args.manifest)
+    if not documents:
+        print(f"No {', '.join(SUPPORTED_FORMATS)} images found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    ai_handler = AIHandler(
+        provider=args.provider,
+        model=args.model or DEFAULT_MODELS[args.provider],
+        api_key=api_key,
+        deterministic=args.deterministic
+    )
+    runner = BatchRunner(
+        ai_handler,
+        args.output_dir,
+        prompt,
+        args.role,
+        workers=args.workers,
+        resize=not args.no_resize,
+        pdf=not args.no_pdf,
+        appendix=args.appendix,
+        pages_per_chunk=args.pages_per_chunk,
+        force=args.force
+    )
+
+    pages = sum(len(paths) for paths in documents.values())
+    print(f"{len(documents)} document(s), {pages} page(s) · {args.provider} {ai_handler.model} · "
+          f"{args.workers} worker(s) → {args.output_dir}", flush=True)
+    summary = runner.run(documents)
+    print(
+        f"\n{summary['done']} analyzed, {summary['truncated']} truncated, {summary['skipped']} skipped, "
+        f"{summary['failed']} failed "
+        f"in {summary['elapsed_seconds']:.1f}s · {summary['documents_per_minute']:.1f} documents/min · "
+        f"{summary['tokens_per_second']:.0f} tokens/s ({summary['tokens']:,} tokens)"
+    )
+    return 1 if summary['failed'] or summary['truncated'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Process-wide registry of provider clients
+Reusing clients keeps HTTP keep-alive connections and TLS sessions warm
+across analyses and Streamlit reruns. Provider SDKs are imported when the
+first client of that provider is created; importing them is most of the
+app's cold-start time. The pool is bounded: idle clients and, beyond
+the size limit, the least recently used ones are closed.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .config import CLIENT_POOL_MAX_CLIENTS, CLIENT_POOL_IDLE_SECONDS
+
+
+def hash_api_key(api_key: str) -> str:
+    """Short, non-reversible fingerprint of an API key (never store the key itself)."""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def create_client(provider: str, model: str, api_key: str, asynchronous: bool = False):
+    """
+    Create a provider client without touching global SDK configuration.
+
+    Args:
+        provider: 'openai' or 'gemini'
+        model: Model identifier (used by Gemini, whose clients are per model)
+        api_key: API key for the service
+        asynchronous: Create an asyncio client
+
+    Returns:
+        openai.OpenAI / openai.AsyncOpenAI or genai.GenerativeModel
+    """
+    if provider == 'openai':
+        import openai
+
+        # AIHandler owns retries (see src/utils/retry.py), so the SDK's own are disabled
+        if asynchronous:
+            return openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+        return openai.OpenAI(api_key=api_key, max_retries=0)
+    elif provider == 'gemini':
+        import google.generativeai as genai
+        from google.generativeai import client as genai_client
+
+        # genai.configure() is process-global; a private client manager per key
+        # lets several keys coexist without reconfiguring each other's clients
+        manager = genai_client._ClientManager()
+        manager.configure(api_key=api_key)
+        client = genai.GenerativeModel(model)
+        if asynchronous:
+            client._async_client = manager.get_default_client("generative_async")
+        else:
+            client._client = manager.get_default_client("generative")
+            # Return streams without waiting for their first chunk (the flag
+            # api_core reads off the gRPC stub), so that a stream can be
+            # cancelled while the model has not answered yet
+            transport = getattr(client._client, "_transport", None)
+            if transport is not None:
+                transport.stream_generate_content._prefetch_first_result_ = False
+        return client
+    else:
+        raise ValueError(f"Unsupported provider: {provider}")
+
+
+def close_client(client):
+    """Release a client's connections (Gemini models close their underlying service client)."""
+    close = getattr(client, 'close', None)
+    if not callable(close):
+        close = getattr(getattr(getattr(client, '_client', None), 'transport', None), 'close', None)
+    if callable(close):
+        close()
+
+
+class ClientPool:
+    """Thread-safe, bounded registry of provider clients keyed by provider, model and API key hash."""
+
+    def __init__(self, max_clients: int = CLIENT_POOL_MAX_CLIENTS, idle_seconds: float = CLIENT_POOL_IDLE_SECONDS):
+        """
+        Initialize Client Pool.
+
+        Args:
+            max_clients: Clients kept at most; the least recently used are closed
+            idle_seconds: Clients unused for this long are closed
+        """
+        self.max_clients = max_clients
+        self.idle_seconds = idle_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _key(provider: str, model: str, api_key: str) -> Tuple[str, Optional[str], str]:
+        # OpenAI clients are model-agnostic, so one client (and one connection pool)
+        # serves every OpenAI model used with the same key
+        return (provider, model if provider != 'openai' else None, hash_api_key(api_key))
+
+    def get(self, provider: str, model: str, api_key: str):
+        """
+        Return a pooled client, creating it on first use.
+
+        Args:
+            provider: 'openai' or 'gemini'
+            model: Model identifier
+            api_key: API key for the service
+
+        Returns:
+            Provider client shared by every caller with the same key
+        """
+        provider = provider.lower()
+        key = self._key(provider, model, api_key)
+
+        client = self._checkout(key)
+        if client is not None:
+            return client
+
+        # Built outside the lock, so a slow SDK import or client setup does
+        # not hold up callers of other clients
+        client = create_client(provider, model, api_key)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'client': client, 'created_at': now, 'last_used': now, 'uses': 0}
+                self._entries[key] = entry
+                self.created += 1
+                client = None
+            else:
+                # Another thread built the same client first; use that one
+                self.reused += 1
+            self._entries.move_to_end(key)
+            entry['last_used'] = now
+            entry['uses'] += 1
+            evicted = self._evict(protect=key)
+        if client is not None:
+            evicted.append(client)
+        for stale in evicted:
+            close_client(stale)
+        return entry['client']
+
+    def _checkout(self, key: Tuple[str, Optional[str], str]):
+        """Pooled client for key (marked as used), or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry['last_used'] = time.time()
+            entry['uses'] += 1
+            self.reused += 1
+            return entry['client']
+
+    def _evict(self, protect: Tuple[str, Optional[str], str]) -> list:
+        """Remove idle and surplus entries (caller holds the lock); return their clients to close."""
+        cutoff = time.time() - self.idle_seconds
+        evicted = []
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if key != protect and (len(self._entries) > self.max_clients or entry['last_used'] < cutoff):
+                evicted.append(self._entries.pop(key)['client'])
+        self.evicted += len(evicted)
+        return evicted
+
+    def close(self):
+        """Close pooled clients and empty the registry."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            close_client(entry['client'])
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for display and monitoring."""
+        now = time.time()
+        with self._lock:
+            clients = [
+                {
+                    'provider': provider,
+                    'model': model or '*',
+                    'key': key_hash[:8],
+                    'uses': entry['uses'],
+                    'age_seconds': round(now - entry['created_at'], 1),
+                    'idle_seconds': round(now - entry['last_used'], 1),
+                }
+                for (provider, model, key_hash), entry in self._entries.items()
+            ]
+        return {
+            'clients': len(clients),
+            'created': self.created,
+            'reused': self.reused,
+            'evicted': self.evicted,
+            'entries': clients,
+        }
+
+
+_client_pool = None
+_client_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    """Return the process-wide client pool."""
+    global _client_pool
+    with _client_pool_lock:
+        if _client_pool is None:
+            _client_pool = ClientPool()
+        return _client_pool
@@ -1,6 +1,7 @@
 """
 Configuration file for Financial Report Analysis App
 """
+import os
 
 # OpenAI Models
 OPENAI_MODELS = {
@@ -16,6 +17,84 @@ GEMINI_MODELS = {
     "Gemini 2.5 Pro": "gemini-2.5-pro",
 }
 
+# Mock "models" used in Debug Mode: latency and fault-injection profiles
+# for exercising the real code path (retries, streaming, caching) offline
+MOCK_MODELS = {
+    "Realistic": "mock-realistic",
+    "Fast": "mock-fast",
+    "Flaky (429s, timeouts, truncation)": "mock-flaky",
+}
+
+# Durations are distributions: {"distribution": "constant", "value": s},
+# {"distribution": "uniform", "low": s, "high": s} or
+# {"distribution": "lognormal", "median": s, "sigma": spread}
+MOCK_PROFILES = {
+    "mock-realistic": {
+        "time_to_first_token": {"distribution": "lognormal", "median": 2.0, "sigma": 0.5},
+        "tokens_per_second": 80,
+        "rate_limit_rate": 0.0,
+        "timeout_rate": 0.0,
+        "truncation_rate": 0.0,
+    },
+    "mock-fast": {
+        "time_to_first_token": {"distribution": "constant", "value": 0.1},
+        "tokens_per_second": 2000,
+        "rate_limit_rate": 0.0,
+        "timeout_rate": 0.0,
+        "truncation_rate": 0.0,
+    },
+    "mock-flaky": {
+        "time_to_first_token": {"distribution": "lognormal", "median": 1.0, "sigma": 0.8},
+        "tokens_per_second": 150,
+        "rate_limit_rate": 0.2,
+        "timeout_rate": 0.1,
+        "truncation_rate": 0.1,
+    },
+}
+MOCK_TIMEOUT_SECONDS = 5.0  # How long an injected timeout hangs before failing
+MOCK_RETRY_AFTER_SECONDS = 1.0  # retry-after header sent with injected 429s
+
+# Defaults for the headless entry points (batch CLI, HTTP API)
+DEFAULT_MODELS = {
+    "openai": "gpt-4o",
+    "gemini": "gemini-2.0-flash-exp",
+    "mock": "mock-fast",
+}
+API_KEY_ENV_VARS = {
+    "openai": "OPENAI_API_KEY",
+    "gemini": "GEMINI_API_KEY",
+}
+
+# Output token limit per request
+MAX_OUTPUT_TOKENS = {
+    "openai": 4096,
+    "gemini": 8192,
+    "mock": 8192,
+}
+
+# Pricing in USD per 1M tokens, plus rough throughput used for latency estimates
+MODEL_PRICING = {
+    "gpt-4o": {
+        "input": 2.50, "output": 10.00,
+        "input_tokens_per_second": 8000, "output_tokens_per_second": 80, "base_latency_seconds": 1.5,
+    },
+    "gpt-4o-mini": {
+        "input": 0.15, "output": 0.60,
+        "input_tokens_per_second": 10000, "output_tokens_per_second": 100, "base_latency_seconds": 1.0,
+    },
+    "gemini-2.0-flash-exp": {
+        "input": 0.10, "output": 0.40,
+        "input_tokens_per_second": 12000, "output_tokens_per_second": 150, "base_latency_seconds": 1.0,
+    },
+    "gemini-2.5-pro": {
+        "input": 1.25, "output": 10.00,
+        "input_tokens_per_second": 6000, "output_tokens_per_second": 60, "base_latency_seconds": 3.0,
+    },
+}
+
+# Typical length of a full analysis, used for expected cost and latency
+EXPECTED_OUTPUT_TOKENS = 2500
+
 # User Roles
 USER_ROLES = [
     "Investor",
@@ -30,6 +109,112 @@ SUPPORTED_FORMATS = ["png", "jpg", "jpeg"]
 # Maximum file size (in MB)
 MAX_FILE_SIZE_MB = 10
 
+# Longest side of the upload preview thumbnails (pixels)
+THUMBNAIL_MAX_DIMENSION = 640
+THUMBNAIL_QUALITY = 80
+
+# Effective image resolution per provider (larger images are downscaled by the
+# provider anyway, so sending more pixels only costs upload time)
+PROVIDER_IMAGE_LIMITS = {
+    "openai": {"max_dimension": 2048, "max_short_side": 768},
+    "gemini": {"max_dimension": 3072, "max_short_side": None},
+}
+
+# Re-encoding of preprocessed images
+IMAGE_OUTPUT_FORMAT = "JPEG"
+IMAGE_OUTPUT_QUALITY = 85
+
+# Source page appendix of PDF reports (images are downsampled to this print resolution)
+PDF_APPENDIX_DPI = 120
+PDF_APPENDIX_QUALITY = 70
+
+# Result cache configuration
+RESULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "financial_report_analysis")
+)
+RESULT_CACHE_TTL_SECONDS = 7 * 24 * 3600  # 7 days
+RESULT_CACHE_MAX_MB = 200
+RESULT_CACHE_MEMORY_ENTRIES = 64
+
+# Generated artifacts (PDF exports, upload thumbnails) kept in memory, shared by all sessions
+ARTIFACT_CACHE_MAX_MB = 100
+
+# Uploaded image payloads, stored once per distinct content for all sessions
+BLOB_STORE_MAX_MB = 256
+BLOB_STORE_IDLE_SECONDS = 600  # Sessions idle this long lose priority when evicting
+
+# Parsed analysis markdown (document trees) kept for reuse by the PDF, email and HTML renderers
+MARKDOWN_CACHE_ENTRIES = 64
+PDF_PARAGRAPH_CACHE_ENTRIES = 4096  # Parsed reportlab paragraphs per PDFGenerator
+
+# Deterministic mode (temperature 0, fixed seed where the provider supports it)
+DETERMINISTIC_SEED = 42
+
+# Hedged requests: fire the secondary provider when the primary has not
+# produced a first token within this percentile of observed latencies
+HEDGE_PERCENTILE = 95
+HEDGE_DEFAULT_DELAY_SECONDS = 10.0  # Used until enough samples are collected
+HEDGE_MIN_DELAY_SECONDS = 2.0
+HEDGE_MIN_SAMPLES = 5
+
+# Provider request-size limits (base64-encoded image payload per request)
+PROVIDER_REQUEST_LIMITS = {
+    "openai": {"max_request_bytes": 45 * 1024 * 1024, "max_images": 500},
+    "gemini": {"max_request_bytes": 18 * 1024 * 1024, "max_images": 3000},
+}
+
+# Map-reduce analysis for large uploads
+MAP_REDUCE_PAGES_PER_CHUNK = 4
+MAP_REDUCE_MAX_CONCURRENCY = 4
+MAP_REDUCE_AUTO_PAGES = 12  # "Auto" mode switches to map-reduce above this page count
+
+# "Run all analyses": templates analyzed concurrently for one document set
+ANALYZE_ALL_MAX_CONCURRENCY = 4
+
+# Retry and backoff for provider calls (429s, 5xx, timeouts)
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 30.0
+RETRY_DEADLINE_SECONDS = 180.0
+
+# Client-side pacing per provider and API key (set to your account's tier limits)
+PROVIDER_RATE_LIMITS = {
+    "openai": {"requests_per_minute": 500, "tokens_per_minute": 30000},
+    "gemini": {"requests_per_minute": 150, "tokens_per_minute": 1000000},
+    "mock": {"requests_per_minute": 10000, "tokens_per_minute": 100000000},
+}
+
+# Provider client pool (src/client_pool.py)
+CLIENT_POOL_MAX_CLIENTS = 32  # Clients kept per process, least recently used closed first
+CLIENT_POOL_IDLE_SECONDS = 1800  # Clients unused for this long are closed
+
+# Background analysis jobs
+JOB_MAX_WORKERS = 4  # Analyses running at once across all sessions; others queue
+JOB_RETENTION_SECONDS = 3600  # Finished jobs stay retrievable this long
+JOB_POLL_INTERVAL_SECONDS = 1.0
+
+# Headless batch runs (python -m src.batch)
+BATCH_MAX_WORKERS = 4  # Documents analyzed at the same time
+BATCH_MANIFEST_NAME = "manifest.json"  # Optional document -> pages mapping in the input directory
+
+# Bulk PDF export (python -m src.pdf_export)
+PDF_EXPORT_MAX_WORKERS = os.cpu_count() or 1  # Reports rendered at the same time, one process each
+
+# HTTP API service (api_server.py)
+API_HOST = "127.0.0.1"
+API_PORT = 8080
+API_WORKERS = 4  # Analyses running at once
+API_MAX_QUEUE_DEPTH = 32  # Waiting analyses; further requests get 429
+API_RETRY_AFTER_SECONDS = 5  # Retry-After sent with 429 responses
+API_UPLOAD_DIR = os.getenv(
+    "API_UPLOAD_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "financial_report_analysis", "uploads")
+)
+API_UPLOAD_CHUNK_BYTES = 64 * 1024
+API_MAX_FIELD_BYTES = 64 * 1024  # Per text form field (prompt, role, ...); larger fields get 413
+API_MAX_HANDLERS = 32  # Provider handlers kept per (provider, model, API key), least recently used dropped
+
 # Email configuration
 SMTP_SERVER = "smtp.gmail.com"
 SMTP_PORT = 587
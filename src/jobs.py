@@ -0,0 +1,249 @@
+"""
+Background job execution
+Analyses run on a process-wide worker pool. Job state lives here rather
+than in st.session_state, so the UI can poll it, queue several analyses
+and pick results up again after reruns and reconnects.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import JOB_MAX_WORKERS, JOB_RETENTION_SECONDS
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class Job:
+    """One unit of background work and its observable state."""
+
+    def __init__(self, label: str, owner: Optional[str] = None, **metadata: Any):
+        """
+        Initialize Job.
+
+        Args:
+            label: Human-readable description shown in job lists
+            owner: Optional owner id (e.g. a browser session) for filtering
+            **metadata: Extra fields copied into snapshots
+        """
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.owner = owner
+        self.metadata = metadata
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.output = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = threading.Event()
+        self._cancel_callbacks = []
+        self._lock = threading.Lock()
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None):
+        """Report progress (0-1) and/or a status message from the worker."""
+        with self._lock:
+            if progress is not None:
+                self.progress = max(0.0, min(1.0, progress))
+            if message is not None:
+                self.message = message
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Register a callable run when cancellation is requested (at once if it already was)."""
+        with self._lock:
+            if not self.cancel_requested.is_set():
+                self._cancel_callbacks.append(callback)
+                return
+        callback()
+
+    def request_cancel(self):
+        """Ask the job to stop and run the callbacks registered with on_cancel."""
+        with self._lock:
+            self.cancel_requested.set()
+            callbacks, self._cancel_callbacks = self._cancel_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def append_output(self, text: str):
+        """Append partial output (e.g. streamed tokens) from the worker."""
+        with self._lock:
+            self.output.append(text)
+
+    def start(self):
+        """Mark the job as running."""
+        with self._lock:
+            self.status = RUNNING
+            self.started_at = time.time()
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None):
+        """Record the outcome of the job (DONE, FAILED or CANCELLED)."""
+        with self._lock:
+            self.status = status
+            self.result = result
+            self.error = error
+            if status == DONE:
+                self.progress = 1.0
+            self.finished_at = time.time()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the job state for display."""
+        with self._lock:
+            return {
+                'id': self.id,
+                'label': self.label,
+                'owner': self.owner,
+                'status': self.status,
+                'progress': self.progress,
+                'message': self.message,
+                'output': "".join(self.output),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                **self.metadata,
+            }
+
+
+class JobManager:
+    """Runs jobs on a thread pool and keeps their state until retention expires."""
+
+    def __init__(self, max_workers: int = JOB_MAX_WORKERS, retention_seconds: float = JOB_RETENTION_SECONDS):
+        """
+        Initialize Job Manager.
+
+        Args:
+            max_workers: Jobs running at the same time; the rest wait queued
+            retention_seconds: How long finished jobs stay retrievable
+        """
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[[Job], Any], label: str, owner: Optional[str] = None,
+               **metadata: Any) -> str:
+        """
+        Queue a job.
+
+        Args:
+            fn: Callable receiving the Job (for progress and partial output)
+                and returning the job's result
+            label: Human-readable description
+            owner: Optional owner id
+            **metadata: Extra fields copied into snapshots
+
+        Returns:
+            Job id
+        """
+        self._prune()
+        job = Job(label, owner, **metadata)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._futures[job.id] = self._executor.submit(self._run, job, fn)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        """Execute a job on a worker thread and record the outcome."""
+        if job.cancel_requested.is_set():
+            return
+        job.start()
+        try:
+            result = fn(job)
+        except Exception as e:
+            # Cancelled work usually ends with an error from the interrupted request
+            if job.cancel_requested.is_set():
+                job.finish(CANCELLED)
+            else:
+                job.finish(FAILED, error=str(e))
+            return
+        job.finish(CANCELLED if job.cancel_requested.is_set() else DONE, result)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Snapshot of a job, or None if it is unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job.snapshot() if job is not None else None
+
+    def list(self, job_ids: Optional[List[str]] = None, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Snapshots of jobs, oldest first.
+
+        Args:
+            job_ids: Only these jobs (unknown ids are skipped)
+            owner: Only jobs of this owner
+        """
+        self._prune()
+        with self._lock:
+            jobs = list(self._jobs.values())
+        if job_ids is not None:
+            wanted = set(job_ids)
+            jobs = [job for job in jobs if job.id in wanted]
+        if owner is not None:
+            jobs = [job for job in jobs if job.owner == owner]
+        return [job.snapshot() for job in sorted(jobs, key=lambda job: job.created_at)]
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job.
+
+        Queued jobs never start; running jobs are asked to stop (see
+        Job.on_cancel) and are marked cancelled once their function returns.
+
+        Returns:
+            True if the job existed and had not finished
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return False
+        job.request_cancel()
+        if future is not None and future.cancel():
+            job.finish(CANCELLED)
+        return True
+
+    def _prune(self):
+        """Forget finished jobs older than the retention period."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+                self._futures.pop(job_id, None)
+
+    def shutdown(self, wait: bool = False):
+        """Stop accepting jobs and cancel the queued ones."""
+        with self._lock:
+            job_ids = list(self._jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=wait)
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager."""
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
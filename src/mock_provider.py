@@ -0,0 +1,252 @@
+"""
+Mock provider for Debug Mode and load testing
+Serves the canned analyses from mock_data with sampled latency, streamed
+tokens and injected faults, so retries, streaming and caching can be
+exercised through AIHandler without spending API credits.
+"""
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from .config import MOCK_PROFILES, MOCK_TIMEOUT_SECONDS, MOCK_RETRY_AFTER_SECONDS
+from .mock_data import get_mock_analysis
+from .prompts import PROMPTS
+
+
+_ROLE_PATTERN = re.compile(r'\[User Role: ([^\]]+)\]')
+
+# Roughly 4 characters per token, as in the real providers' English text
+CHARS_PER_TOKEN = 4
+
+
+class MockRateLimitError(Exception):
+    """Injected HTTP 429 carrying a retry-after header, like the real SDK errors."""
+
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit exceeded (mock); retry after {retry_after:g}s")
+        self.response = type('MockResponse', (), {'headers': {'retry-after': str(retry_after)}})()
+
+
+class MockTimeoutError(TimeoutError):
+    """Injected request timeout."""
+
+
+def sample_duration(spec: Any, rng: random.Random) -> float:
+    """
+    Draw a duration in seconds from a distribution spec.
+
+    Args:
+        spec: A number (constant) or a dict with 'distribution' set to
+            'constant' (value), 'uniform' (low, high) or 'lognormal'
+            (median, sigma)
+        rng: Random number generator
+
+    Returns:
+        Non-negative duration in seconds
+    """
+    if isinstance(spec, (int, float)):
+        return max(0.0, float(spec))
+
+    distribution = spec.get('distribution', 'constant')
+    if distribution == 'constant':
+        value = spec['value']
+    elif distribution == 'uniform':
+        value = rng.uniform(spec['low'], spec['high'])
+    elif distribution == 'lognormal':
+        value = rng.lognormvariate(math.log(spec['median']), spec.get('sigma', 0.5))
+    else:
+        raise ValueError(f"Unknown distribution: {distribution}")
+    return max(0.0, float(value))
+
+
+class MockResponse:
+    """Completed mock request: text, finish reason and token usage."""
+
+    def __init__(self, text: str, finish_reason: str, usage: Dict[str, int]):
+        self.text = text
+        self.finish_reason = finish_reason
+        self.usage = usage
+
+
+class MockClient:
+    """Stand-in for a provider client with a configurable latency and fault profile."""
+
+    def __init__(self, model: str = "mock-realistic", seed: Optional[int] = None, **overrides: Any):
+        """
+        Initialize Mock Client.
+
+        Args:
+            model: Profile name from MOCK_PROFILES
+            seed: Seed for reproducible latency and fault sampling
+            **overrides: Profile values to override (time_to_first_token,
+                tokens_per_second, rate_limit_rate, timeout_rate,
+                truncation_rate, timeout_seconds, retry_after_seconds)
+        """
+        profile = {
+            'timeout_seconds': MOCK_TIMEOUT_SECONDS,
+            'retry_after_seconds': MOCK_RETRY_AFTER_SECONDS,
+            **MOCK_PROFILES.get(model, MOCK_PROFILES['mock-realistic']),
+            **overrides,
+        }
+        self.model = model
+        self.profile = profile
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._seen_prefixes = set()
+
+    def _plan(self, prefix: str, prompt: str, image_count: int, max_tokens: int) -> Dict[str, Any]:
+        """Decide the outcome of one request: fault, latency and the text to return."""
+        with self._lock:
+            roll = self._rng.random()
+            time_to_first_token = sample_duration(self.profile['time_to_first_token'], self._rng)
+            cut = self._rng.uniform(0.2, 0.8)
+            prefix_hash = hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+            prefix_cached = prefix_hash in self._seen_prefixes
+            self._seen_prefixes.add(prefix_hash)
+
+        fault = None
+        rate_limit_rate = self.profile['rate_limit_rate']
+        if roll < rate_limit_rate:
+            fault = 'rate_limit'
+        elif roll < rate_limit_rate + self.profile['timeout_rate']:
+            fault = 'timeout'
+        elif roll < rate_limit_rate + self.profile['timeout_rate'] + self.profile['truncation_rate']:
+            fault = 'truncation'
+
+        role_match = _ROLE_PATTERN.search(prompt) or _ROLE_PATTERN.search(prefix)
+        role = role_match.group(1) if role_match else "Investor"
+        text = get_mock_analysis(role, _analysis_type(prefix))['analysis']
+
+        finish_reason = 'stop'
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if fault == 'truncation' or len(text) > max_chars:
+            text = text[:min(max_chars, int(len(text) * cut))]
+            finish_reason = 'length'
+
+        prefix_tokens = len(prefix) // CHARS_PER_TOKEN
+        usage = {
+            'prompt_tokens': prefix_tokens + len(prompt) // CHARS_PER_TOKEN + 765 * image_count,
+            'completion_tokens': len(text) // CHARS_PER_TOKEN,
+            'cached_tokens': prefix_tokens if prefix_cached else 0,
+        }
+        return {
+            'fault': fault,
+            'time_to_first_token': time_to_first_token,
+            'response': MockResponse(text, finish_reason, usage),
+        }
+
+    def _raise_fault(self, plan: Dict[str, Any]):
+        """Raise the injected error for a plan, if any (after the time it takes)."""
+        if plan['fault'] == 'rate_limit':
+            raise MockRateLimitError(self.profile['retry_after_seconds'])
+        if plan['fault'] == 'timeout':
+            raise MockTimeoutError(f"Request timed out after {self.profile['timeout_seconds']:g}s (mock)")
+
+    def _fault_delay(self, plan: Dict[str, Any]) -> float:
+        """Time spent before an injected fault surfaces."""
+        return self.profile['timeout_seconds'] if plan['fault'] == 'timeout' else 0.05
+
+    def _generation_seconds(self, text: str) -> float:
+        """Time to generate text at the profile's token rate."""
+        return len(text) / CHARS_PER_TOKEN / self.profile['tokens_per_second']
+
+    def complete(self, prompt: str, prefix: str = "", image_count: int = 0,
+                 max_tokens: int = 8192) -> MockResponse:
+        """
+        Run a blocking mock request.
+
+        Args:
+            prompt: Variable part of the request (contains the role line)
+            prefix: Stable instructions (used to pick the analysis type and
+                to simulate prompt-cache hits)
+            image_count: Number of images sent
+            max_tokens: Output token limit
+
+        Returns:
+            MockResponse
+
+        Raises:
+            MockRateLimitError / MockTimeoutError when a fault is injected
+        """
+        plan = self._plan(prefix, prompt, image_count, max_tokens)
+        if plan['fault'] in ('rate_limit', 'timeout'):
+            time.sleep(self._fault_delay(plan))
+            self._raise_fault(plan)
+        response = plan['response']
+        time.sleep(plan['time_to_first_token'] + self._generation_seconds(response.text))
+        return response
+
+    async def acomplete(self, prompt: str, prefix: str = "", image_count: int = 0,
+                        max_tokens: int = 8192) -> MockResponse:
+        """Asyncio counterpart of complete()."""
+        plan = self._plan(prefix, prompt, image_count, max_tokens)
+        if plan['fault'] in ('rate_limit', 'timeout'):
+            await asyncio.sleep(self._fault_delay(plan))
+            self._raise_fault(plan)
+        response = plan['response']
+        await asyncio.sleep(plan['time_to_first_token'] + self._generation_seconds(response.text))
+        return response
+
+    def stream(self, prompt: str, prefix: str = "", image_count: int = 0,
+               max_tokens: int = 8192) -> "MockStream":
+        """
+        Open a streaming mock request.
+
+        Faults are raised here, when the stream is opened, like a real
+        provider rejecting the request; truncation cuts the stream short.
+
+        Returns:
+            MockStream yielding text chunks; .response holds usage once exhausted
+        """
+        plan = self._plan(prefix, prompt, image_count, max_tokens)
+        if plan['fault'] in ('rate_limit', 'timeout'):
+            time.sleep(self._fault_delay(plan))
+            self._raise_fault(plan)
+        return MockStream(plan['response'], plan['time_to_first_token'], self.profile['tokens_per_second'])
+
+
+class MockStream:
+    """Iterator over mock chunks paced at a token rate."""
+
+    # Chunks are grouped so that each sleep is at least this long
+    MIN_CHUNK_SECONDS = 0.02
+
+    def __init__(self, response: MockResponse, time_to_first_token: float, tokens_per_second: float):
+        self.response = response
+        self.time_to_first_token = time_to_first_token
+        self.tokens_per_second = tokens_per_second
+        self._closed = threading.Event()
+
+    def __iter__(self) -> Iterator[str]:
+        # Waits end as soon as the stream is closed, even from another thread
+        if self._closed.wait(self.time_to_first_token):
+            return
+        chars_per_chunk = max(
+            CHARS_PER_TOKEN, int(self.MIN_CHUNK_SECONDS * self.tokens_per_second * CHARS_PER_TOKEN)
+        )
+        text = self.response.text
+        for start in range(0, len(text), chars_per_chunk):
+            if self._closed.is_set():
+                return
+            chunk = text[start:start + chars_per_chunk]
+            yield chunk
+            self._closed.wait(len(chunk) / CHARS_PER_TOKEN / self.tokens_per_second)
+
+    def close(self):
+        """Stop the stream early, also while it waits for its first token (mirrors the SDK streams)."""
+        self._closed.set()
+
+
+def _analysis_type(prefix: str) -> str:
+    """Analysis type whose template appears in the prefix (defaults to Overall Analysis)."""
+    for analysis_type, templates in PROMPTS.items():
+        if any(template in prefix for template in templates.values()):
+            return analysis_type
+    return "Overall Analysis"
@@ -0,0 +1,205 @@
+"""
+Bulk PDF export
+Renders many analysis results to PDF reports on a process pool, so the
+CPU-bound reportlab work runs in parallel instead of behind the GIL. Each
+worker builds its PDFGenerator (stylesheet and custom styles) once and
+writes the reports it renders straight to their files; only timings travel
+back to the parent.
+
+Usage:
+    python -m src.pdf_export batch_results/
+    python -m src.pdf_export batch_results/ --output-dir reports/ --workers 8
+    python -m src.pdf_export batch_results/ --bundle q3-reports.pdf
+    python -m src.pdf_export batch_results/ --appendix
+
+The input directory holds result JSON files, as written by python -m src.batch.
+With --appendix the source pages listed in each result are embedded,
+downsampled, after the analysis.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import PDF_EXPORT_MAX_WORKERS
+
+
+# PDFGenerator of the current worker process, built once by _init_worker
+_generator = None
+
+
+def _init_worker():
+    global _generator
+    from .utils.pdf_generator import PDFGenerator
+    _generator = PDFGenerator()
+
+
+def source_pages(result: Dict[str, Any], caption_prefix: str = "") -> List[Tuple[str, bytes]]:
+    """(caption, image bytes) of the page files a batch result lists under 'pages'."""
+    pages = []
+    for number, page_path in enumerate(result.get('pages') or [], start=1):
+        with open(page_path, 'rb') as f:
+            pages.append((f"{caption_prefix}Page {number} ({os.path.basename(page_path)})", f.read()))
+    return pages
+
+
+def _remove(path: str):
+    """Delete a partial output file, if one was written."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _render(result: Dict[str, Any], path: str, appendix: bool = False) -> Dict[str, Any]:
+    """Render one report in a worker and write it to path (atomically)."""
+    started = time.perf_counter()
+    outcome = {'path': path, 'seconds': 0.0, 'bytes': 0, 'error': None}
+    temp_path = f"{path}.tmp"
+    try:
+        _generator.generate_pdf(result, output=temp_path, appendix_images=source_pages(result) if appendix else None)
+        os.replace(temp_path, path)
+        outcome['bytes'] = os.path.getsize(path)
+    except Exception as e:
+        outcome['error'] = str(e)
+        _remove(temp_path)
+    outcome['seconds'] = time.perf_counter() - started
+    return outcome
+
+
+def render_pdfs(
+    reports: Dict[str, Dict[str, Any]],
+    workers: Optional[int] = None,
+    on_rendered: Optional[Callable[[Dict[str, Any]], None]] = None,
+    appendix: bool = False
+) -> Dict[str, Any]:
+    """
+    Render analysis results to PDF files across a process pool.
+
+    Args:
+        reports: Result dict per output path
+        workers: Worker processes (defaults to PDF_EXPORT_MAX_WORKERS, capped
+            at the number of reports)
+        on_rendered: Optional callback receiving each document's outcome
+            ('path', 'seconds', 'bytes', 'error') as it finishes
+        appendix: Embed each result's source pages (read by the workers)
+
+    Returns:
+        Summary with 'documents', 'failed', 'seconds' (wall clock),
+        'render_seconds' (summed over documents), 'documents_per_second'
+        and the per-document 'outcomes'
+    """
+    workers = max(1, min(workers or PDF_EXPORT_MAX_WORKERS, len(reports) or 1))
+    outcomes = []
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [executor.submit(_render, result, path, appendix) for path, result in reports.items()]
+        for future in as_completed(futures):
+            outcome = future.result()
+            outcomes.append(outcome)
+            if on_rendered:
+                on_rendered(outcome)
+
+    elapsed = time.perf_counter() - started
+    return {
+        'documents': len(outcomes),
+        'failed': sum(1 for outcome in outcomes if outcome['error']),
+        'seconds': elapsed,
+        'render_seconds': sum(outcome['seconds'] for outcome in outcomes),
+        'documents_per_second': len(outcomes) / elapsed if elapsed else 0.0,
+        'outcomes': outcomes,
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src.pdf_export",
+        description="Render PDF reports for a directory of analysis results."
+    )
+    parser.add_argument("input_dir", help="Directory of result JSON files")
+    parser.add_argument("--output-dir", help="Where PDFs are written (default: next to the JSON files)")
+    parser.add_argument("--workers", type=int, default=PDF_EXPORT_MAX_WORKERS,
+                        help="Worker processes (default: %(default)s)")
+    parser.add_argument("--bundle", metavar="PATH",
+                        help="Write one PDF with a table of contents and a section per result instead")
+    parser.add_argument("--appendix", action="store_true",
+                        help="Append the source pages, downsampled (identical pages are embedded once)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    output_dir = args.output_dir or args.input_dir
+    os.makedirs(output_dir, exist_ok=True)
+
+    reports = {}
+    for filename in sorted(os.listdir(args.input_dir)):
+        if not filename.endswith('.json'):
+            continue
+        with open(os.path.join(args.input_dir, filename), encoding='utf-8') as f:
+            result = json.load(f)
+        if not isinstance(result, dict) or 'analysis' not in result:
+            continue
+        reports[os.path.join(output_dir, f"{os.path.splitext(filename)[0]}.pdf")] = result
+
+    if not reports:
+        print(f"No analysis results found in {args.input_dir}", file=sys.stderr)
+        return 1
+
+    if args.bundle:
+        from .utils.pdf_generator import PDFGenerator
+        started = time.perf_counter()
+        sections = [
+            (result.get('document') or os.path.splitext(os.path.basename(path))[0], result)
+            for path, result in reports.items()
+        ]
+        appendix_images = None
+        if args.appendix:
+            appendix_images, failed = [], 0
+            for title, result in sections:
+                try:
+                    appendix_images.extend(source_pages(result, f"{title}, "))
+                except OSError as e:
+                    failed += 1
+                    print(f"failed  {title} ({e})", flush=True)
+            if failed:
+                print(f"\n{failed} of {len(sections)} sections failed; {args.bundle} not written", file=sys.stderr)
+                return 1
+        temp_path = f"{args.bundle}.tmp"
+        try:
+            PDFGenerator().generate_bundle_pdf(sections, output=temp_path, appendix_images=appendix_images)
+            os.replace(temp_path, args.bundle)
+        except Exception as e:
+            _remove(temp_path)
+            print(f"failed  {os.path.basename(args.bundle)} ({e})", file=sys.stderr)
+            return 1
+        print(f"{len(sections)} sections bundled into {args.bundle} "
+              f"({os.path.getsize(args.bundle) / 1024:.0f} KB) in {time.perf_counter() - started:.1f}s")
+        return 0
+
+    finished = 0
+
+    def report_progress(outcome):
+        nonlocal finished
+        finished += 1
+        name = os.path.basename(outcome['path'])
+        if outcome['error']:
+            print(f"[{finished}/{len(reports)}] failed  {name} ({outcome['error']})", flush=True)
+        else:
+            print(f"[{finished}/{len(reports)}] done    {name} "
+                  f"({outcome['seconds']:.2f}s, {outcome['bytes'] / 1024:.0f} KB)", flush=True)
+
+    summary = render_pdfs(reports, workers=args.workers, on_rendered=report_progress, appendix=args.appendix)
+    rendered = summary['documents'] - summary['failed']
+    print(f"\n{rendered} rendered, {summary['failed']} failed in {summary['seconds']:.1f}s "
+          f"({summary['documents_per_second']:.1f} documents/s, "
+          f"{summary['render_seconds'] / max(summary['documents'], 1):.2f}s per document)")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -23,6 +23,7 @@ REFERENCE EXAMPLE OUTPUT FORMAT:
 - Structure information hierarchically
 - Highlight significant variances (>5% changes)
 """
+import re
 
 PROMPTS = {
     "Overall Analysis": {
@@ -638,6 +639,13 @@ Explain profitability in simple terms."""
     }
 }
 
+# Section headings as written in PROMPTS, e.g. "**1. KEY FINANCIAL METRICS**",
+# "**5. CREDIT QUALITY** (if applicable)" or "1. **Credit Risk**: Debt sustainability..."
+_SECTION_HEADINGS = [
+    re.compile(r'^\*\*([^*:]+)\*\*(\s*\([^)]*\))?\s*$'),
+    re.compile(r'^\d+\.\s*\*\*([^*]+)\*\*:'),
+]
+
 
 def get_prompt(analysis_type: str, user_role: str) -> str:
     """
@@ -660,3 +668,127 @@ def get_prompt(analysis_type: str, user_role: str) -> str:
 def get_analysis_types() -> list:
     """Get list of available analysis types."""
     return list(PROMPTS.keys())
+
+
+def get_prompt_sections(prompt: str) -> list:
+    """
+    Extract the section headings requested by a prompt template.
+    
+    Args:
+        prompt: Prompt text (a PROMPTS template, possibly edited)
+        
+    Returns:
+        List of section titles in order of appearance
+    """
+    sections = []
+    for line in prompt.split('\n'):
+        for pattern in _SECTION_HEADINGS:
+            match = pattern.match(line.strip())
+            if match:
+                sections.append(match.group(1).strip())
+                break
+    return sections
+
+
+def build_prompt_layout(prompt: str, role: str) -> tuple:
+    """
+    Split a request into a stable prefix and a variable part.
+    
+    The prefix is the unmodified PROMPTS template, so it stays the same for
+    every request with that analysis type and role, including edited prompts
+    that extend the template. The role line and any custom edits follow.
+    
+    Args:
+        prompt: Prompt text from the editor (a template, possibly extended)
+        role: User role
+        
+    Returns:
+        Tuple of (prefix, variable_text); the prefix is empty when the
+        prompt does not start with a template
+    """
+    template = _match_template(prompt)
+    custom = prompt[len(template):].strip()
+    prefix = template
+    
+    variable = f"[User Role: {role}]"
+    if custom:
+        variable += f"\n\n{custom}"
+    return prefix, variable
+
+
+def _match_template(prompt: str) -> str:
+    """Return the longest PROMPTS template the prompt starts with, or an empty string."""
+    best = ""
+    for templates in PROMPTS.values():
+        for template in templates.values():
+            if len(template) > len(best) and prompt.startswith(template):
+                best = template
+    return best
+
+
+def build_extraction_prompt(prompt: str) -> str:
+    """
+    Build the short "map" prompt used to extract findings from a group of pages.
+    
+    The text depends only on the template, so every page group of a document
+    shares it as a cacheable prefix; see build_page_context for the rest.
+    
+    Args:
+        prompt: The full analysis prompt the final report must follow
+        
+    Returns:
+        Extraction prompt text
+    """
+    sections = get_prompt_sections(prompt)
+    if sections:
+        focus = '\n'.join(f"- {section}" for section in sections)
+    else:
+        focus = "- All financial figures, ratios, tables, charts and management statements"
+    
+    return f"""You are reading part of a multi-page financial document.
+Do not write the final report. Extract every fact on the attached pages that is relevant to:
+{focus}
+
+Use terse bullet points grouped under the section titles above. Quote exact figures with units and periods (e.g. "Revenue: USD 4,850 million, Q3 2024, +12.5% YoY") and note which chart or table they come from. Skip sections with no data on these pages."""
+
+
+def build_page_context(first_page: int, last_page: int, total_pages: int) -> str:
+    """
+    Describe which pages a "map" request covers.
+    
+    Args:
+        first_page: First page number in this group (1-based)
+        last_page: Last page number in this group
+        total_pages: Total number of pages in the document
+        
+    Returns:
+        Page context text
+    """
+    page_label = f"page {first_page}" if first_page == last_page else f"pages {first_page}-{last_page}"
+    return f"The attached images are {page_label} of a {total_pages}-page financial document."
+
+
+def build_reduce_prompt(prompt: str, findings: list) -> str:
+    """
+    Build the variable part of the "reduce" request that merges per-page findings.
+    
+    Args:
+        prompt: Variable part of the analysis request (role and custom edits)
+        findings: List of (page_label, findings_text) tuples in page order
+        
+    Returns:
+        Reduce prompt text
+    """
+    parts = [
+        prompt,
+        "",
+        f"The source document was processed in {len(findings)} parts. "
+        "The findings extracted from each part are listed below. "
+        "Base the analysis only on these findings, reconcile duplicates across parts, "
+        "and follow the structure requested in the instructions.",
+    ]
+    for page_label, text in findings:
+        parts.append("")
+        parts.append(f"### Findings from {page_label}")
+        parts.append(text.strip())
+    return '\n'.join(parts)
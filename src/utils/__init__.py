@@ -1,15 +1,49 @@
 """
 Utility functions initialization
+Names are imported from their modules on first access, so importing one
+utility does not load the others' dependencies (reportlab, PIL, smtplib).
 """
+import importlib
 
-from .pdf_generator import PDFGenerator
-from .email_sender import EmailSender
-from .image_utils import validate_image, resize_image_if_needed, get_image_info
-
-__all__ = [
-    'PDFGenerator',
-    'EmailSender', 
-    'validate_image',
-    'resize_image_if_needed',
-    'get_image_info'
-]
+_EXPORTS = {
+    'PDFGenerator': 'pdf_generator',
+    'EmailSender': 'email_sender',
+    'validate_image': 'image_utils',
+    'resize_image_if_needed': 'image_utils',
+    'get_image_info': 'image_utils',
+    'detect_mime_type': 'image_utils',
+    'preprocess_image': 'image_utils',
+    'preprocess_for_provider': 'image_utils',
+    'ResultCache': 'result_cache',
+    'make_cache_key': 'result_cache',
+    'ArtifactCache': 'artifact_cache',
+    'result_hash': 'artifact_cache',
+    'BlobStore': 'blob_store',
+    'IngestionCache': 'ingestion',
+    'ingest_image': 'ingestion',
+    'make_thumbnail': 'image_utils',
+    'parse_markdown': 'markdown_ast',
+    'render_html': 'markdown_ast',
+    'markdown_html': 'markdown_ast',
+    'LatencyTracker': 'latency_tracker',
+    'RetryPolicy': 'retry',
+    'RateLimiter': 'retry',
+    'TokenBucket': 'retry',
+    'classify_error': 'retry',
+    'estimate_analysis': 'cost_estimator',
+    'estimate_image_tokens': 'cost_estimator',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,115 @@
+"""
+Shared cache for generated artifacts (e.g. PDF exports)
+Artifacts are built on demand, once per distinct input, and kept in a
+byte-budgeted LRU so every session downloading the same result reuses them.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+
+def result_hash(result: Dict[str, Any]) -> str:
+    """
+    Stable digest of a result dict.
+
+    Args:
+        result: Analysis result (JSON-serializable apart from stray values,
+            which are stringified)
+
+    Returns:
+        Hex digest identifying the result's content
+    """
+    payload = json.dumps(result, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ArtifactCache:
+    """Thread-safe LRU of built artifacts with single-flight construction."""
+
+    def __init__(self, max_bytes: int = 100 * 1024 * 1024):
+        """
+        Initialize Artifact Cache.
+
+        Args:
+            max_bytes: Memory budget for cached artifacts
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._building = {}
+        self.hits = 0
+        self.builds = 0
+
+    def get_or_build(self, kind: str, key: str, build: Callable[[], bytes]) -> bytes:
+        """
+        Return the artifact for key, building it at most once.
+
+        Concurrent callers asking for the same artifact wait for the build
+        in progress instead of starting their own.
+
+        Args:
+            kind: Artifact type (e.g. 'pdf'), kept apart in the cache
+            key: Content hash of the artifact's inputs
+            build: Zero-argument callable producing the artifact bytes
+
+        Returns:
+            Artifact bytes
+        """
+        entry = (kind, key)
+        while True:
+            with self._lock:
+                artifact = self._entries.get(entry)
+                if artifact is not None:
+                    self._entries.move_to_end(entry)
+                    self.hits += 1
+                    return artifact
+                pending = self._building.get(entry)
+                if pending is None:
+                    pending = threading.Event()
+                    self._building[entry] = pending
+                    break
+            # Another caller is building it; re-check once it is done (or failed)
+            pending.wait()
+
+        try:
+            artifact = build()
+            self._store(entry, artifact)
+            return artifact
+        finally:
+            with self._lock:
+                self._building.pop(entry, None)
+            pending.set()
+
+    def _store(self, entry: tuple, artifact: bytes):
+        """Insert an artifact and evict least recently used ones over budget."""
+        with self._lock:
+            self.builds += 1
+            if len(artifact) > self.max_bytes:
+                return
+            previous = self._entries.pop(entry, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[entry] = artifact
+            self._size += len(artifact)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def clear(self):
+        """Remove all artifacts."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics for display and monitoring."""
+        with self._lock:
+            return {
+                'artifacts': len(self._entries),
+                'bytes': self._size,
+                'hits': self.hits,
+                'builds': self.builds,
+            }
@@ -0,0 +1,151 @@
+"""
+Content-addressed blob store for uploaded images
+Image payloads are kept once per distinct content for the whole process,
+however many sessions upload them. Sessions hold hashes; when the byte
+budget is exceeded, blobs that only idle sessions refer to are evicted
+first, then the least recently used ones.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+
+
+class BlobStore:
+    """Thread-safe, byte-budgeted store of blobs keyed by SHA-256."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, idle_seconds: float = 600):
+        """
+        Initialize Blob Store.
+
+        Args:
+            max_bytes: Memory budget for stored blobs
+            idle_seconds: Owners not seen for this long are considered idle
+                and their blobs become the first eviction candidates
+        """
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._blobs = OrderedDict()
+        self._owners = {}
+        self._last_seen = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.deduplicated = 0
+        self.evictions = 0
+
+    def put(self, data: bytes, owner: Optional[str] = None) -> str:
+        """
+        Store a blob (once per distinct content) and return its hash.
+
+        Args:
+            data: Blob bytes
+            owner: Optional owner id (e.g. a session) referencing the blob
+
+        Returns:
+            Hex SHA-256 of data
+        """
+        blob_hash = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._reference(blob_hash, owner)
+            if blob_hash in self._blobs:
+                self._blobs.move_to_end(blob_hash)
+                self.deduplicated += 1
+            elif len(data) <= self.max_bytes:
+                self._blobs[blob_hash] = data
+                self._size += len(data)
+                self._evict(protect=blob_hash)
+        return blob_hash
+
+    def get(self, blob_hash: str, owner: Optional[str] = None) -> Optional[bytes]:
+        """
+        Look up a blob.
+
+        Returns:
+            Blob bytes, or None if it was never stored or has been evicted
+            (callers rebuild it from its source)
+        """
+        with self._lock:
+            self._reference(blob_hash, owner)
+            data = self._blobs.get(blob_hash)
+            if data is None:
+                self.misses += 1
+                return None
+            self._blobs.move_to_end(blob_hash)
+            self.hits += 1
+            return data
+
+    def touch(self, owner: str):
+        """Mark an owner as active."""
+        with self._lock:
+            self._last_seen[owner] = time.time()
+
+    def release(self, owner: str, keep: Iterable[str] = ()):
+        """
+        Drop an owner's references, except to the hashes in keep.
+
+        Released blobs stay stored (another session may upload the same
+        image) but are evicted first under pressure.
+        """
+        keep = set(keep)
+        with self._lock:
+            for blob_hash, owners in self._owners.items():
+                if blob_hash not in keep:
+                    owners.discard(owner)
+            self._owners = {blob_hash: owners for blob_hash, owners in self._owners.items() if owners}
+            if not keep:
+                self._last_seen.pop(owner, None)
+
+    def _reference(self, blob_hash: str, owner: Optional[str]):
+        if owner is not None:
+            self._owners.setdefault(blob_hash, set()).add(owner)
+            self._last_seen[owner] = time.time()
+
+    def _evict(self, protect: str):
+        """Evict until within budget: unowned blobs first, then least recently used."""
+        if self._size <= self.max_bytes:
+            return
+        # Forget idle owners, so the blobs only they referenced are unowned
+        cutoff = time.time() - self.idle_seconds
+        self._last_seen = {owner: seen for owner, seen in self._last_seen.items() if seen >= cutoff}
+        self._owners = {
+            blob_hash: owners & self._last_seen.keys()
+            for blob_hash, owners in self._owners.items()
+            if owners & self._last_seen.keys()
+        }
+        unowned = [blob_hash for blob_hash in self._blobs if blob_hash not in self._owners]
+        for candidates in (unowned, list(self._blobs)):
+            for blob_hash in candidates:
+                if self._size <= self.max_bytes:
+                    return
+                if blob_hash == protect or blob_hash not in self._blobs:
+                    continue
+                self._size -= len(self._blobs.pop(blob_hash))
+                self.evictions += 1
+
+    def __contains__(self, blob_hash: str) -> bool:
+        with self._lock:
+            return blob_hash in self._blobs
+
+    def clear(self):
+        """Remove all blobs and references."""
+        with self._lock:
+            self._blobs.clear()
+            self._owners.clear()
+            self._last_seen.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Store statistics for display and monitoring."""
+        with self._lock:
+            return {
+                'blobs': len(self._blobs),
+                'bytes': self._size,
+                'owners': len(self._last_seen),
+                'hits': self.hits,
+                'misses': self.misses,
+                'deduplicated': self.deduplicated,
+                'evictions': self.evictions,
+            }
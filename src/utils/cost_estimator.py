@@ -0,0 +1,171 @@
+"""
+Pre-flight token, cost and latency estimation for analysis requests
+"""
+import math
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from ..config import MODEL_PRICING, EXPECTED_OUTPUT_TOKENS
+
+
+# OpenAI vision tiling: (base tokens, tokens per 512px tile) per model family
+OPENAI_IMAGE_TOKENS = {
+    "gpt-4o-mini": (2833, 5667),
+    "gpt-4o": (85, 170),
+}
+
+# Gemini: small images cost a flat amount, larger ones are tiled at 768px
+GEMINI_SMALL_IMAGE_MAX = 384
+GEMINI_TILE_SIZE = 768
+GEMINI_TOKENS_PER_TILE = 258
+
+
+@lru_cache(maxsize=1)
+def _tiktoken():
+    """tiktoken module, imported on first use (None when not installed)."""
+    try:
+        import tiktoken
+    except ImportError:  # Optional: fall back to a character-based estimate
+        return None
+    return tiktoken
+
+
+def count_text_tokens(text: str, model: str = "gpt-4o") -> int:
+    """
+    Count prompt tokens.
+
+    Uses tiktoken when installed, otherwise roughly 4 characters per token.
+    """
+    tiktoken = _tiktoken()
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4)
+
+
+def _openai_tile_costs(model: str) -> Tuple[int, int]:
+    """Base and per-tile token cost for an OpenAI model."""
+    for prefix in sorted(OPENAI_IMAGE_TOKENS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return OPENAI_IMAGE_TOKENS[prefix]
+    return OPENAI_IMAGE_TOKENS["gpt-4o"]
+
+
+def estimate_image_tokens(width: int, height: int, provider: str, model: str, detail: str = "high") -> int:
+    """
+    Apply the provider's tiling rules to one image.
+
+    Args:
+        width: Image width in pixels
+        height: Image height in pixels
+        provider: 'openai' or 'gemini'
+        model: Model identifier
+        detail: OpenAI detail level ('high' or 'low'); ignored by Gemini
+
+    Returns:
+        Estimated input tokens for the image
+    """
+    if provider == 'gemini':
+        if width <= GEMINI_SMALL_IMAGE_MAX and height <= GEMINI_SMALL_IMAGE_MAX:
+            return GEMINI_TOKENS_PER_TILE
+        tiles = math.ceil(width / GEMINI_TILE_SIZE) * math.ceil(height / GEMINI_TILE_SIZE)
+        return tiles * GEMINI_TOKENS_PER_TILE
+
+    base, per_tile = _openai_tile_costs(model)
+    if detail == "low":
+        return base
+
+    # Fit within 2048x2048, then scale so the shortest side is at most 768px
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return base + per_tile * tiles
+
+
+def _pricing(model: str) -> Dict[str, float]:
+    """Pricing and throughput entry for a model (falls back to the most expensive known)."""
+    if model in MODEL_PRICING:
+        return MODEL_PRICING[model]
+    return max(MODEL_PRICING.values(), key=lambda price: price["input"])
+
+
+def estimate_analysis(
+    image_sizes: Sequence[Tuple[int, int]],
+    prompt: str,
+    provider: str,
+    model: str,
+    max_output_tokens: int,
+    budget_usd: Optional[float] = None
+) -> Dict[str, object]:
+    """
+    Predict the tokens, cost and latency of an analysis before sending it.
+
+    When a budget is given (OpenAI only), images are downgraded from high to
+    low detail, largest savings first, until the expected cost fits.
+
+    Args:
+        image_sizes: (width, height) of every image, in request order
+        prompt: Full prompt text sent with the images
+        provider: 'openai' or 'gemini'
+        model: Model identifier
+        max_output_tokens: Output token limit of the request
+        budget_usd: Optional cost ceiling per request
+
+    Returns:
+        Dictionary with token counts, costs, latency and per-image detail
+    """
+    pricing = _pricing(model)
+    prompt_tokens = count_text_tokens(prompt, model)
+    expected_output = min(EXPECTED_OUTPUT_TOKENS, max_output_tokens)
+
+    details = ["high"] * len(image_sizes)
+    image_tokens = [
+        estimate_image_tokens(w, h, provider, model, "high") for w, h in image_sizes
+    ]
+
+    def expected_cost() -> float:
+        input_tokens = prompt_tokens + sum(image_tokens)
+        return (input_tokens * pricing["input"] + expected_output * pricing["output"]) / 1_000_000
+
+    if budget_usd is not None and provider == 'openai':
+        savings = sorted(
+            (
+                (tokens - estimate_image_tokens(w, h, provider, model, "low"), index)
+                for index, ((w, h), tokens) in enumerate(zip(image_sizes, image_tokens))
+            ),
+            reverse=True
+        )
+        for saving, index in savings:
+            if expected_cost() <= budget_usd or saving <= 0:
+                break
+            details[index] = "low"
+            image_tokens[index] -= saving
+
+    input_tokens = prompt_tokens + sum(image_tokens)
+    cost = expected_cost()
+    latency = (
+        pricing["base_latency_seconds"]
+        + input_tokens / pricing["input_tokens_per_second"]
+        + expected_output / pricing["output_tokens_per_second"]
+    )
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "image_tokens": sum(image_tokens),
+        "input_tokens": input_tokens,
+        "output_budget": max_output_tokens,
+        "expected_output_tokens": expected_output,
+        "cost_usd": round(cost, 4),
+        "max_cost_usd": round(
+            (input_tokens * pricing["input"] + max_output_tokens * pricing["output"]) / 1_000_000, 4
+        ),
+        "latency_seconds": round(latency, 1),
+        "details": details,
+        "within_budget": budget_usd is None or cost <= budget_usd,
+    }
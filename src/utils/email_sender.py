@@ -10,7 +10,8 @@ from email.mime.application import MIMEApplication
 from datetime import datetime
 from typing import Optional, List
 import os
-import re
+
+from .markdown_ast import markdown_html
 
 
 class EmailSender:
@@ -211,82 +212,12 @@ Or provide credentials in the email form for testing."""
     
     def _markdown_to_html(self, text: str) -> str:
         """
-        Convert simple markdown to HTML with proper formatting.
+        Convert analysis markdown to HTML with proper formatting.
         
         Args:
             text: Markdown formatted text
             
         Returns:
-            HTML formatted text
+            HTML formatted text (from the shared, cached document tree)
         """
-        lines = text.split('\n')
-        formatted_lines = []
-        in_list = False
-        
-        for line in lines:
-            stripped = line.strip()
-            
-            if not stripped:
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                formatted_lines.append('<br>')
-                continue
-            
-            # Handle headers
-            if stripped.startswith('### '):
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                formatted_lines.append(f'<h3>{stripped[4:]}</h3>')
-            elif stripped.startswith('## '):
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                formatted_lines.append(f'<h3>{stripped[3:]}</h3>')
-            elif stripped.startswith('# '):
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                formatted_lines.append(f'<h2>{stripped[2:]}</h2>')
-            # Handle bullet points
-            elif stripped.startswith('• ') or stripped.startswith('- ') or stripped.startswith('* '):
-                bullet_text = stripped.lstrip('•-* ').strip()
-                # Remove ** bold markers
-                bullet_text = bullet_text.replace('**', '<strong>').replace('**', '</strong>')
-                # Fix any unpaired tags
-                if bullet_text.count('<strong>') != bullet_text.count('</strong>'):
-                    bullet_text = bullet_text.replace('<strong>', '').replace('</strong>', '')
-                
-                if not in_list:
-                    formatted_lines.append('<ul style="margin-left: 20px; margin-bottom: 10px;">')
-                    in_list = True
-                formatted_lines.append(f'<li style="margin-bottom: 5px;">{bullet_text}</li>')
-            # Handle numbered lists
-            elif re.match(r'^\d+\.', stripped):
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                formatted_lines.append(f'<p>{stripped}</p>')
-            # Handle bold text (lines that are fully wrapped in **)
-            elif stripped.startswith('**') and stripped.endswith('**') and len(stripped) > 4:
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                formatted_lines.append(f'<h4 style="color: #2c5f99; margin-top: 15px;">{stripped[2:-2]}</h4>')
-            else:
-                if in_list:
-                    formatted_lines.append('</ul>')
-                    in_list = False
-                # Handle inline bold
-                para = stripped.replace('**', '<strong>').replace('**', '</strong>')
-                # Fix any unpaired tags
-                if para.count('<strong>') != para.count('</strong>'):
-                    para = para.replace('<strong>', '').replace('</strong>', '')
-                formatted_lines.append(f'<p style="margin-bottom: 8px;">{para}</p>')
-        
-        # Close list if still open
-        if in_list:
-            formatted_lines.append('</ul>')
-        
-        return '\n'.join(formatted_lines)
+        return markdown_html(text)
@@ -1,9 +1,23 @@
 """
 Image processing utilities
 """
-from PIL import Image
+from PIL import Image, ImageChops, ImageOps
 import io
-from typing import List, Tuple
+from typing import List, Optional, Tuple, Union
+
+from ..config import (
+    PROVIDER_IMAGE_LIMITS, IMAGE_OUTPUT_FORMAT, IMAGE_OUTPUT_QUALITY,
+    THUMBNAIL_MAX_DIMENSION, THUMBNAIL_QUALITY
+)
+
+
+# Magic-byte signatures of the formats providers accept
+_MIME_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
 
 
 def validate_image(image_bytes: bytes, max_size_mb: int = 10) -> Tuple[bool, str]:
@@ -93,3 +107,211 @@ def get_image_info(image_bytes: bytes) -> dict:
         }
     except Exception as e:
         return {'error': str(e)}
+
+
+def detect_mime_type(image_bytes: bytes) -> str:
+    """
+    Detect an image's MIME type from its magic bytes.
+    
+    Args:
+        image_bytes: Image file bytes
+        
+    Returns:
+        MIME type string (defaults to image/jpeg when unknown)
+    """
+    if image_bytes[:4] == b'RIFF' and image_bytes[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, mime_type in _MIME_SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    return 'image/jpeg'
+
+
+def orient_image(image: Image.Image) -> Image.Image:
+    """
+    Apply the EXIF orientation tag.
+    
+    Unlike ImageOps.exif_transpose, returns the image itself (not a full
+    copy) when no rotation is needed.
+    """
+    if image.getexif().get(0x0112, 1) in (None, 1):
+        return image
+    return ImageOps.exif_transpose(image)
+
+
+def make_thumbnail(
+    image_bytes: bytes,
+    max_dimension: int = THUMBNAIL_MAX_DIMENSION,
+    quality: int = THUMBNAIL_QUALITY,
+    decoded: Optional[Image.Image] = None
+) -> bytes:
+    """
+    Encode a small JPEG preview of an image.
+    
+    JPEG files are decoded directly at reduced scale (draft mode lets the
+    decoder skip up to 7/8 of the work). Other formats are shrunk with
+    integer reduction before the final resample.
+    
+    Args:
+        image_bytes: Image file bytes
+        max_dimension: Longest side of the preview
+        quality: JPEG quality of the preview
+        decoded: Already decoded, oriented copy of a non-JPEG image (skips a decode)
+        
+    Returns:
+        JPEG bytes
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    if image.format == 'JPEG':
+        image.draft('L' if image.mode == 'L' else 'RGB', (max_dimension, max_dimension))
+        image = orient_image(image)
+    elif decoded is not None:
+        image = decoded
+    else:
+        image = orient_image(image)
+    
+    scale = min(1.0, max_dimension / max(image.width, image.height))
+    if scale < 1.0:
+        new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(new_size, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    
+    output = io.BytesIO()
+    image.save(output, format='JPEG', quality=quality)
+    return output.getvalue()
+
+
+def is_effectively_grayscale(image: Image.Image, chroma_threshold: int = 24,
+                             max_colored_fraction: float = 0.005) -> bool:
+    """
+    Check whether colour carries no information in an image.
+    
+    Scans a small copy and counts pixels whose channel spread exceeds the
+    threshold; scans, print and JPEG noise stay below it.
+    
+    Args:
+        image: PIL image
+        chroma_threshold: Max-min channel difference regarded as colour
+        max_colored_fraction: Fraction of coloured pixels tolerated (logos, stamps)
+        
+    Returns:
+        True if the image can be converted to grayscale without losing information
+    """
+    if image.mode in ('1', 'L', 'LA', 'I', 'F'):
+        return True
+    
+    sample = image.convert('RGB')
+    sample.thumbnail((128, 128))
+    r, g, b = sample.split()
+    highest = ImageChops.lighter(ImageChops.lighter(r, g), b)
+    lowest = ImageChops.darker(ImageChops.darker(r, g), b)
+    histogram = ImageChops.difference(highest, lowest).histogram()
+    
+    colored = sum(histogram[chroma_threshold:])
+    return colored <= max_colored_fraction * sum(histogram)
+
+
+def preprocess_image(
+    image: Union[bytes, Image.Image],
+    max_dimension: int = 2048,
+    max_short_side: Optional[int] = None,
+    grayscale: Union[bool, str] = 'auto',
+    output_format: str = 'JPEG',
+    quality: int = 85,
+    original_size: Optional[int] = None,
+    decoded: Optional[Image.Image] = None
+) -> dict:
+    """
+    Prepare an image for upload to a provider.
+    
+    Downscales to the provider's effective resolution, converts to grayscale
+    when colour carries no information, and re-encodes at the given quality.
+    The original bytes are kept if re-encoding would not make them smaller.
+    
+    Args:
+        image: Image file bytes or an already decoded PIL image
+        max_dimension: Maximum width or height
+        max_short_side: Optional maximum for the shorter side
+        grayscale: True, False or 'auto' (detect)
+        output_format: 'JPEG' or 'WEBP'
+        quality: Encoder quality (1-95)
+        original_size: Size of the original file when passing a PIL image
+        decoded: Already decoded copy of the image bytes (skips a second decode)
+        
+    Returns:
+        Dictionary with the processed bytes, MIME type, dimensions and bytes saved
+    """
+    image_bytes = image if isinstance(image, bytes) else None
+    if image_bytes is not None:
+        image = decoded if decoded is not None else Image.open(io.BytesIO(image_bytes))
+        original_size = len(image_bytes)
+    
+    # Honour camera/scanner orientation before measuring
+    image = orient_image(image)
+    
+    scale = min(1.0, max_dimension / max(image.width, image.height))
+    if max_short_side:
+        scale = min(scale, max_short_side / min(image.width, image.height))
+    resized = scale < 1.0
+    if resized:
+        new_size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(new_size, Image.Resampling.LANCZOS)
+    
+    to_grayscale = is_effectively_grayscale(image) if grayscale == 'auto' else bool(grayscale)
+    if to_grayscale:
+        image = image.convert('L')
+    elif image.mode != 'RGB':
+        # JPEG/WebP output: flatten transparency onto white
+        rgba = image.convert('RGBA')
+        image = Image.new('RGB', rgba.size, (255, 255, 255))
+        image.paste(rgba, mask=rgba.split()[3])
+    
+    output = io.BytesIO()
+    save_kwargs = {'quality': quality}
+    if output_format.upper() == 'JPEG':
+        save_kwargs.update(optimize=True, progressive=True)
+    image.save(output, format=output_format.upper(), **save_kwargs)
+    processed = output.getvalue()
+    mime_type = f"image/{output_format.lower()}"
+    
+    # Re-encoding a small, already compact file can make it bigger
+    if image_bytes is not None and not resized and len(processed) >= len(image_bytes):
+        processed = image_bytes
+        mime_type = detect_mime_type(image_bytes)
+        to_grayscale = False
+    
+    original_size = original_size or len(processed)
+    return {
+        'bytes': processed,
+        'mime_type': mime_type,
+        'width': image.width,
+        'height': image.height,
+        'grayscale': to_grayscale,
+        'original_size': original_size,
+        'processed_size': len(processed),
+        'bytes_saved': max(0, original_size - len(processed)),
+    }
+
+
+def preprocess_for_provider(image: Union[bytes, Image.Image], provider: str, **overrides) -> dict:
+    """
+    Preprocess an image using a provider's effective resolution and the configured encoding.
+    
+    Args:
+        image: Image file bytes or decoded PIL image
+        provider: 'openai' or 'gemini'
+        **overrides: Keyword arguments passed through to preprocess_image
+        
+    Returns:
+        Dictionary as returned by preprocess_image
+    """
+    limits = PROVIDER_IMAGE_LIMITS.get(provider, PROVIDER_IMAGE_LIMITS['openai'])
+    options = {
+        'max_dimension': limits['max_dimension'],
+        'max_short_side': limits['max_short_side'],
+        'output_format': IMAGE_OUTPUT_FORMAT,
+        'quality': IMAGE_OUTPUT_QUALITY,
+    }
+    options.update(overrides)
+    return preprocess_image(image, **options)
@@ -0,0 +1,223 @@
+"""
+Upload ingestion
+Each uploaded file is decoded once into a record holding its validation
+status, metadata, the payload sent to providers and a preview thumbnail.
+Records are reused on later reruns until the file set changes. With a
+blob store, records hold only the payload's hash and the bytes are shared
+by every session that uploads the same image; the cache itself keeps no
+upload bytes (an evicted payload is rebuilt from the caller's uploads).
+"""
+import hashlib
+import io
+from typing import Callable, Iterable, Mapping, Optional
+
+from PIL import Image
+
+from .artifact_cache import ArtifactCache
+from .blob_store import BlobStore
+from .image_utils import preprocess_for_provider, make_thumbnail, orient_image
+from ..config import THUMBNAIL_MAX_DIMENSION
+
+
+def ingest_image(
+    image_bytes: bytes,
+    max_size_mb: float = 10,
+    provider: Optional[str] = None,
+    thumbnail_size: Optional[int] = THUMBNAIL_MAX_DIMENSION,
+    thumbnail_cache: Optional[ArtifactCache] = None,
+    content_hash: Optional[str] = None
+) -> dict:
+    """
+    Validate, describe, preprocess and thumbnail an image in a single decode.
+
+    JPEG thumbnails come from a separate reduced-scale draft decode, which
+    is cheaper than shrinking the full-resolution image.
+
+    Args:
+        image_bytes: Uploaded file bytes
+        max_size_mb: Maximum allowed file size in MB
+        provider: Preprocess the payload for this provider ('openai' or
+            'gemini'); None sends the original bytes
+        thumbnail_size: Longest side of the preview thumbnail (None skips it)
+        thumbnail_cache: Optional shared cache; thumbnails are built once per
+            content hash and size across all sessions
+        content_hash: SHA-256 of image_bytes, if already known
+
+    Returns:
+        Dictionary with 'valid', 'message', 'info', 'payload' (bytes to send),
+        'width'/'height' of the payload, 'processed' (preprocessing stats or
+        None) and 'thumbnail' (None when skipped)
+    """
+    record = {
+        'valid': False,
+        'message': '',
+        'info': {},
+        'payload': None,
+        'width': None,
+        'height': None,
+        'processed': None,
+        'thumbnail': None,
+    }
+
+    size_mb = len(image_bytes) / (1024 * 1024)
+    if size_mb > max_size_mb:
+        record['message'] = f"File size ({size_mb:.2f}MB) exceeds maximum allowed size ({max_size_mb}MB)"
+        return record
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        image_format = image.format
+        # A full decode catches truncated and corrupt files, like verify() did
+        image.load()
+    except Exception as e:
+        record['message'] = f"Invalid image file: {str(e)}"
+        return record
+
+    record['info'] = {
+        'format': image_format,
+        'mode': image.mode,
+        'size': image.size,
+        'width': image.width,
+        'height': image.height,
+        'file_size_mb': size_mb
+    }
+
+    oriented = orient_image(image)
+    if provider:
+        processed = preprocess_for_provider(image_bytes, provider, decoded=oriented)
+        record['payload'] = processed.pop('bytes')
+        record['width'], record['height'] = processed['width'], processed['height']
+        record['processed'] = processed
+    else:
+        record['payload'] = image_bytes
+        record['width'], record['height'] = image.width, image.height
+
+    def build_thumbnail() -> bytes:
+        return make_thumbnail(image_bytes, thumbnail_size, decoded=oriented)
+
+    if thumbnail_size and thumbnail_cache is not None:
+        key = f"{content_hash or hashlib.sha256(image_bytes).hexdigest()}:{thumbnail_size}"
+        record['thumbnail'] = thumbnail_cache.get_or_build('thumbnail', key, build_thumbnail)
+    elif thumbnail_size:
+        record['thumbnail'] = build_thumbnail()
+    record['valid'] = True
+    record['message'] = "Valid image"
+    return record
+
+
+class IngestionCache:
+    """Per-session ingestion records keyed by upload file id and content hash."""
+
+    def __init__(
+        self,
+        thumbnail_cache: Optional[ArtifactCache] = None,
+        blob_store: Optional[BlobStore] = None,
+        owner: Optional[str] = None
+    ):
+        """
+        Initialize Ingestion Cache.
+
+        Args:
+            thumbnail_cache: Optional process-wide cache for preview thumbnails
+            blob_store: Optional process-wide store for payloads; records then
+                carry 'payload_hash' instead of the bytes (see payload())
+            owner: Id of the session holding this cache, for the blob store
+        """
+        self.thumbnail_cache = thumbnail_cache
+        self.blob_store = blob_store
+        self.owner = owner
+        self._hashes = {}
+        self._records = {}
+        self._sources = {}
+        self.decodes = 0
+
+    def ingest(self, file_id: str, read: Callable[[], bytes], **options) -> dict:
+        """
+        Return the ingestion record for an upload, decoding it only once.
+
+        Args:
+            file_id: Identity of the upload (e.g. UploadedFile.file_id)
+            read: Zero-argument callable returning the file bytes; only
+                called for uploads not seen before
+            **options: Keyword arguments for ingest_image; records are kept
+                per distinct set of options
+
+        Returns:
+            Record as returned by ingest_image, plus 'content_hash' (and
+            'payload_hash' with 'payload' set to None when a blob store is used)
+        """
+        content_hash = self._hashes.get(file_id)
+        if content_hash is None:
+            content_hash = hashlib.sha256(read()).hexdigest()
+            self._hashes[file_id] = content_hash
+
+        key = (content_hash, tuple(sorted(options.items())))
+        record = self._records.get(key)
+        if record is None:
+            record = ingest_image(
+                read(), thumbnail_cache=self.thumbnail_cache, content_hash=content_hash, **options
+            )
+            record['content_hash'] = content_hash
+            if self.blob_store is not None and record['valid']:
+                record['payload_hash'] = self.blob_store.put(record['payload'], self.owner)
+                record['payload'] = None
+                self._sources[record['payload_hash']] = (content_hash, options)
+            self._records[key] = record
+            self.decodes += 1
+        return record
+
+    def payload(self, record: dict, uploads: Optional[Mapping[str, Callable[[], bytes]]] = None) -> bytes:
+        """
+        Bytes to send to the provider for a record.
+
+        Args:
+            record: Record returned by ingest()
+            uploads: Read callables of the current uploads by file id; a
+                payload evicted from the blob store is rebuilt from the
+                upload with the record's content hash
+
+        Raises:
+            ValueError: If the payload was evicted and its upload is not
+                among uploads
+        """
+        if record.get('payload_hash') is None:
+            return record['payload']
+
+        data = self.blob_store.get(record['payload_hash'], self.owner)
+        if data is None:
+            content_hash, options = self._sources[record['payload_hash']]
+            read = next(
+                (read for file_id, read in (uploads or {}).items() if self._hashes.get(file_id) == content_hash),
+                None
+            )
+            if read is None:
+                raise ValueError("Image payload is no longer available; please upload the image again")
+            data = ingest_image(read(), **{**options, 'thumbnail_size': None})['payload']
+            self.blob_store.put(data, self.owner)
+        return data
+
+    def retain(self, file_ids: Iterable[str]):
+        """Drop records of uploads that are no longer present."""
+        file_ids = set(file_ids)
+        self._hashes = {
+            file_id: content_hash
+            for file_id, content_hash in self._hashes.items()
+            if file_id in file_ids
+        }
+        live = set(self._hashes.values())
+        self._records = {
+            key: record for key, record in self._records.items() if key[0] in live
+        }
+
+        if self.blob_store is not None:
+            payload_hashes = {record.get('payload_hash') for record in self._records.values()}
+            self._sources = {
+                payload_hash: source for payload_hash, source in self._sources.items()
+                if payload_hash in payload_hashes
+            }
+            self.blob_store.release(self.owner, keep=self._sources)
+            if self._sources:
+                self.blob_store.touch(self.owner)
+
+    def __len__(self) -> int:
+        return len(self._records)
@@ -0,0 +1,61 @@
+"""
+Latency tracking for provider calls
+Keeps a rolling window of observed latencies per provider/model.
+"""
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Optional
+
+
+class LatencyTracker:
+    """Rolling latency samples per (provider, model) with percentile lookups."""
+
+    def __init__(self, window: int = 200):
+        """
+        Initialize Latency Tracker.
+
+        Args:
+            window: Number of most recent samples kept per provider/model
+        """
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, model: str, seconds: float):
+        """Record one latency sample."""
+        with self._lock:
+            self._samples[(provider, model)].append(seconds)
+
+    def percentile(self, provider: str, model: str, pct: float) -> Optional[float]:
+        """
+        Return the pct-th percentile latency, or None without samples.
+
+        Args:
+            provider: Provider name
+            model: Model identifier
+            pct: Percentile between 0 and 100
+        """
+        with self._lock:
+            samples = sorted(self._samples.get((provider, model), ()))
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(pct / 100 * (len(samples) - 1)))))
+        return samples[index]
+
+    def sample_count(self, provider: str, model: str) -> int:
+        """Number of samples recorded for provider/model."""
+        with self._lock:
+            return len(self._samples.get((provider, model), ()))
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Summary (count, p50, p95) per provider/model for display."""
+        with self._lock:
+            keys = list(self._samples.keys())
+        return {
+            f"{provider}/{model}": {
+                'count': self.sample_count(provider, model),
+                'p50': self.percentile(provider, model, 50),
+                'p95': self.percentile(provider, model, 95),
+            }
+            for provider, model in keys
+        }
@@ -0,0 +1,204 @@
+"""
+Markdown document tree shared by the PDF, email and HTML renderers
+Analysis text is parsed once into a compact, immutable tree of blocks and
+inline spans; each back end walks the tree instead of re-parsing the text
+with its own regexes. Parsed trees and rendered HTML are cached per text.
+
+Tree shape (plain tuples, safe to share between threads):
+    document  = (block, ...)
+    block     = ('heading', level, inlines)      # '#'..'######'; a line that is
+                                                 # entirely **bold** is level 4
+              | ('paragraph', inlines)
+              | ('list', (item, ...))
+              | ('rule',)
+    item      = (depth, number, inlines)         # number is None for bullets
+    inlines   = ((style, text), ...)             # style: '', 'strong' or 'em'
+"""
+import html
+import re
+from functools import lru_cache
+
+from ..config import MARKDOWN_CACHE_ENTRIES
+
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*$')
+_RULE = re.compile(r'^(?:-{3,}|\*{3,}|_{3,})$')
+_BULLET = re.compile(r'^[•\-*+]\s+(.*)$')
+_NUMBERED = re.compile(r'^(\d+)[.)]\s+(.*)$')
+_BOLD_LINE = re.compile(r'^\*\*((?:(?!\*\*).)+)\*\*:?$')
+_INLINE = re.compile(
+    r'\*\*(?=\S)(.+?)(?<=\S)\*\*'                   # **strong**
+    r'|(?<![*\w])\*(?=[^\s*])([^*]+?)(?<=\S)\*(?![*\w])'  # *em*
+)
+
+# Spaces of indentation per list nesting level
+_INDENT_PER_LEVEL = 2
+
+
+def parse_inline(text: str) -> tuple:
+    """Split a line into (style, text) spans; unpaired markers stay literal."""
+    spans = []
+    position = 0
+    for match in _INLINE.finditer(text):
+        if match.start() > position:
+            spans.append(('', text[position:match.start()]))
+        if match.group(1) is not None:
+            spans.append(('strong', match.group(1)))
+        else:
+            spans.append(('em', match.group(2)))
+        position = match.end()
+    if position < len(text):
+        spans.append(('', text[position:]))
+    return tuple(spans)
+
+
+@lru_cache(maxsize=MARKDOWN_CACHE_ENTRIES)
+def parse_markdown(text: str) -> tuple:
+    """
+    Parse analysis markdown into a document tree (cached per text).
+
+    Args:
+        text: Markdown as returned by the model
+
+    Returns:
+        Document tree (see module docstring)
+    """
+    blocks = []
+    paragraph = []
+    items = []
+
+    def flush():
+        if paragraph:
+            blocks.append(('paragraph', parse_inline(" ".join(paragraph))))
+            paragraph.clear()
+        if items:
+            blocks.append(('list', tuple(
+                (depth, number, parse_inline(" ".join(lines))) for depth, number, lines in items
+            )))
+            items.clear()
+
+    for raw_line in text.split('\n'):
+        line = raw_line.strip()
+        if not line:
+            flush()
+            continue
+
+        heading = _HEADING.match(line)
+        if heading:
+            flush()
+            blocks.append(('heading', len(heading.group(1)), parse_inline(heading.group(2))))
+            continue
+        if _RULE.match(line):
+            flush()
+            blocks.append(('rule',))
+            continue
+
+        bullet = _BULLET.match(line)
+        numbered = None if bullet else _NUMBERED.match(line)
+        if bullet or numbered:
+            if paragraph:
+                flush()
+            indent = len(raw_line.expandtabs(4)) - len(raw_line.expandtabs(4).lstrip())
+            depth = indent // _INDENT_PER_LEVEL
+            if bullet:
+                items.append((depth, None, [bullet.group(1)]))
+            else:
+                items.append((depth, int(numbered.group(1)), [numbered.group(2)]))
+            continue
+        if items:
+            # Lazy continuation of the previous list item
+            items[-1][2].append(line)
+            continue
+
+        bold_line = _BOLD_LINE.match(line)
+        if bold_line and not paragraph:
+            blocks.append(('heading', 4, parse_inline(bold_line.group(1).strip())))
+            continue
+        paragraph.append(line)
+
+    flush()
+    return tuple(blocks)
+
+
+def plain_text(inlines: tuple) -> str:
+    """Text of inline spans without formatting."""
+    return "".join(text for _, text in inlines)
+
+
+def render_inline_html(inlines: tuple) -> str:
+    """HTML for inline spans (text is escaped)."""
+    parts = []
+    for style, text in inlines:
+        text = html.escape(text, quote=False)
+        if style == 'strong':
+            parts.append(f"<strong>{text}</strong>")
+        elif style == 'em':
+            parts.append(f"<em>{text}</em>")
+        else:
+            parts.append(text)
+    return "".join(parts)
+
+
+# Tags and inline styles of the HTML back end (inline, so they survive email clients)
+_HTML_HEADINGS = {1: 'h2', 2: 'h3', 3: 'h3'}
+_HTML_SUBHEADING = '<h4 style="color: #2c5f99; margin-top: 15px;">{}</h4>'
+_HTML_LIST_STYLE = ' style="margin-left: 20px; margin-bottom: 10px;"'
+_HTML_ITEM_STYLE = ' style="margin-bottom: 5px;"'
+
+
+def _render_list_html(items: tuple) -> str:
+    """Nested <ul>/<ol> markup from list items with depths."""
+    lines = []
+    open_tags = []  # tag of each open list, outermost first
+    for depth, number, inlines in items:
+        tag = 'ul' if number is None else 'ol'
+        # A list can only nest one level below the open item
+        depth = min(depth, len(open_tags))
+        while len(open_tags) > depth + 1:
+            lines.append(f"</li></{open_tags.pop()}>")
+        if len(open_tags) == depth + 1:
+            if open_tags[-1] == tag:
+                lines.append("</li>")
+            else:
+                lines.append(f"</li></{open_tags.pop()}>")
+        if len(open_tags) == depth:
+            start = f' start="{number}"' if number not in (None, 1) else ''
+            lines.append(f"<{tag}{start}{_HTML_LIST_STYLE}>")
+            open_tags.append(tag)
+        lines.append(f"<li{_HTML_ITEM_STYLE}>{render_inline_html(inlines)}")
+    while open_tags:
+        lines.append(f"</li></{open_tags.pop()}>")
+    return "\n".join(lines)
+
+
+def render_html(document: tuple) -> str:
+    """
+    HTML back end.
+
+    Args:
+        document: Tree from parse_markdown
+
+    Returns:
+        HTML fragment (headings, paragraphs, lists and rules)
+    """
+    parts = []
+    for block in document:
+        kind = block[0]
+        if kind == 'heading':
+            _, level, inlines = block
+            content = render_inline_html(inlines)
+            tag = _HTML_HEADINGS.get(level)
+            parts.append(f"<{tag}>{content}</{tag}>" if tag else _HTML_SUBHEADING.format(content))
+        elif kind == 'paragraph':
+            parts.append(f'<p style="margin-bottom: 8px;">{render_inline_html(block[1])}</p>')
+        elif kind == 'list':
+            parts.append(_render_list_html(block[1]))
+        elif kind == 'rule':
+            parts.append('<hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">')
+    return "\n".join(parts)
+
+
+@lru_cache(maxsize=MARKDOWN_CACHE_ENTRIES)
+def markdown_html(text: str) -> str:
+    """HTML for markdown text (render_html of its tree), cached per text."""
+    return render_html(parse_markdown(text))
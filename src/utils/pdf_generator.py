@@ -4,20 +4,132 @@ PDF Export Utility
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak, Table, TableStyle, Image
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
 from reportlab.lib import colors
+from reportlab.platypus.flowables import Flowable, HRFlowable
 from datetime import datetime
+from collections import OrderedDict
+from typing import BinaryIO, Iterable, Iterator, Optional, Sequence, Tuple, Union
+import hashlib
 import io
-import re
+import threading
+
+from ..config import PDF_APPENDIX_DPI, PDF_APPENDIX_QUALITY, PDF_PARAGRAPH_CACHE_ENTRIES
+from .artifact_cache import result_hash
+from .image_utils import preprocess_image
+from .markdown_ast import parse_markdown
+
+
+# Width reserved for page numbers at the right of table of contents entries
+TOC_PAGE_COLUMN = 0.6*inch
+
+# Box a source page is fitted into in the appendix (leaves room for its caption)
+APPENDIX_IMAGE_BOX = (7*inch, 8*inch)
+
+
+def _page_number_form(key: str) -> str:
+    return f"page-of-{key}"
+
+
+class _SectionStart(Flowable):
+    """
+    Zero-size marker at the start of a bundle section.
+    
+    When drawn it bookmarks the page, adds the outline entry and defines the
+    form holding the section's page number, which the table of contents
+    (already drawn on earlier pages) references. PDF resolves forms when the
+    file is written, so the contents need no second layout pass.
+    """
+    
+    def __init__(self, key: str, title: str):
+        super().__init__()
+        self.key = key
+        self.title = title
+    
+    def wrap(self, availWidth, availHeight):
+        return 0, 0
+    
+    def draw(self):
+        canvas = self.canv
+        canvas.bookmarkPage(self.key)
+        canvas.addOutlineEntry(self.title, self.key, level=0)
+        canvas.beginForm(_page_number_form(self.key), lowerx=-TOC_PAGE_COLUMN, lowery=-4, upperx=0, uppery=16)
+        canvas.setFont('Helvetica', 11)
+        canvas.drawRightString(0, 0, str(canvas.getPageNumber()))
+        canvas.endForm()
+
+
+class _TocEntry(Flowable):
+    """Table of contents line: linked title, page number drawn from the section's form."""
+    
+    def __init__(self, paragraph: Paragraph, key: str):
+        super().__init__()
+        self.paragraph = paragraph
+        self.key = key
+    
+    def wrap(self, availWidth, availHeight):
+        self.width = availWidth
+        _, self.height = self.paragraph.wrap(availWidth - TOC_PAGE_COLUMN, availHeight)
+        return self.width, self.height
+    
+    def draw(self):
+        self.paragraph.drawOn(self.canv, 0, 0)
+        # Baseline of the title's last line
+        baseline = self.paragraph.style.leading - self.paragraph.style.fontSize
+        self.canv.saveState()
+        self.canv.translate(self.width, baseline)
+        self.canv.doForm(_page_number_form(self.key))
+        self.canv.restoreState()
+
+
+class _LazyFlowables(list):
+    """
+    Flowable list filled from an iterator just ahead of the layout.
+    
+    Reportlab's build() consumes its list from the front and only looks a
+    few items ahead (keepWithNext chains), so flowables are created shortly
+    before their page is laid out and released once it is drawn; the report
+    is never held as a whole.
+    """
+    
+    LOOKAHEAD = 32
+    
+    def __init__(self, flowables: Iterable):
+        super().__init__()
+        self._source = iter(flowables)
+        self._fill(self.LOOKAHEAD)
+    
+    def _fill(self, count: int):
+        while self._source is not None and super().__len__() < count:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+    
+    def __len__(self):
+        self._fill(self.LOOKAHEAD)
+        return super().__len__()
+    
+    def __getitem__(self, index):
+        if isinstance(index, int) and index >= 0:
+            self._fill(index + 1)
+        return super().__getitem__(index)
 
 
 class PDFGenerator:
     """Generate PDF reports from analysis results."""
     
+    # Result fields that appear in the report (cache hits, retries etc. do not)
+    REPORT_FIELDS = ('analysis', 'provider', 'model', 'role', 'image_count')
+    
     def __init__(self):
         self.styles = getSampleStyleSheet()
         self._setup_custom_styles()
+        # Parsed paragraph fragments per (inline spans, style name); parsing
+        # the markup is most of the cost of building the flowables
+        self._paragraph_frags = OrderedDict()
+        self._paragraph_frags_lock = threading.Lock()
     
     def _setup_custom_styles(self):
         """Setup custom paragraph styles."""
@@ -64,6 +176,30 @@ class PDFGenerator:
             leading=14
         ))
         
+        # List items (bullet or number hangs in the indent)
+        self.styles.add(ParagraphStyle(
+            name='ListItem',
+            parent=self.styles['CustomBody'],
+            spaceAfter=0,
+            leftIndent=18,
+            bulletIndent=4
+        ))
+        self.styles.add(ParagraphStyle(
+            name='NestedListItem',
+            parent=self.styles['ListItem'],
+            leftIndent=36,
+            bulletIndent=22
+        ))
+        
+        # Table of contents entries
+        self.styles.add(ParagraphStyle(
+            name='TocEntry',
+            parent=self.styles['CustomBody'],
+            alignment=TA_LEFT,
+            spaceAfter=0,
+            textColor=colors.HexColor('#1f4788')
+        ))
+        
         # Metadata style
         self.styles.add(ParagraphStyle(
             name='Metadata',
@@ -81,144 +217,163 @@ class PDFGenerator:
         text = text.replace('>', '&gt;')
         return text
     
-    def _format_analysis_text(self, text: str) -> list:
-        """Format analysis text into reportlab flowables."""
-        flowables = []
-        
-        # Split text into lines
-        lines = text.split('\n')
+    def _inline_markup(self, inlines: tuple) -> str:
+        """Reportlab paragraph markup for inline spans."""
+        parts = []
+        for style, text in inlines:
+            text = self._clean_text(text)
+            if style == 'strong':
+                parts.append(f"<b>{text}</b>")
+            elif style == 'em':
+                parts.append(f"<i>{text}</i>")
+            else:
+                parts.append(text)
+        return "".join(parts)
+    
+    def _paragraph(self, inlines: tuple, style: ParagraphStyle, bulletText: Optional[str] = None) -> Paragraph:
+        """Paragraph for inline spans, reusing the parsed fragments of an identical earlier one."""
+        key = (inlines, style.name)
+        with self._paragraph_frags_lock:
+            cached = self._paragraph_frags.get(key)
+            if cached is not None:
+                self._paragraph_frags.move_to_end(key)
+        if cached is not None:
+            markup, frags = cached
+            # Layout never modifies the fragments, so paragraphs can share them
+            return Paragraph(markup, style, bulletText=bulletText, frags=frags)
         
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Skip empty lines
-            if not line:
-                i += 1
-                continue
-            
-            # Handle headings (### or ## or # or **bold**)
-            if line.startswith('###'):
-                heading_text = line.replace('###', '').strip()
-                flowables.append(Paragraph(self._clean_text(heading_text), self.styles['SectionHeading']))
-                flowables.append(Spacer(1, 0.1*inch))
-                i += 1
-                continue
-            elif line.startswith('##'):
-                heading_text = line.replace('##', '').strip()
-                flowables.append(Paragraph(self._clean_text(heading_text), self.styles['CustomSubtitle']))
-                flowables.append(Spacer(1, 0.1*inch))
-                i += 1
-                continue
-            elif line.startswith('#'):
-                heading_text = line.replace('#', '').strip()
-                flowables.append(Paragraph(self._clean_text(heading_text), self.styles['CustomSubtitle']))
-                flowables.append(Spacer(1, 0.1*inch))
-                i += 1
-                continue
+        markup = self._inline_markup(inlines)
+        paragraph = Paragraph(markup, style, bulletText=bulletText)
+        with self._paragraph_frags_lock:
+            self._paragraph_frags[key] = (markup, paragraph.frags)
+            while len(self._paragraph_frags) > PDF_PARAGRAPH_CACHE_ENTRIES:
+                self._paragraph_frags.popitem(last=False)
+        return paragraph
+    
+    def _analysis_flowables(self, text: str) -> Iterator:
+        """Yield reportlab flowables for analysis text (reportlab back end of the markdown tree)."""
+        for block in parse_markdown(text):
+            kind = block[0]
             
-            # Handle bold text as subheadings (lines that start and end with **)
-            if line.startswith('**') and line.endswith('**') and len(line) > 4:
-                heading_text = line.replace('**', '').strip()
-                flowables.append(Paragraph(self._clean_text(heading_text), self.styles['SectionHeading']))
-                flowables.append(Spacer(1, 0.05*inch))
-                i += 1
-                continue
+            if kind == 'heading':
+                _, level, inlines = block
+                style = self.styles['CustomSubtitle'] if level <= 2 else self.styles['SectionHeading']
+                yield self._paragraph(inlines, style)
+                yield Spacer(1, 0.05*inch if level > 3 else 0.1*inch)
             
-            # Handle bullet points (• or - or * at start)
-            if line.startswith('•') or line.startswith('- ') or line.startswith('* '):
-                # Collect consecutive bullet points
-                bullet_items = []
-                while i < len(lines):
-                    curr_line = lines[i].strip()
-                    if not curr_line:
-                        i += 1
-                        break
-                    if curr_line.startswith('•') or curr_line.startswith('- ') or curr_line.startswith('* '):
-                        # Remove bullet marker and clean
-                        bullet_text = curr_line.lstrip('•-* ').strip()
-                        # Remove any ** bold markers
-                        bullet_text = bullet_text.replace('**', '')
-                        bullet_items.append(bullet_text)
-                        i += 1
-                    else:
-                        break
-                
-                # Add bullets with proper spacing
-                for bullet_text in bullet_items:
-                    para = Paragraph(f"• {self._clean_text(bullet_text)}", self.styles['CustomBody'])
-                    flowables.append(para)
-                    flowables.append(Spacer(1, 0.05*inch))
-                
-                flowables.append(Spacer(1, 0.1*inch))
-                continue
+            elif kind == 'list':
+                for depth, number, inlines in block[1]:
+                    style = self.styles['ListItem'] if depth == 0 else self.styles['NestedListItem']
+                    yield self._paragraph(inlines, style, bulletText='•' if number is None else f"{number}.")
+                    yield Spacer(1, 0.05*inch)
+                yield Spacer(1, 0.1*inch)
             
-            # Handle numbered lists
-            if re.match(r'^\d+\.', line):
-                # Collect consecutive numbered items
-                numbered_items = []
-                while i < len(lines):
-                    curr_line = lines[i].strip()
-                    if not curr_line:
-                        i += 1
-                        break
-                    if re.match(r'^\d+\.', curr_line):
-                        # Clean numbered text
-                        numbered_text = re.sub(r'^\d+\.\s*', '', curr_line)
-                        numbered_text = numbered_text.replace('**', '')
-                        numbered_items.append((len(numbered_items) + 1, numbered_text))
-                        i += 1
-                    else:
-                        break
-                
-                # Add numbered items
-                for num, text in numbered_items:
-                    para = Paragraph(f"{num}. {self._clean_text(text)}", self.styles['CustomBody'])
-                    flowables.append(para)
-                    flowables.append(Spacer(1, 0.05*inch))
-                
-                flowables.append(Spacer(1, 0.1*inch))
-                continue
+            elif kind == 'rule':
+                yield HRFlowable(
+                    width="100%", thickness=0.5, color=colors.lightgrey, spaceBefore=4, spaceAfter=8
+                )
             
-            # Regular paragraph - clean and add
-            # Remove inline ** bold markers
-            clean_line = line.replace('**', '')
-            flowables.append(Paragraph(self._clean_text(clean_line), self.styles['CustomBody']))
-            flowables.append(Spacer(1, 0.1*inch))
-            i += 1
-        
-        return flowables
+            else:
+                yield self._paragraph(block[1], self.styles['CustomBody'])
+                yield Spacer(1, 0.1*inch)
     
-    def generate_pdf(self, analysis_data: dict, filename: str = None) -> bytes:
-        """
-        Generate PDF from analysis data.
-        
-        Args:
-            analysis_data: Dictionary containing analysis results
-            filename: Optional filename for the PDF
-            
-        Returns:
-            PDF as bytes
-        """
-        buffer = io.BytesIO()
-        
-        # Create PDF document
-        doc = SimpleDocTemplate(
-            buffer,
+    @classmethod
+    def cache_key(cls, analysis_data: dict) -> str:
+        """Hash of the parts of a result that determine the PDF's content."""
+        return result_hash({field: analysis_data.get(field) for field in cls.REPORT_FIELDS})
+    
+    @classmethod
+    def combined_cache_key(cls, analyses: dict) -> str:
+        """Hash of the report fields of every analysis in a combined PDF (order matters)."""
+        return result_hash([
+            [title, {field: analysis_data.get(field) for field in cls.REPORT_FIELDS + ('error',)}]
+            for title, analysis_data in analyses.items()
+        ])
+    
+    def _new_document(self, output: Union[str, BinaryIO]) -> SimpleDocTemplate:
+        """Create the page template shared by all reports."""
+        return SimpleDocTemplate(
+            output,
             pagesize=letter,
             rightMargin=0.75*inch,
             leftMargin=0.75*inch,
             topMargin=1*inch,
             bottomMargin=0.75*inch
         )
+    
+    def _metadata_table(self, rows: list) -> Table:
+        """Two-column label/value table used for report metadata."""
+        metadata_table = Table(rows, colWidths=[1.5*inch, 4.5*inch])
+        metadata_table.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
+            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ]))
+        return metadata_table
+    
+    def _build(
+        self, flowables: Iterator, output: Optional[Union[str, BinaryIO]], on_page=None
+    ) -> Optional[bytes]:
+        """
+        Lay out flowables into a PDF written to output, or returned as bytes.
+        
+        Flowables are pulled from the iterator as the layout reaches them, so
+        peak memory does not grow with the length of the report.
+        """
+        page_callbacks = {'onFirstPage': on_page, 'onLaterPages': on_page} if on_page else {}
+        if output is not None:
+            self._new_document(output).build(_LazyFlowables(flowables), **page_callbacks)
+            return None
+        
+        buffer = io.BytesIO()
+        self._new_document(buffer).build(_LazyFlowables(flowables), **page_callbacks)
+        return buffer.getvalue()
+    
+    def _appendix_flowables(self, images: Sequence[Tuple[str, bytes]], dpi: int) -> Iterator:
+        """
+        Yield the source page appendix.
         
-        # Container for the 'Flowable' objects
-        elements = []
+        Identical images (by content hash) are embedded once, captioned with
+        every page they stand for; each is downsampled to the print resolution
+        and recompressed before embedding.
+        """
+        unique = {}
+        for caption, image_bytes in images:
+            digest = hashlib.sha256(image_bytes).hexdigest()
+            unique.setdefault(digest, (image_bytes, []))[1].append(caption)
         
+        box_width, box_height = APPENDIX_IMAGE_BOX
+        for index, (image_bytes, captions) in enumerate(unique.values()):
+            if index:
+                yield PageBreak()
+            yield Paragraph(self._clean_text(" · ".join(captions)), self.styles['Metadata'])
+            try:
+                prepared = preprocess_image(
+                    image_bytes,
+                    max_dimension=round(max(box_width, box_height) / inch * dpi),
+                    max_short_side=round(min(box_width, box_height) / inch * dpi),
+                    quality=PDF_APPENDIX_QUALITY
+                )
+            except Exception as e:
+                yield Paragraph(self._clean_text(f"Image could not be embedded: {e}"), self.styles['CustomBody'])
+                continue
+            scale = min(box_width / prepared['width'], box_height / prepared['height'])
+            yield Image(
+                io.BytesIO(prepared['bytes']),
+                width=prepared['width'] * scale,
+                height=prepared['height'] * scale
+            )
+    
+    def _report_flowables(
+        self, analysis_data: dict, appendix_images: Optional[Sequence[Tuple[str, bytes]]], dpi: int
+    ) -> Iterator:
+        """Yield the flowables of a single-analysis report."""
         # Title
-        title = Paragraph("Financial Report Analysis", self.styles['CustomTitle'])
-        elements.append(title)
-        elements.append(Spacer(1, 0.3*inch))
+        yield Paragraph("Financial Report Analysis", self.styles['CustomTitle'])
+        yield Spacer(1, 0.3*inch)
         
         # Metadata table
         metadata = [
@@ -228,34 +383,166 @@ class PDFGenerator:
             ['User Role:', analysis_data.get('role', 'N/A')],
             ['Images Analyzed:', str(analysis_data.get('image_count', 0))]
         ]
-        
-        metadata_table = Table(metadata, colWidths=[1.5*inch, 4.5*inch])
-        metadata_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.grey),
-            ('TEXTCOLOR', (1, 0), (1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ]))
-        
-        elements.append(metadata_table)
-        elements.append(Spacer(1, 0.4*inch))
+        yield self._metadata_table(metadata)
+        yield Spacer(1, 0.4*inch)
         
         # Analysis section
-        elements.append(Paragraph("Analysis Results", self.styles['CustomSubtitle']))
-        elements.append(Spacer(1, 0.2*inch))
+        yield Paragraph("Analysis Results", self.styles['CustomSubtitle'])
+        yield Spacer(1, 0.2*inch)
         
-        # Add formatted analysis text
+        # Formatted analysis text
         analysis_text = analysis_data.get('analysis', 'No analysis available.')
-        analysis_elements = self._format_analysis_text(analysis_text)
-        elements.extend(analysis_elements)
+        yield from self._analysis_flowables(analysis_text)
         
-        # Build PDF
-        doc.build(elements)
+        # Source pages
+        if appendix_images:
+            yield PageBreak()
+            yield Paragraph("Appendix: Source Pages", self.styles['CustomSubtitle'])
+            yield from self._appendix_flowables(appendix_images, dpi)
+    
+    def generate_pdf(
+        self,
+        analysis_data: dict,
+        *,
+        output: Optional[Union[str, BinaryIO]] = None,
+        appendix_images: Optional[Sequence[Tuple[str, bytes]]] = None,
+        appendix_dpi: int = PDF_APPENDIX_DPI
+    ) -> Optional[bytes]:
+        """
+        Generate PDF from analysis data.
         
-        # Get PDF bytes
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
+        Args:
+            analysis_data: Dictionary containing analysis results
+            output: Optional sink for the PDF: a file path or a writable binary
+                file-like object (open file, response stream)
+            appendix_images: Optional (caption, image bytes) pairs of the analyzed
+                pages, embedded downsampled in an appendix
+            appendix_dpi: Print resolution of the appendix images
+            
+        Returns:
+            PDF as bytes, or None when it was written to output
+        """
+        return self._build(self._report_flowables(analysis_data, appendix_images, appendix_dpi), output)
+    
+    @staticmethod
+    def _distinct(results: list, field: str, default: str = 'N/A') -> str:
+        """Comma-separated distinct values of a field, in first-seen order."""
+        values = dict.fromkeys(str(result.get(field)) for result in results if result.get(field))
+        return ", ".join(values) or default
+    
+    @staticmethod
+    def _draw_page_number(canvas, doc):
+        canvas.saveState()
+        canvas.setFont('Helvetica', 8)
+        canvas.setFillColor(colors.gray)
+        canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, 0.5*inch, f"Page {canvas.getPageNumber()}")
+        canvas.restoreState()
+    
+    def _bundle_flowables(
+        self, sections: list, title: str, appendix_images: Optional[Sequence[Tuple[str, bytes]]], dpi: int
+    ) -> Iterator:
+        """Yield the flowables of a bundle: cover, table of contents, one section per analysis."""
+        results = [analysis_data for _, analysis_data in sections]
+        
+        yield Paragraph(self._clean_text(title), self.styles['CustomTitle'])
+        yield Spacer(1, 0.3*inch)
+        metadata = [
+            ['Generated:', datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
+            ['AI Provider:', self._distinct(results, 'provider').upper()],
+            ['Model:', self._distinct(results, 'model')],
+            ['User Role:', self._distinct(results, 'role')],
+            ['Images Analyzed:', str(sum(result.get('image_count') or 0 for result in results))],
+            ['Sections:', str(len(sections))]
+        ]
+        yield self._metadata_table(metadata)
+        yield Spacer(1, 0.4*inch)
+        
+        # Table of contents; page numbers are filled in by each _SectionStart
+        yield Paragraph("Contents", self.styles['CustomSubtitle'])
+        yield Spacer(1, 0.1*inch)
+        contents = [(f"section-{index}", section_title) for index, (section_title, _) in enumerate(sections)]
+        if appendix_images:
+            contents.append(("appendix", "Appendix: Source Pages"))
+        for key, section_title in contents:
+            link = f'<a href="#{key}">{self._clean_text(section_title)}</a>'
+            yield _TocEntry(Paragraph(link, self.styles['TocEntry']), key)
+            yield Spacer(1, 0.05*inch)
+        
+        for index, (section_title, analysis_data) in enumerate(sections):
+            key = f"section-{index}"
+            yield PageBreak()
+            yield _SectionStart(key, section_title)
+            yield Paragraph(self._clean_text(section_title), self.styles['CustomSubtitle'])
+            details = [
+                analysis_data.get('provider', '').upper(),
+                analysis_data.get('model', ''),
+                analysis_data.get('role', ''),
+                f"{analysis_data.get('image_count', 0)} image(s)",
+            ]
+            yield Paragraph(self._clean_text(" · ".join(detail for detail in details if detail)), self.styles['Metadata'])
+            yield Spacer(1, 0.2*inch)
+            analysis_text = analysis_data.get('analysis') or (
+                f"Analysis failed: {analysis_data.get('error', 'unknown error')}"
+            )
+            yield from self._analysis_flowables(analysis_text)
+        
+        if appendix_images:
+            yield PageBreak()
+            yield _SectionStart("appendix", "Appendix: Source Pages")
+            yield Paragraph("Appendix: Source Pages", self.styles['CustomSubtitle'])
+            yield from self._appendix_flowables(appendix_images, dpi)
+    
+    def generate_bundle_pdf(
+        self,
+        sections: Iterable[Tuple[str, dict]],
+        *,
+        output: Optional[Union[str, BinaryIO]] = None,
+        title: str = "Financial Report Analysis",
+        appendix_images: Optional[Sequence[Tuple[str, bytes]]] = None,
+        appendix_dpi: int = PDF_APPENDIX_DPI
+    ) -> Optional[bytes]:
+        """
+        Generate one PDF bundling many analyses (e.g. every analysis type, or
+        every company of a quarter) behind a shared cover and table of contents.
         
-        return pdf_bytes
+        Each section starts on a new page and gets a PDF bookmark. The document
+        is laid out in a single pass, so it scales to hundreds of sections.
+        
+        Args:
+            sections: (section title, result dict) pairs in document order
+            output: Optional sink for the PDF (file path or writable binary file-like)
+            title: Title of the cover page
+            appendix_images: Optional (caption, image bytes) pairs of the analyzed
+                pages; an image shared by several sections is embedded once
+            appendix_dpi: Print resolution of the appendix images
+            
+        Returns:
+            PDF as bytes, or None when it was written to output
+        """
+        sections = list(sections)
+        return self._build(
+            self._bundle_flowables(sections, title, appendix_images, appendix_dpi),
+            output,
+            on_page=self._draw_page_number
+        )
+    
+    def generate_combined_pdf(
+        self,
+        analyses: dict,
+        *,
+        output: Optional[Union[str, BinaryIO]] = None,
+        appendix_images: Optional[Sequence[Tuple[str, bytes]]] = None
+    ) -> Optional[bytes]:
+        """
+        Generate one PDF containing several analyses of the same document set.
+        
+        Args:
+            analyses: Mapping of analysis title (e.g. "Risk Analysis") to result dict,
+                in the order they should appear
+            output: Optional sink for the PDF (file path or writable binary file-like)
+            appendix_images: Optional (caption, image bytes) pairs of the analyzed pages
+            
+        Returns:
+            PDF as bytes, or None when it was written to output
+        """
+        return self.generate_bundle_pdf(analyses.items(), output=output, appendix_images=appendix_images)
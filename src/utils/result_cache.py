@@ -0,0 +1,231 @@
+"""
+Content-addressed result cache for AI analyses
+Two tiers: an in-memory LRU in front of an on-disk SQLite store.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+def make_cache_key(images: List[bytes], **settings: Any) -> str:
+    """
+    Build a content-addressed cache key.
+
+    Args:
+        images: List of image bytes (order matters)
+        **settings: Everything else that influences the answer
+            (prompt, role, provider, model, generation settings)
+
+    Returns:
+        Hex digest identifying the request
+    """
+    hasher = hashlib.sha256()
+    for img_bytes in images:
+        hasher.update(hashlib.sha256(img_bytes).digest())
+    hasher.update(json.dumps(settings, sort_keys=True, default=str).encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU cache with optional per-entry expiry."""
+
+    def __init__(self, max_entries: int = 64):
+        """
+        Initialize LRU cache.
+
+        Args:
+            max_entries: Maximum number of entries kept in memory
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None if missing/expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        """Store a value, evicting the least recently used entries."""
+        expires_at = time.time() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ResultCache:
+    """Cache analysis results in memory and in a SQLite database on disk."""
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_db_bytes: int = 200 * 1024 * 1024,
+        memory_entries: int = 64
+    ):
+        """
+        Initialize Result Cache.
+
+        Args:
+            db_path: SQLite file path (None keeps the cache in memory only)
+            ttl_seconds: Time-to-live for cached results
+            max_db_bytes: Size budget for the on-disk tier
+            memory_entries: Number of results kept in the in-memory LRU tier
+        """
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_db_bytes = max_db_bytes
+        self.memory = LRUCache(memory_entries)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS results (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_results_accessed ON results (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a short-lived connection (safe to use from any thread)."""
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Copy of the cached result dict, or None on a miss
+        """
+        result = self.memory.get(key)
+
+        if result is None and self.db_path:
+            now = time.time()
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, created_at FROM results WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row and row[1] + self.ttl_seconds >= now:
+                        conn.execute("UPDATE results SET accessed_at = ? WHERE key = ?", (now, key))
+                        result = json.loads(row[0])
+                        remaining = row[1] + self.ttl_seconds - now
+                        self.memory.set(key, result, remaining)
+                    elif row:
+                        conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            except sqlite3.Error:
+                # A broken disk tier must never break an analysis
+                result = None
+
+        with self._lock:
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        return dict(result) if result is not None else None
+
+    def set(self, key: str, result: Dict[str, Any]):
+        """
+        Store a result in both tiers.
+
+        Args:
+            key: Cache key from make_cache_key
+            result: JSON-serialisable result dict
+        """
+        self.memory.set(key, dict(result), self.ttl_seconds)
+
+        if not self.db_path:
+            return
+
+        value = json.dumps(result)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, len(value), now, now)
+                )
+                self._evict(conn, now)
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Drop expired rows, then least recently used rows over the size budget."""
+        conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl_seconds,))
+
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_db_bytes:
+            return
+
+        excess = total - self.max_db_bytes
+        stale_keys = []
+        for key, size in conn.execute("SELECT key, size FROM results ORDER BY accessed_at ASC"):
+            if excess <= 0:
+                break
+            stale_keys.append((key,))
+            excess -= size
+        conn.executemany("DELETE FROM results WHERE key = ?", stale_keys)
+
+    def clear(self):
+        """Remove all cached results."""
+        self.memory.clear()
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM results")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'memory_entries': len(self.memory),
+        }
+        if self.db_path:
+            try:
+                with self._connect() as conn:
+                    count, size = conn.execute(
+                        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+                    ).fetchone()
+                stats['disk_entries'] = count
+                stats['disk_bytes'] = size
+            except sqlite3.Error:
+                pass
+        return stats
@@ -0,0 +1,350 @@
+"""
+Retry, backoff and client-side rate limiting for provider calls
+"""
+import asyncio
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Optional, Tuple
+
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Exception class names raised by the OpenAI and Google SDKs for transient failures
+RETRYABLE_ERROR_NAMES = {
+    'APITimeoutError', 'APIConnectionError', 'RateLimitError', 'InternalServerError',
+    'ResourceExhausted', 'ServiceUnavailable', 'DeadlineExceeded', 'TooManyRequests',
+    'GatewayTimeout', 'BadGateway',
+}
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+
+
+class RequestCancelled(Exception):
+    """Raised instead of making an attempt once the call has been cancelled."""
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse a rate-limit reset duration such as "1s", "6m0s" or "20ms" into seconds.
+
+    Plain numbers are treated as seconds.
+    """
+    value = (value or '').strip()
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    multipliers = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+    return sum(float(number) * multipliers[unit] for number, unit in parts)
+
+
+def get_retry_after(headers: Any) -> Optional[float]:
+    """
+    Extract the server-requested wait time from response headers.
+
+    Honours retry-after-ms, Retry-After (seconds or HTTP date) and the
+    x-ratelimit-reset-* headers when the matching remaining count is zero.
+
+    Args:
+        headers: Mapping-like response headers (case-insensitive lookups preferred)
+
+    Returns:
+        Seconds to wait, or None if the headers do not say
+    """
+    if not headers:
+        return None
+
+    def header(name: str) -> Optional[str]:
+        value = headers.get(name)
+        if value is None:
+            value = headers.get(name.title())
+        return value
+
+    retry_after_ms = header('retry-after-ms')
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = header('retry-after')
+    if retry_after:
+        seconds = parse_duration(retry_after)
+        if seconds is not None:
+            return seconds
+        try:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+
+    waits = []
+    for kind in ('requests', 'tokens'):
+        if header(f'x-ratelimit-remaining-{kind}') == '0':
+            reset = parse_duration(header(f'x-ratelimit-reset-{kind}'))
+            if reset is not None:
+                waits.append(reset)
+    return max(waits) if waits else None
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, Optional[float]]:
+    """
+    Classify a provider exception.
+
+    Args:
+        exc: Exception raised by a provider SDK call
+
+    Returns:
+        Tuple of (retryable: bool, retry_after_seconds or None)
+    """
+    response = getattr(exc, 'response', None)
+    retry_after = get_retry_after(getattr(response, 'headers', None))
+
+    # Gemini attaches a google.rpc.RetryInfo detail to quota errors
+    if retry_after is None:
+        for detail in getattr(exc, 'details', None) or ():
+            delay = getattr(detail, 'retry_delay', None)
+            if delay is not None:
+                retry_after = delay.seconds + delay.nanos / 1e9
+                break
+
+    status = getattr(exc, 'status_code', None)
+    if status is None:
+        code = getattr(exc, 'code', None)
+        status = code if isinstance(code, int) else None
+
+    if status is not None:
+        return status in RETRYABLE_STATUS_CODES, retry_after
+
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True, retry_after
+
+    return type(exc).__name__ in RETRYABLE_ERROR_NAMES, retry_after
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, bounded by attempts and a total deadline."""
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        deadline: float = 180.0,
+        jitter: bool = True
+    ):
+        """
+        Initialize Retry Policy.
+
+        Args:
+            max_attempts: Total attempts including the first one
+            base_delay: Delay before the first retry (seconds)
+            max_delay: Cap for a single backoff delay (seconds)
+            deadline: Maximum total time spent across all attempts (seconds)
+            jitter: Randomize delays to avoid synchronized retries
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.jitter = jitter
+
+    def backoff(self, retry_number: int, retry_after: Optional[float] = None) -> float:
+        """Delay before the given retry (1-based), never shorter than retry_after."""
+        delay = min(self.max_delay, self.base_delay * (2 ** (retry_number - 1)))
+        if self.jitter:
+            delay = random.uniform(delay / 2, delay)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute."""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Initialize Token Bucket.
+
+        Args:
+            rate_per_minute: Refill rate
+            capacity: Burst size (defaults to one minute's worth)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1) -> float:
+        """
+        Take amount tokens, going into debt if necessary.
+
+        Returns:
+            Seconds the caller must wait before using the reservation
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """Client-side pacing by requests per minute and tokens per minute."""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    def reserve(self, tokens: int) -> float:
+        """Reserve one request and the given token count; return the wait in seconds."""
+        return max(self.requests.reserve(1), self.tokens.reserve(tokens))
+
+
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(key: str, requests_per_minute: float, tokens_per_minute: float) -> RateLimiter:
+    """
+    Return the process-wide rate limiter for a key (e.g. provider plus API key hash).
+
+    Args:
+        key: Identifier of the quota the limiter protects
+        requests_per_minute: Request budget used when the limiter is created
+        tokens_per_minute: Token budget used when the limiter is created
+    """
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+            _rate_limiters[key] = limiter
+        return limiter
+
+
+def _next_delay(policy: RetryPolicy, attempt: int, exc: BaseException, started: float) -> Optional[float]:
+    """Delay before the next attempt, or None if the error should be raised."""
+    retryable, retry_after = classify_error(exc)
+    if not retryable or attempt >= policy.max_attempts:
+        return None
+
+    delay = policy.backoff(attempt, retry_after)
+    if time.monotonic() - started + delay > policy.deadline:
+        return None
+    return delay
+
+
+def _sleep(seconds: float, cancel: Optional[threading.Event]) -> bool:
+    """Sleep, waking early when cancel is set. Returns whether it was cancelled."""
+    if cancel is None:
+        time.sleep(seconds)
+        return False
+    return cancel.wait(seconds)
+
+
+async def _async_sleep(seconds: float, cancel: Optional[asyncio.Event]) -> bool:
+    """Asyncio counterpart of _sleep."""
+    if cancel is None:
+        await asyncio.sleep(seconds)
+        return False
+    try:
+        await asyncio.wait_for(cancel.wait(), seconds)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+def call_with_retry(
+    fn: Callable[[], Any],
+    policy: RetryPolicy,
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0,
+    on_retry: Optional[Callable[[int, BaseException, float], None]] = None,
+    cancel: Optional[threading.Event] = None
+) -> Any:
+    """
+    Call fn, retrying transient failures.
+
+    Args:
+        fn: Zero-argument callable performing the provider request
+        policy: Backoff and deadline settings
+        limiter: Optional client-side rate limiter consulted before each attempt
+        tokens: Estimated tokens consumed by one attempt
+        on_retry: Callback(attempt, exception, delay) invoked before sleeping
+        cancel: Optional event; once set, waits end early and no further
+            attempt is made
+
+    Returns:
+        Whatever fn returns
+
+    Raises:
+        RequestCancelled: When cancelled before an attempt (including
+            during the rate-limiter wait)
+        The last exception when it is fatal, retries are exhausted or the
+        call was cancelled during the backoff
+    """
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        if cancel is not None and cancel.is_set():
+            raise RequestCancelled("Request cancelled")
+        if limiter is not None:
+            wait = limiter.reserve(tokens)
+            if wait and _sleep(wait, cancel):
+                raise RequestCancelled("Request cancelled while waiting for the rate limiter")
+        try:
+            return fn()
+        except Exception as e:
+            delay = _next_delay(policy, attempt, e, started)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            if _sleep(delay, cancel):
+                raise
+
+
+async def async_call_with_retry(
+    fn: Callable[[], Any],
+    policy: RetryPolicy,
+    limiter: Optional[RateLimiter] = None,
+    tokens: int = 0,
+    on_retry: Optional[Callable[[int, BaseException, float], None]] = None,
+    cancel: Optional[asyncio.Event] = None
+) -> Any:
+    """Asyncio counterpart of call_with_retry; fn returns an awaitable and cancel is an asyncio.Event."""
+    started = time.monotonic()
+    attempt = 0
+    while True:
+        attempt += 1
+        if cancel is not None and cancel.is_set():
+            raise RequestCancelled("Request cancelled")
+        if limiter is not None:
+            wait = limiter.reserve(tokens)
+            if wait and await _async_sleep(wait, cancel):
+                raise RequestCancelled("Request cancelled while waiting for the rate limiter")
+        try:
+            return await fn()
+        except Exception as e:
+            delay = _next_delay(policy, attempt, e, started)
+            if delay is None:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e, delay)
+            if await _async_sleep(delay, cancel):
+                raise